@@ -8,6 +8,9 @@ import mysql.connector
 import openpyxl
 import os
 
+from core.education import rule_education_level
+from core.gazetteer import location_code, state_code
+
 # ── Dataset path ───────────────────────────────────────────────────────────
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATASET_PATH = os.path.join(BASE_DIR, 'dataset', 'BenefitBridge_Dataset.xlsx')
@@ -75,9 +78,9 @@ for row in ws_sch.iter_rows(min_row=2, values_only=True):
     cursor.execute(
         """INSERT INTO Schemes
            (scheme_id, scheme_name, target_category, description,
-            benefits, benefit_type, state, official_link, registration_link)
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)""",
-        (sid, sname, tcat, desc, benefits, btype, state,
+            benefits, benefit_type, state, state_code, official_link, registration_link)
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+        (sid, sname, tcat, desc, benefits, btype, state, state_code(state),
          official if official else None,
          reg_link if reg_link else None)
     )
@@ -112,18 +115,20 @@ for row in ws_rule.iter_rows(min_row=2, values_only=True):
     cursor.execute(
         """INSERT INTO Rule_Engine
            (rule_id, scheme_id, category_id,
-            age_min, age_max, gender, location,
-            min_income, max_income, education_required,
+            age_min, age_max, gender, location, location_code,
+            min_income, max_income, education_required, education_level,
             pension_status, disability_cert,
             unemployment_status, business_turnover_limit)
-           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
+           VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)""",
         (
             rid, sid, cid,
             a_min, a_max,
             gender     if gender     else None,
             loc        if loc        else None,
+            location_code(loc),
             min_inc, max_inc,
             edu        if edu        else None,
+            rule_education_level(edu),
             1 if pension    else None,
             1 if disability else None,
             1 if unemployed else None,
@@ -151,4 +156,18 @@ print("─" * 45)
 
 cursor.close()
 db.close()
+
+# ── Scheme facet cache ─────────────────────────────────────────────────────
+# The dashboard filters are cached from Schemes (core/facets.py); rebuild
+# them so the new catalog shows up without waiting for the cache to expire.
+try:
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'beneficiary_system.settings')
+    django.setup()
+    from core.facets import rebuild_scheme_facets
+    facets = rebuild_scheme_facets()
+    print(f"  ✅  Scheme facets rebuilt: {len(facets['states'])} states, "
+          f"{len(facets['benefit_types'])} benefit types.")
+except Exception as e:
+    print(f"  ⚠️  Scheme facet cache not rebuilt: {e}")
 print("\n🎉  Dataset loaded successfully! System is ready to use.")
\ No newline at end of file
@@ -181,6 +181,49 @@ EMAIL_HOST_USER     = os.environ.get('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL  = os.environ.get('EMAIL_HOST_USER', 'noreply@benefitbridge.in')
 
+# ── Eligibility engine ─────────────────────────────────────────────────────
+# How long a worker keeps its compiled Rule_Engine snapshot before reloading.
+ELIGIBILITY_RULE_CACHE_SECONDS = int(os.environ.get('ELIGIBILITY_RULE_CACHE_SECONDS', 300))
+# Results memoised per profile signature in each snapshot (0 disables).
+ELIGIBILITY_MEMO_SIZE = int(os.environ.get('ELIGIBILITY_MEMO_SIZE', 4096))
+# Near misses (schemes failed on one criterion) kept per user, and how many
+# years below a minimum age still count as near.
+ELIGIBILITY_NEAR_MISS_LIMIT       = int(os.environ.get('ELIGIBILITY_NEAR_MISS_LIMIT', 5))
+ELIGIBILITY_NEAR_MISS_MAX_AGE_GAP = int(os.environ.get('ELIGIBILITY_NEAR_MISS_MAX_AGE_GAP', 5))
+# Rule/scheme edits bump their categories' rules_version and each user is
+# recomputed when they next open the dashboard.  With eager recompute on,
+# edits also mark categories dirty; `manage.py recompute_eligibility` waits
+# this long for further edits before recomputing, then commits per chunk.
+ELIGIBILITY_EAGER_RECOMPUTE          = os.environ.get('ELIGIBILITY_EAGER_RECOMPUTE', 'False') == 'True'
+ELIGIBILITY_RECOMPUTE_WINDOW_SECONDS = int(os.environ.get('ELIGIBILITY_RECOMPUTE_WINDOW_SECONDS', 30))
+# A category edited more often than the window is still recomputed this long
+# after its first pending edit.
+ELIGIBILITY_RECOMPUTE_MAX_WAIT_SECONDS = int(os.environ.get('ELIGIBILITY_RECOMPUTE_MAX_WAIT_SECONDS', 300))
+ELIGIBILITY_RECOMPUTE_CHUNK_SIZE     = int(os.environ.get('ELIGIBILITY_RECOMPUTE_CHUNK_SIZE', 500))
+# Per-user eligibility runs happen inline, without an Eligibility_Jobs row.
+# Set to True only where `manage.py process_eligibility_jobs` is deployed as
+# a worker (railway.json starts the web process alone); otherwise queued
+# jobs are never picked up and the dashboard waits on them indefinitely.
+ELIGIBILITY_JOBS_ASYNC          = os.environ.get('ELIGIBILITY_JOBS_ASYNC', 'False') == 'True'
+# A running job whose worker has been silent this long is handed to another.
+ELIGIBILITY_JOB_TIMEOUT_SECONDS = int(os.environ.get('ELIGIBILITY_JOB_TIMEOUT_SECONDS', 300))
+ELIGIBILITY_JOB_RETENTION_DAYS  = int(os.environ.get('ELIGIBILITY_JOB_RETENTION_DAYS', 7))
+# Dashboard state / benefit type filters are cached (core/facets.py) and
+# dropped on scheme writes; with the default per-process cache other workers
+# pick up a write when their copy expires after this long.
+SCHEME_FACET_CACHE_SECONDS = int(os.environ.get('SCHEME_FACET_CACHE_SECONDS', 3600))
+# Eligible schemes per dashboard page; the rest load as the user scrolls.
+DASHBOARD_PAGE_SIZE = int(os.environ.get('DASHBOARD_PAGE_SIZE', 20))
+# Rendered dashboard sections are cached per user version (core/dashboard_cache.py)
+# for this long.  Only used with a shared CACHES backend (Redis, Memcached): with
+# the default per-process LocMemCache a write would only drop the version in the
+# worker that made it, so the sections are rendered on every visit instead.
+# 0 disables the cache.
+DASHBOARD_CACHE_SECONDS = int(os.environ.get('DASHBOARD_CACHE_SECONDS', 120))
+# Each worker keeps the announcements in memory (core/announcements.py) and
+# reloads them when an admin edits one, or after this long at the latest.
+ANNOUNCEMENT_CACHE_SECONDS = int(os.environ.get('ANNOUNCEMENT_CACHE_SECONDS', 300))
+
 # ── django-allauth ─────────────────────────────────────────────────────────
 
 # ── API Keys ───────────────────────────────────────────────────────────────
@@ -0,0 +1,48 @@
+"""
+Settings for `manage.py benchmark_eligibility`.
+
+The benchmark fills its database with synthetic Users, Schemes and
+Rule_Engine rows and drops them between runs, so it must never point at the
+real database.  By default it uses a SQLite file in the system temp
+directory; set BENCHMARK_MYSQL_DATABASE (plus BENCHMARK_MYSQL_HOST / _PORT /
+_USER / _PASSWORD) to run against a local MySQL instance instead.
+
+Usage:
+    python manage.py benchmark_eligibility --settings=beneficiary_system.settings_benchmark
+"""
+import os
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = SECRET_KEY or 'benchmark-only'  # noqa: F405
+
+BENCHMARK_MYSQL_DATABASE = os.environ.get('BENCHMARK_MYSQL_DATABASE', '')
+
+if BENCHMARK_MYSQL_DATABASE:
+    DATABASES = {
+        'default': {
+            'ENGINE':   'django.db.backends.mysql',
+            'NAME':     BENCHMARK_MYSQL_DATABASE,
+            'USER':     os.environ.get('BENCHMARK_MYSQL_USER', 'root'),
+            'PASSWORD': os.environ.get('BENCHMARK_MYSQL_PASSWORD', ''),
+            'HOST':     os.environ.get('BENCHMARK_MYSQL_HOST', '127.0.0.1'),
+            'PORT':     os.environ.get('BENCHMARK_MYSQL_PORT', '3306'),
+            'OPTIONS':  {'charset': 'utf8mb4'},
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME':   os.environ.get(
+                'BENCHMARK_SQLITE_PATH',
+                os.path.join(tempfile.gettempdir(), 'sbms_benchmark.sqlite3'),
+            ),
+        }
+    }
+
+# benchmark_eligibility refuses to run unless this is set.
+ELIGIBILITY_BENCHMARK_DATABASE = True
+# Every synthetic row is evaluated against the rules as loaded at the start.
+ELIGIBILITY_RULE_CACHE_SECONDS = 24 * 60 * 60
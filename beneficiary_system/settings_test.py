@@ -0,0 +1,31 @@
+"""
+Settings for the test suite (`python -m pytest`, see conftest.py).
+
+Tests run against a throwaway in-memory SQLite database.  The core
+migrations patch MySQL deployments (INFORMATION_SCHEMA lookups), so the
+test database is built from the models instead: managed ones by syncdb,
+unmanaged ones by conftest.py.
+"""
+from .settings import *  # noqa: F401,F403
+
+SECRET_KEY = SECRET_KEY or 'test-only'  # noqa: F405
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME':   ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+MIGRATION_MODULES = {'core': None}
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# Queued jobs would never run without a worker.
+ELIGIBILITY_JOBS_ASYNC = False
@@ -0,0 +1,29 @@
+"""
+pytest setup: configure Django against beneficiary_system/settings_test.py
+and build the test database.
+
+Most core models are unmanaged (schema.py / run_setup.py create their tables
+in real deployments), so their tables are created here from the models.
+"""
+import os
+
+import django
+
+os.environ['DJANGO_SETTINGS_MODULE'] = 'beneficiary_system.settings_test'
+os.environ.setdefault('SECRET_KEY', 'test-only')
+
+
+def pytest_configure(config):
+    django.setup()
+
+    from django.apps import apps
+    from django.db import connection
+    from django.test.utils import setup_test_environment
+
+    setup_test_environment()
+    connection.creation.create_test_db(verbosity=0, serialize=False)
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in apps.get_app_config('core').get_models():
+            if not model._meta.managed and model._meta.db_table not in existing:
+                editor.create_model(model)
@@ -1,10 +1,11 @@
 from django.contrib import admin
-from .models import Category, CustomUser, UserCategories, Scheme, UserEligibility, RuleEngine, Application, Grievance
+from .household import check_household_eligibility
+from .models import Category, CustomUser, Household, UserCategories, Scheme, UserEligibility, RuleEngine, Application, Grievance
 
 
 @admin.register(CustomUser)
 class CustomUserAdmin(admin.ModelAdmin):
-    list_display  = ['user_id', 'name', 'email', 'masked_aadhaar', 'gender', 'occupation', 'created_at']
+    list_display  = ['user_id', 'name', 'email', 'masked_aadhaar', 'gender', 'occupation', 'household', 'created_at']
     search_fields = ['name', 'email']
     readonly_fields = ['aadhaar_no', 'created_at']  # Never editable in admin
     list_per_page = 25
@@ -16,6 +17,18 @@ class CustomUserAdmin(admin.ModelAdmin):
         return '—'
 
 
+@admin.register(Household)
+class HouseholdAdmin(admin.ModelAdmin):
+    list_display  = ['household_id', 'name', 'address', 'created_at']
+    search_fields = ['name', 'address']
+    actions       = ['recheck_eligibility']
+
+    @admin.action(description='Re-check eligibility of every member')
+    def recheck_eligibility(self, request, queryset):
+        checked = sum(len(check_household_eligibility(h.household_id)) for h in queryset)
+        self.message_user(request, f'Eligibility re-checked for {checked} member(s).')
+
+
 admin.site.register(Category)
 admin.site.register(UserCategories)
 admin.site.register(Scheme)
@@ -0,0 +1,89 @@
+"""
+Site announcements, served from a process-level cache.
+
+The dashboard banner is shown on every page view but changes about once a
+week.  Each worker keeps the active announcements that have not ended yet
+in memory and picks the one to show by comparing their display windows
+with the clock, so a page view runs no query.
+
+The snapshot is stamped with a version token kept in the Django cache.
+``bump_announcement_version`` (called by the admin create / toggle / delete
+actions) replaces the token, and a worker reloads as soon as its stamp no
+longer matches.  Without a shared CACHES backend the token is per process
+too, so snapshots are also reloaded after ANNOUNCEMENT_CACHE_SECONDS.
+"""
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Announcement
+
+
+VERSION_KEY = 'announcements:version'
+
+
+class Snapshot:
+    __slots__ = ('version', 'loaded_at', 'entries')
+
+    def __init__(self, version, entries):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        # [(starts_at, ends_at, message)], latest start first
+        self.entries = entries
+
+    @classmethod
+    def load(cls, version):
+        try:
+            rows = list(Announcement.objects.filter(is_active=True).filter(
+                Q(ends_at__isnull=True) | Q(ends_at__gt=timezone.now())
+            ).values_list('starts_at', 'ends_at', 'created_at', 'message'))
+        except DatabaseError:
+            # Announcements is created by migrations and may be missing on a
+            # half-set-up database; the banner is cosmetic.
+            rows = []
+        rows.sort(key=lambda r: (r[0] or r[2], r[2]), reverse=True)
+        return cls(version, [(starts_at, ends_at, message) for starts_at, ends_at, _, message in rows])
+
+    def current(self, now):
+        """Message of the announcement showing at ``now``, or None."""
+        for starts_at, ends_at, message in self.entries:
+            if (starts_at is None or starts_at <= now) and (ends_at is None or now < ends_at):
+                return message
+        return None
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def _fresh(snapshot, version):
+    ttl = getattr(settings, 'ANNOUNCEMENT_CACHE_SECONDS', 300)
+    return (snapshot is not None and snapshot.version == version
+            and time.monotonic() - snapshot.loaded_at < ttl)
+
+
+def active_announcement(now=None):
+    """
+    Message of the announcement to show now, or None.  When several are
+    live, the one that started (or was created) last wins.
+    """
+    global _snapshot
+    version = cache.get(VERSION_KEY)
+    snapshot = _snapshot
+    if not _fresh(snapshot, version):
+        with _snapshot_lock:
+            snapshot = _snapshot
+            if not _fresh(snapshot, version):
+                snapshot = _snapshot = Snapshot.load(version)
+    return snapshot.current(now or timezone.now())
+
+
+def bump_announcement_version():
+    """Make every worker reload its snapshot, once the transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, uuid.uuid4().hex, None))
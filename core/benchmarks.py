@@ -0,0 +1,307 @@
+"""
+Eligibility benchmarks over synthetic populations.
+
+``build_population`` recreates the eligibility tables (TABLES) in the
+benchmark database and fills them with seeded random rows.  ``run_suite`` then times each
+eligibility path against that population and returns plain dicts, which
+``manage.py benchmark_eligibility`` writes out as JSON so results from two
+commits can be diffed.
+
+Only run this against the database configured in
+beneficiary_system/settings_benchmark.py: the tables are dropped first.
+"""
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection
+
+from . import eligibility
+from .dashboard import DASHBOARD_QUERY_BUDGET, load_dashboard, query_budget
+from .education import rule_education_level, user_education_level
+from .eligibility_matrix import RuleMatrix, UserColumns, eligible_counts
+from .facets import invalidate_scheme_facets, scheme_facets
+from .gazetteer import DISTRICTS, STATES, district_code
+from .models import (
+    Announcement, Application, Category, CustomUser, Grievance, Household, NearMiss, RuleEngine,
+    Scheme, UserCategories, UserEligibility,
+)
+from .recompute import recompute_users
+from .reverse_eligibility import apply_scheme_eligibility
+from .signature import LRUCache
+
+
+TABLES = (Household, Category, CustomUser, UserCategories, Scheme, RuleEngine, UserEligibility,
+          NearMiss, Application, Grievance, Announcement)
+INSERT_BATCH = 5000
+
+GENDERS = ('Male', 'Female')
+USER_EDUCATION = (None, '10th pass', '12th pass', 'Diploma', 'B.Tech', 'B.Com', 'MBA', 'PhD')
+RULE_EDUCATION = (None, 'Any', '10th', '12th', 'Diploma', 'Graduate', 'Post Graduate')
+
+
+# ── Synthetic data ────────────────────────────────────────────────────────
+def reset_tables():
+    """Drop and recreate the benchmark tables (they are unmanaged elsewhere)."""
+    existing = set(connection.introspection.table_names())
+    with connection.schema_editor() as editor:
+        for model in reversed(TABLES):
+            if model._meta.db_table in existing:
+                editor.delete_model(model)
+        for model in TABLES:
+            editor.create_model(model)
+
+
+def _places():
+    return [(state, name) for state, entries in DISTRICTS.items() for name, _ in entries]
+
+
+def build_population(users, rules=300, categories=12, seed=7):
+    """Fill the benchmark tables; returns the row counts written."""
+    rng = random.Random(seed)
+    reset_tables()
+    places = _places()
+
+    Category.objects.bulk_create(
+        [Category(category_id=c, category_name=f'Category {c}') for c in range(1, categories + 1)]
+    )
+
+    schemes = max(1, rules // 3)
+    scheme_states = [None] * 4 + list(STATES)
+    Scheme.objects.bulk_create([
+        Scheme(scheme_id=s, scheme_name=f'Scheme {s}', eligibility_rules={},
+               target_category_id=rng.randint(1, categories),
+               state=STATES[code][0] if code else None, state_code=code)
+        for s in range(1, schemes + 1)
+        for code in [rng.choice(scheme_states)]
+    ], batch_size=INSERT_BATCH)
+
+    rows = []
+    for rule_id in range(1, rules + 1):
+        state, name = rng.choice(places)
+        location, code = rng.choice([
+            (None, None), (None, None),
+            (STATES[state][0], state),
+            (name, district_code(state, name)),
+        ])
+        education = rng.choice(RULE_EDUCATION)
+        rows.append(RuleEngine(
+            rule_id=rule_id,
+            category_id=rng.randint(1, categories),
+            scheme_id=rng.randint(1, schemes),
+            age_min=rng.choice((None, 14, 18, 21, 25, 40, 60)),
+            age_max=rng.choice((None, None, 35, 45, 59, 80)),
+            gender=rng.choice((None, None, None, 'Male', 'Female')),
+            location=location, location_code=code,
+            min_income=rng.choice((None, None, Decimal('0'))),
+            max_income=rng.choice((None, Decimal('150000'), Decimal('300000'), Decimal('800000'))),
+            pension_status=rng.random() < 0.05,
+            disability_cert=rng.random() < 0.05,
+            unemployment_status=rng.random() < 0.05,
+            education_required=education,
+            education_level=rule_education_level(education),
+            business_turnover_limit=rng.choice((None, None, None, Decimal('2000000'))),
+        ))
+    RuleEngine.objects.bulk_create(rows, batch_size=INSERT_BATCH)
+
+    today = date.today()
+    memberships = 0
+    for start in range(1, users + 1, INSERT_BATCH):
+        batch, links = [], []
+        for user_id in range(start, min(start + INSERT_BATCH, users + 1)):
+            state, name = rng.choice(places)
+            education = rng.choice(USER_EDUCATION)
+            batch.append(CustomUser(
+                user_id=user_id, name=f'User {user_id}',
+                dob=today - timedelta(days=rng.randint(15 * 365, 85 * 365)),
+                gender=rng.choice(GENDERS + (None,)),
+                aadhaar_no=f'{user_id:012d}',
+                address=f'{name}, {STATES[state][0]}',
+                state_code=state, district_code=district_code(state, name),
+                income=Decimal(rng.randrange(0, 1200000)) if rng.random() < 0.9 else None,
+                education=education, education_level=user_education_level(education),
+                pension_status=rng.random() < 0.1,
+                disability_cert=rng.random() < 0.05,
+                unemployment_status=rng.random() < 0.15,
+            ))
+            for category_id in rng.sample(range(1, categories + 1), rng.randint(1, min(3, categories))):
+                links.append(UserCategories(user_id=user_id, category_id=category_id))
+        CustomUser.objects.bulk_create(batch)
+        UserCategories.objects.bulk_create(links)
+        memberships += len(links)
+
+    eligibility.invalidate_rule_cache()
+    invalidate_scheme_facets()
+    return {'users': users, 'user_categories': memberships, 'schemes': schemes,
+            'rules': rules, 'categories': categories}
+
+
+# ── Timing ────────────────────────────────────────────────────────────────
+def summarise(samples, unit_count=None):
+    """
+    Timing stats (seconds in, milliseconds out) for a list of durations.
+    ``per_item_us`` divides by ``unit_count`` (users, scores...) when the
+    calls each cover many items, and by the number of calls otherwise.
+    """
+    samples = sorted(samples)
+    total = sum(samples)
+    unit_count = unit_count or len(samples)
+    return {
+        'calls':     len(samples),
+        'total_s':   round(total, 4),
+        'mean_ms':   round(total / len(samples) * 1000, 4),
+        'median_ms': round(statistics.median(samples) * 1000, 4),
+        'p95_ms':    round(samples[int(0.95 * (len(samples) - 1))] * 1000, 4),
+        'per_item_us': round(total / unit_count * 1e6, 3),
+    }
+
+
+def _time_each(items, fn):
+    samples = []
+    for item in items:
+        started = time.perf_counter()
+        fn(item)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _time_once(fn, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def bench_check_user_eligibility(users, **_):
+    """Full per-user run: load categories, evaluate, upsert User_Eligibility."""
+    return summarise(_time_each(users, eligibility.check_user_eligibility))
+
+
+@contextmanager
+def _memo(rule_set, maxsize):
+    """Give ``rule_set`` a fresh signature memo of ``maxsize`` for the block."""
+    saved, rule_set.memo = rule_set.memo, LRUCache(maxsize)
+    try:
+        yield rule_set.memo
+    finally:
+        rule_set.memo = saved
+
+
+def bench_evaluate(users, categories, rule_set, **_):
+    """In-memory engine only: deciding rules and predicates, no writes, no memo."""
+    profiles = [(eligibility.Profile.from_user(u), categories.get(u.user_id, ())) for u in users]
+    with _memo(rule_set, 0):
+        return summarise(_time_each(profiles, lambda p: eligibility.evaluate(p[0], p[1], rule_set)))
+
+
+def bench_memoised_evaluate(users, categories, rule_set, **_):
+    """evaluate_scored through a cold signature memo (core/signature.py)."""
+    profiles = [(eligibility.Profile.from_user(u), categories.get(u.user_id, ())) for u in users]
+    with _memo(rule_set, getattr(settings, 'ELIGIBILITY_MEMO_SIZE', 4096) or 4096) as memo:
+        stats = summarise(_time_each(
+            profiles, lambda p: eligibility.evaluate_scored(p[0], p[1], rule_set)))
+        stats['hit_rate'] = round(memo.hits / max(1, memo.hits + memo.misses), 4)
+    return stats
+
+
+def bench_eligible_schemes(users, categories, rule_set, **_):
+    """Eligible schemes only, through the rule index (core/rule_index.py)."""
+    rule_set.index
+    profiles = [(eligibility.Profile.from_user(u), categories.get(u.user_id, ())) for u in users]
+    return summarise(_time_each(
+        profiles, lambda p: eligibility.eligible_schemes(p[0], p[1], rule_set)))
+
+
+def bench_match_scores(users, categories, rule_set, **_):
+    """Match scores for every scheme in the user's categories (was _calculate_match_score)."""
+    work = []
+    for user in users:
+        scheme_ids = eligibility.deciding_rules(categories.get(user.user_id, ()), rule_set)
+        work.append((eligibility.Profile.from_user(user), list(scheme_ids)))
+    return summarise(
+        _time_each(work, lambda w: eligibility.match_scores(w[0], w[1], rule_set)),
+        unit_count=sum(len(w[1]) for w in work),
+    )
+
+
+def bench_recompute_users(users, **_):
+    """Chunked batch recompute, as run by recompute_eligibility."""
+    user_ids = [u.user_id for u in users]
+    return summarise(_time_once(lambda: recompute_users(user_ids)), unit_count=len(user_ids))
+
+
+def bench_population_counts(population, **_):
+    """NumPy broadcast over the whole population (core/eligibility_matrix.py)."""
+    rules = RuleMatrix.from_rule_set()
+    users = UserColumns.load(rules)
+    return summarise(_time_once(lambda: eligible_counts(rules=rules, users=users)),
+                     unit_count=population['users'])
+
+
+def bench_reverse_query(scheme_ids, **_):
+    """Set-based reverse query and bulk upsert for single schemes."""
+    return summarise(_time_each(scheme_ids, apply_scheme_eligibility))
+
+
+def bench_dashboard(users, **_):
+    """
+    Dashboard data for each user (core/dashboard.py), with and without a
+    filter, on a warm facet cache.  Raises QueryBudgetExceeded if any load
+    needs more than DASHBOARD_QUERY_BUDGET queries.
+    """
+    counts = []
+    scheme_facets()
+
+    def load(user):
+        for search in ('', 'Scheme 1'):
+            with query_budget(DASHBOARD_QUERY_BUDGET, f'dashboard of user {user.user_id}',
+                              strict=True) as queries:
+                load_dashboard(user, search_q=search)
+            counts.append(len(queries))
+
+    stats = summarise(_time_each(users, load))
+    stats['max_queries'] = max(counts, default=0)
+    return stats
+
+
+SCENARIOS = {
+    'check_user_eligibility': bench_check_user_eligibility,
+    'evaluate':               bench_evaluate,
+    'memoised_evaluate':      bench_memoised_evaluate,
+    'eligible_schemes':       bench_eligible_schemes,
+    'match_scores':           bench_match_scores,
+    'recompute_users':        bench_recompute_users,
+    'population_counts':      bench_population_counts,
+    'reverse_query':          bench_reverse_query,
+    'dashboard':              bench_dashboard,
+}
+
+
+def run_suite(population, sample=200, schemes=5, scenarios=None, seed=7):
+    """
+    Time ``scenarios`` (default: all) on ``sample`` random users of the
+    population built by ``build_population``.  Returns {scenario: stats}.
+    """
+    rng = random.Random(seed)
+    user_ids = rng.sample(range(1, population['users'] + 1), min(sample, population['users']))
+    users = list(CustomUser.objects.filter(user_id__in=user_ids).order_by('user_id'))
+    categories = {}
+    for user_id, category_id in UserCategories.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', 'category_id'):
+        categories.setdefault(user_id, []).append(category_id)
+    context = {
+        'population': population,
+        'users':      users,
+        'categories': categories,
+        'rule_set':   eligibility.get_rule_set(),
+        'scheme_ids': rng.sample(range(1, population['schemes'] + 1),
+                                 min(schemes, population['schemes'])),
+    }
+    return {name: SCENARIOS[name](**context) for name in (scenarios or SCENARIOS)}
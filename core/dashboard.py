@@ -0,0 +1,248 @@
+"""
+User dashboard data in a fixed number of queries.
+
+``load_dashboard`` assembles everything dashboard.html shows from
+DASHBOARD_QUERY_BUDGET queries, however many schemes the user is eligible
+for, reading ``values()`` projections instead of model instances:
+
+1. the first page of the user's Eligible rows that pass the search / state /
+   type filters, joined to their schemes (``eligible_page``);
+2. one summary row on Users: eligible (total and filtered), category,
+   application and grievance counts as scalar subqueries;
+3. the five most recent searches;
+4. the four most recent applications;
+5. the user's near misses.
+
+The state and benefit type filters come from the cached scheme facets
+(core/facets.py), so a load does not scan the catalog; only a cold cache
+costs the one grouped query that rebuilds them.
+
+The announcement banner is not part of it (core/announcements.py); the
+sections rendered from this data are cached per user
+(core/dashboard_cache.py).
+
+Match scores missing from rows written before the engine stored them are
+computed in memory from the cached RuleSet, after the budgeted block.
+
+Further pages are fetched by keyset: rows are ordered by the sort column
+and eligibility_id, both descending, and a page's cursor is the last row's
+(value, eligibility_id), so every page is one LIMITed range read off the
+User_Eligibility (user_id, eligibility_status, <column>) indexes rather
+than an OFFSET over everything before it.
+
+``query_budget`` counts the queries run inside it with a connection execute
+wrapper.  Going over raises QueryBudgetExceeded when ``strict`` (by default
+when DEBUG is on) and warns otherwise.
+"""
+import base64
+import json
+import warnings
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .eligibility import ELIGIBLE, Profile, match_scores
+from .facets import scheme_facets
+from .gazetteer import state_code
+from .models import (
+    Application, CustomUser, Grievance, NearMiss, UserCategories, UserEligibility,
+)
+
+
+DASHBOARD_QUERY_BUDGET = 5
+
+# Sort choices for the eligible list: most recently changed status first,
+# or best match first.  Both columns are nullable; a plain DESC puts NULLs
+# last on MySQL and SQLite, which the cursor condition below relies on.
+SORTS = {
+    'recent': 'status_changed_on',
+    'score':  'match_score',
+}
+DEFAULT_SORT = 'recent'
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """A block ran more queries than its budget allows."""
+
+
+class InvalidCursor(ValueError):
+    """A page cursor that was not produced by ``eligible_page``."""
+
+
+@contextmanager
+def query_budget(limit, label, strict=None):
+    """Count the queries run in the block and enforce ``limit`` on exit."""
+    if strict is None:
+        strict = settings.DEBUG
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        yield queries
+    if len(queries) > limit:
+        message = f'{label} ran {len(queries)} queries (budget {limit})'
+        if strict:
+            raise QueryBudgetExceeded(message)
+        warnings.warn(message, RuntimeWarning)
+
+
+def _filters(search_q, filter_state, filter_type):
+    """The dashboard's search / state / type filters as one Q, or None."""
+    q = Q()
+    if search_q:
+        q &= (Q(scheme__scheme_name__icontains=search_q)
+              | Q(scheme__description__icontains=search_q)
+              | Q(scheme__benefits__icontains=search_q))
+    if filter_state:
+        code = state_code(filter_state)
+        q &= Q(scheme__state_code=code) if code else Q(scheme__state__iexact=filter_state)
+    if filter_type:
+        q &= Q(scheme__benefit_type__iexact=filter_type)
+    return q or None
+
+
+def _count(model, *conditions, **filters):
+    """Scalar subquery counting ``model`` rows of the outer Users row."""
+    return Coalesce(Subquery(
+        model.objects.filter(*conditions, user_id=OuterRef('user_id'), **filters)
+        .order_by().values('user_id').annotate(n=Count('pk')).values('n'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def _summary(user_id, shown=None):
+    counts = {
+        'total_eligible':     _count(UserEligibility, eligibility_status=ELIGIBLE),
+        'total_categories':   _count(UserCategories),
+        'total_applications': _count(Application),
+        'total_grievances':   _count(Grievance),
+    }
+    if shown is not None:
+        counts['total_shown'] = _count(UserEligibility, shown, eligibility_status=ELIGIBLE)
+    return CustomUser.objects.filter(user_id=user_id).values(**counts).get()
+
+
+def encode_cursor(sort, row):
+    value = row[SORTS[sort]]
+    if value is not None and sort == 'recent':
+        value = value.isoformat()
+    raw = json.dumps([sort, value, row['eligibility_id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(sort, cursor):
+    """(value, eligibility_id) from ``encode_cursor``; InvalidCursor if not."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, value, eligibility_id = json.loads(raw)
+        if cursor_sort != sort or not isinstance(eligibility_id, int):
+            raise ValueError
+        if value is not None:
+            value = parse_datetime(value) if sort == 'recent' else int(value)
+            if value is None:
+                raise ValueError
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid page cursor') from None
+    return value, eligibility_id
+
+
+def _after(column, value, eligibility_id):
+    """Rows after (value, eligibility_id) in ``column`` DESC NULLS LAST, pk DESC order."""
+    if value is None:
+        return Q(**{f'{column}__isnull': True, 'eligibility_id__lt': eligibility_id})
+    return (Q(**{f'{column}__lt': value})
+            | Q(**{column: value, 'eligibility_id__lt': eligibility_id})
+            | Q(**{f'{column}__isnull': True}))
+
+
+def eligible_page(user_id, search_q='', filter_state='', filter_type='',
+                  sort=DEFAULT_SORT, cursor=None, page_size=None):
+    """
+    One page of the user's Eligible rows passing the filters, as
+    ``values()`` dicts with the scheme fields, plus the cursor of the next
+    page (None on the last one).  One query.  Scores are not filled in.
+    """
+    if sort not in SORTS:
+        sort = DEFAULT_SORT
+    if page_size is None:
+        page_size = getattr(settings, 'DASHBOARD_PAGE_SIZE', 20)
+    column = SORTS[sort]
+    eligible = UserEligibility.objects.filter(user_id=user_id, eligibility_status=ELIGIBLE)
+    shown = _filters(search_q, filter_state, filter_type)
+    if shown is not None:
+        eligible = eligible.filter(shown)
+    if cursor:
+        eligible = eligible.filter(_after(column, *decode_cursor(sort, cursor)))
+    rows = list(eligible.order_by(F(column).desc(), '-eligibility_id').values(
+        'eligibility_id', 'scheme_id', 'reason', 'match_score', 'status_changed_on',
+        scheme_name=F('scheme__scheme_name'), description=F('scheme__description'),
+        state=F('scheme__state'), benefit_type=F('scheme__benefit_type'),
+    )[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(sort, rows[-1])
+    return rows, next_cursor
+
+
+def fill_scores(user, rows):
+    """Set ``row['score']``, computing any match_score the row lacks."""
+    missing = [row['scheme_id'] for row in rows if row['match_score'] is None]
+    scores = match_scores(Profile.from_user(user), missing) if missing else {}
+    for row in rows:
+        row['score'] = row['match_score'] if row['match_score'] is not None else scores[row['scheme_id']]
+    return rows
+
+
+def load_dashboard(user, search_q='', filter_state='', filter_type='', sort=DEFAULT_SORT,
+                   strict=None):
+    """Context for dashboard.html, in at most DASHBOARD_QUERY_BUDGET queries."""
+    with query_budget(DASHBOARD_QUERY_BUDGET, 'dashboard', strict):
+        eligible_schemes, next_cursor = eligible_page(
+            user.user_id, search_q, filter_state, filter_type, sort)
+
+        summary = _summary(user.user_id, _filters(search_q, filter_state, filter_type))
+
+        past_categories = list(UserCategories.objects.filter(
+            user_id=user.user_id,
+        ).order_by('-user_cat_id').values(
+            'user_cat_id', category_name=F('category__category_name'),
+        )[:5])
+
+        applications = list(Application.objects.filter(
+            user_id=user.user_id,
+        ).order_by('-applied_on').values(
+            'status', 'applied_on', scheme_name=F('scheme__scheme_name'),
+        )[:4])
+
+        near_misses = list(NearMiss.objects.filter(
+            user_id=user.user_id,
+        ).order_by('relative_gap', 'scheme_id').values(
+            'scheme_id', 'message', scheme_name=F('scheme__scheme_name'),
+        ))
+
+    fill_scores(user, eligible_schemes)
+    facets = scheme_facets()
+
+    return {
+        'eligible_schemes':   eligible_schemes,
+        'next_cursor':        next_cursor,
+        'sort':               sort if sort in SORTS else DEFAULT_SORT,
+        'total_eligible':     summary['total_eligible'],
+        'total_shown':        summary.get('total_shown', summary['total_eligible']),
+        'total_categories':   summary['total_categories'],
+        'total_applications': summary['total_applications'],
+        'total_grievances':   summary['total_grievances'],
+        'past_categories':    past_categories,
+        'applications':       applications,
+        'near_misses':        near_misses,
+        'states':             facets['states'],
+        'benefit_types':      facets['benefit_types'],
+    }
@@ -0,0 +1,97 @@
+"""
+Versioned cache of the rendered dashboard sections.
+
+The part of the dashboard built from the user's data (stats cards, eligible
+schemes, applications, near misses, past searches) is rendered once and
+stored in the Django cache under the user's version token, the shared
+catalog version token and a digest of the filters it was rendered with.
+
+Writes drop the version token of whoever they affect:
+
+* eligibility and near-miss writes (``sync_rows``, ``save_near_misses``)
+  drop the users whose rows changed, so every recompute path is covered;
+* applications, grievances, search categories and profile edits drop their
+  user (core/signals.py);
+* scheme and rule edits drop the catalog version, which every entry
+  depends on.  A hit therefore also means the user's results cannot be
+  stale against the rules, so the dashboard skips ``refresh_if_stale``.
+
+The next visit creates a fresh token, so entries rendered earlier are never
+read again and expire on their own.  A render that races a write keeps the
+token it started with and is likewise never read.  Tokens are dropped on
+commit, once the new data is visible to that next render.
+
+Skipping ``refresh_if_stale`` is only safe when every worker sees the same
+tokens, so sections are cached only with a shared CACHES backend.  With the
+default per-process LocMemCache the dashboard renders on every visit.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+
+CATALOG = 'catalog'
+
+# Backends whose entries live inside one process.
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def section_cache_seconds():
+    """How long rendered sections are kept: 0 (off) without a shared cache."""
+    if settings.CACHES['default']['BACKEND'] in PROCESS_LOCAL_BACKENDS:
+        return 0
+    return getattr(settings, 'DASHBOARD_CACHE_SECONDS', 120)
+
+
+def _version_key(owner):
+    return f'dashboard:version:{owner}'
+
+
+def dashboard_versions(user_id):
+    """(user token, catalog token), creating whichever is missing."""
+    keys = [_version_key(user_id), _version_key(CATALOG)]
+    found = cache.get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return found[keys[0]], found[keys[1]]
+
+
+def _sections_key(user_id, versions, variant):
+    digest = hashlib.sha1(repr(variant).encode()).hexdigest()[:16]
+    return f'dashboard:sections:{user_id}:{versions[0]}:{versions[1]}:{digest}'
+
+
+def cached_sections(user_id, variant):
+    """The rendered sections for ``variant`` at the current versions, or None."""
+    if not section_cache_seconds():
+        return None
+    return cache.get(_sections_key(user_id, dashboard_versions(user_id), variant))
+
+
+def store_sections(user_id, versions, variant, html):
+    """Cache ``html`` rendered from data read at ``versions``."""
+    timeout = section_cache_seconds()
+    if timeout:
+        cache.set(_sections_key(user_id, versions, variant), html, timeout)
+
+
+def _drop(*owners):
+    keys = [_version_key(owner) for owner in owners if owner is not None]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def bump_dashboard_version(*user_ids):
+    _drop(*set(user_ids))
+
+
+def bump_catalog_version():
+    _drop(CATALOG)
@@ -0,0 +1,52 @@
+"""
+Education level classification shared by the eligibility engine, the
+model save hooks, Load.py and the backfill command.
+
+Levels: 0 none/unknown, 1 10th, 2 12th, 3 diploma, 4 graduate,
+5 post-graduate, 6 PhD.  The keyword tables are the LIKE cascades from the
+``check_user_eligibility`` procedure; they are checked top-down and the
+first level with a matching keyword wins.  Kept free of Django imports so
+standalone scripts can use it.
+"""
+
+USER_EDUCATION_KEYWORDS = [
+    (6, ('phd',)),
+    (5, ('postgrad', 'post grad', 'post-grad', 'm.tech', 'mtech', 'mba', 'masters', 'm.sc')),
+    (4, ('graduat', 'b.tech', 'btech', 'b.sc', 'b.com', 'b.a', 'degree')),
+    (3, ('diploma', 'polytechnic')),
+    (2, ('12', 'hsc', 'higher secondary', 'plus two', 'intermediate')),
+    (1, ('10', 'sslc', 'matric', 'secondary')),
+]
+RULE_EDUCATION_KEYWORDS = [
+    (6, ('phd',)),
+    (5, ('postgrad', 'post grad', 'post-grad', 'masters')),
+    (4, ('graduat', 'degree')),
+    (3, ('diploma', 'polytechnic')),
+    (2, ('12', 'hsc', 'higher secondary', '12th pass', 'intermediate')),
+    (1, ('10', 'sslc', 'matric', 'secondary')),
+]
+
+
+def _education_level(text, table):
+    if not text:
+        return 0
+    text = text.lower()
+    for level, keywords in table:
+        if any(k in text for k in keywords):
+            return level
+    return 0
+
+
+def user_education_level(text):
+    """Map a free-text Users.education value to a 0-6 level."""
+    return _education_level(text, USER_EDUCATION_KEYWORDS)
+
+
+def rule_education_level(text):
+    """
+    Minimum level a Rule_Engine.education_required value demands.  'Any'
+    and blank mean no requirement (0), which every user satisfies.
+    """
+    if not text or text.upper() == 'ANY':
+        return 0
+    return _education_level(text, RULE_EDUCATION_KEYWORDS)
@@ -0,0 +1,799 @@
+"""
+In-process eligibility engine.
+
+Replaces the row-by-row ``check_user_eligibility`` stored procedure (see
+schema.py).  Rule_Engine rows are loaded once per process, compiled into
+small predicate closures grouped by category, and every user is evaluated
+against them in memory.  Results, together with each scheme's match score,
+are written back to User_Eligibility in a single bulk upsert, so the same
+code path works on MySQL and SQLite and pages can read scores without
+touching Rule_Engine.
+
+Status / reason strings are kept byte-for-byte identical to the procedure,
+including its NULL semantics (a missing gender, income or address never
+fails a rule; a missing education counts as level 0).  Locations are
+compared as gazetteer codes (core/gazetteer.py) rather than with the
+procedure's ``address LIKE '%location%'``, falling back to the substring
+test only for rule locations the gazetteer does not know.  A scheme's
+``eligibility_rules`` expression (core/scheme_rules.py) is compiled along
+with its rules and tested after their own criteria.  Full evaluations are
+memoised per canonical profile signature (core/signature.py), so profiles
+on the same side of every rule threshold are evaluated once per RuleSet.
+Every run also refreshes the user's Near_Misses (core/near_miss.py).
+
+Every rule or scheme edit bumps its category's ``rules_version``.  A full
+check records the versions it was computed against on the user's
+UserCategories rows, and ``refresh_if_stale`` recomputes a user only when
+one of those versions is behind, so rule changes cost nothing for users who
+never come back.
+
+``simulate`` runs the same evaluation for a hypothetical profile without
+writing anything, for the "what-if" API.
+"""
+import copy
+import heapq
+import threading
+import time
+from datetime import date
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .dashboard_cache import bump_dashboard_version
+from .education import rule_education_level, user_education_level
+from .gazetteer import location_code, parse_address
+from .models import Category, RuleEngine, UserCategories, UserEligibility
+from .near_miss import near_misses, save_near_misses
+from .rule_index import RuleIndex
+from .scheme_rules import scheme_programs
+from .signature import LRUCache, SignatureSpace
+
+
+ELIGIBLE     = 'Eligible'
+NOT_ELIGIBLE = 'Not Eligible'
+MATCHED_ALL  = 'Matched all eligibility criteria'
+
+# Criteria in the order the procedure's IF/ELSEIF chain tests them, then
+# the scheme's own eligibility_rules expression (core/scheme_rules.py).
+CRITERIA = ('age_min', 'age_max', 'gender', 'income', 'location', 'education', 'rules')
+
+# The CustomUser field each criterion reads.  A profile edit that touches
+# none of these cannot change anybody's eligibility.
+CRITERION_FIELDS = {
+    'age_min':   'dob',
+    'age_max':   'dob',
+    'gender':    'gender',
+    'income':    'income',
+    'location':  'address',
+    'education': 'education',
+}
+
+# Bits of User_Eligibility.criteria_mask: bit i is set when the deciding
+# rule sets MASK_CRITERIA[i], bit i + PASSED_SHIFT when the user meets it.
+MASK_CRITERIA = ('age', 'gender', 'income', 'location', 'education',
+                 'pension', 'disability', 'unemployment', 'turnover', 'rules')
+MASK_BIT      = {name: 1 << i for i, name in enumerate(MASK_CRITERIA)}
+PASSED_SHIFT  = 16
+CRITERION_BIT = {
+    'age_min':   MASK_BIT['age'],
+    'age_max':   MASK_BIT['age'],
+    'gender':    MASK_BIT['gender'],
+    'income':    MASK_BIT['income'],
+    'location':  MASK_BIT['location'],
+    'education': MASK_BIT['education'],
+    'rules':     MASK_BIT['rules'],
+}
+
+# Rule_Engine's flag criteria and the CustomUser field each reads.  Like the
+# stored procedure, they do not decide the status; they are only recorded
+# in the mask.
+FLAG_FIELDS = {
+    'pension':      'pension_status',
+    'disability':   'disability_cert',
+    'unemployment': 'unemployment_status',
+    'turnover':     'business_turnover',
+}
+
+ELIGIBILITY_FIELDS = frozenset(CRITERION_FIELDS.values()) | frozenset(FLAG_FIELDS.values())
+
+MASK_LABELS = {
+    'age':          'Age',
+    'gender':       'Gender',
+    'income':       'Annual income',
+    'location':     'Location',
+    'education':    'Education',
+    'pension':      'Pension status',
+    'disability':   'Disability certificate',
+    'unemployment': 'Unemployment status',
+    'turnover':     'Business turnover',
+    'rules':        'Scheme rules',
+}
+
+# Match score for a scheme with no rules / with rules but nothing to score.
+SCORE_NO_RULES    = 75
+SCORE_NO_CRITERIA = 80
+
+
+def age_on(dob, today=None):
+    """Whole years between ``dob`` and ``today`` (TIMESTAMPDIFF(YEAR, ...))."""
+    today = today or date.today()
+    return today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
+
+
+# ── Profile snapshot ──────────────────────────────────────────────────────
+class Profile:
+    """The eligibility-relevant slice of a CustomUser, pre-normalised once."""
+    __slots__ = ('user_id', 'age', 'gender', 'income', 'address', 'locations',
+                 'education_level', 'pension_status', 'disability_cert',
+                 'unemployment_status', 'business_turnover')
+
+    def __init__(self, user_id, age, gender, income, address, education_level,
+                 locations=frozenset(), pension_status=False, disability_cert=False,
+                 unemployment_status=False, business_turnover=None):
+        self.user_id             = user_id
+        self.age                 = age
+        self.gender              = gender
+        self.income              = income
+        self.address             = address
+        self.locations           = locations
+        self.education_level     = education_level
+        self.pension_status      = pension_status
+        self.disability_cert     = disability_cert
+        self.unemployment_status = unemployment_status
+        self.business_turnover   = business_turnover
+
+    @staticmethod
+    def location_codes(user):
+        """The user's {state_code, district_code}, parsing if not yet stored."""
+        codes = (user.state_code, user.district_code)
+        if codes == (None, None) and user.address:
+            codes = parse_address(user.address)
+        return frozenset(c for c in codes if c)
+
+    @classmethod
+    def from_user(cls, user, today=None):
+        return cls(
+            user_id=user.user_id,
+            age=age_on(user.dob, today),
+            gender=user.gender.lower() if user.gender is not None else None,
+            income=user.income,
+            address=user.address.lower() if user.address is not None else None,
+            locations=cls.location_codes(user),
+            education_level=(user.education_level if user.education_level is not None
+                             else user_education_level(user.education)),
+            pension_status=bool(user.pension_status),
+            disability_cert=bool(user.disability_cert),
+            unemployment_status=bool(user.unemployment_status),
+            business_turnover=user.business_turnover,
+        )
+
+
+# ── Rule compilation ──────────────────────────────────────────────────────
+class CompiledRule:
+    """
+    One Rule_Engine row turned into an ordered tuple of (criterion,
+    predicate, reason) triples.  Only the criteria the rule actually sets are
+    compiled in, in the same order as the procedure's IF/ELSEIF chain, so the
+    first failing predicate yields the same reason the procedure would have
+    written.  ``flag_checks`` are the Rule_Engine flags that only feed the
+    criteria mask (``present`` holds their bits and the checks' bits),
+    ``score_checks`` are the match-score criteria, ``fields`` and
+    ``score_fields`` list the profile fields each depends on, and the source
+    row is kept for vectorised consumers.  ``program`` is the scheme's
+    compiled eligibility_rules expression, if any, checked last.
+    """
+    __slots__ = ('rule_id', 'scheme_id', 'category_id', 'checks', 'flag_checks',
+                 'present', 'fields', 'score_checks', 'score_fields', 'row', 'program')
+
+    def __init__(self, row, program=None):
+        self.rule_id      = row['rule_id']
+        self.scheme_id    = row['scheme_id']
+        self.category_id  = row['category_id']
+        self.program      = program
+        self.checks       = tuple(self._compile(row))
+        if program is not None:
+            self.checks  += (('rules', program.test, program.reason),)
+        self.flag_checks  = tuple(self._compile_flags(row))
+        self.present      = 0
+        for criterion, _, _ in self.checks:
+            self.present |= CRITERION_BIT[criterion]
+        for criterion, _ in self.flag_checks:
+            self.present |= MASK_BIT[criterion]
+        self.fields       = frozenset(
+            [CRITERION_FIELDS[c] for c, _, _ in self.checks if c != 'rules']
+            + [FLAG_FIELDS[c] for c, _ in self.flag_checks]
+        ).union(program.fields if program is not None else ())
+        score             = tuple(self._compile_score(row))
+        self.score_checks = tuple(check for _, check in score)
+        self.score_fields = frozenset(field for field, _ in score)
+        self.row          = row
+
+    @staticmethod
+    def _compile(row):
+        age_min = row['age_min']
+        if age_min is not None:
+            yield ('age_min', lambda p: p.age >= age_min,
+                   f'Minimum age required: {age_min} years')
+
+        age_max = row['age_max']
+        if age_max is not None:
+            yield ('age_max', lambda p: p.age <= age_max,
+                   f'Maximum age allowed: {age_max} years')
+
+        gender = row['gender']
+        if gender:
+            wanted = gender.lower()
+            yield ('gender', lambda p: p.gender is None or p.gender == wanted,
+                   f'Scheme is for {gender} only')
+
+        max_income = row['max_income']
+        if max_income is not None:
+            yield ('income', lambda p: p.income is None or p.income <= max_income,
+                   f'Annual income must be <= Rs.{max_income:.2f}')
+
+        location = row['location']
+        if location:
+            code = row.get('location_code') or location_code(location)
+            if code:
+                yield ('location', lambda p: p.address is None or code in p.locations,
+                       f'Available only in {location}')
+            else:
+                needle = location.lower()
+                yield ('location', lambda p: p.address is None or needle in p.address,
+                       f'Available only in {location}')
+
+        edu_req = row['education_required']
+        if edu_req and edu_req.upper() != 'ANY':
+            required = rule_education_level(edu_req)
+            yield ('education', lambda p: p.education_level >= required,
+                   f'Required education: {edu_req}')
+
+    @staticmethod
+    def _compile_flags(row):
+        # Rule and user flag columns share their names.
+        for criterion in ('pension', 'disability', 'unemployment'):
+            field = FLAG_FIELDS[criterion]
+            if row[field]:
+                yield criterion, lambda p, field=field: getattr(p, field)
+
+        limit = row['business_turnover_limit']
+        if limit is not None:
+            yield 'turnover', lambda p: p.business_turnover is None or p.business_turnover <= limit
+
+    @staticmethod
+    def _compile_score(row):
+        """
+        (field, predicate) pairs for the match score: the age band, gender
+        and income band.  Unlike eligibility, a missing gender never matches
+        and a missing income counts as 0.
+        """
+        age_min, age_max = row['age_min'], row['age_max']
+        if age_min is not None or age_max is not None:
+            yield 'dob', lambda p: ((age_min is None or p.age >= age_min)
+                                    and (age_max is None or p.age <= age_max))
+
+        gender = row['gender']
+        if gender:
+            wanted = gender.lower()
+            if wanted in ('any', 'all'):
+                yield 'gender', lambda p: True
+            else:
+                yield 'gender', lambda p: p.gender == wanted
+
+        min_income, max_income = row['min_income'], row['max_income']
+        if min_income is not None or max_income is not None:
+            def income_ok(p):
+                income = p.income or 0
+                return ((min_income is None or income >= min_income)
+                        and (max_income is None or income <= max_income))
+            yield 'income', income_ok
+
+    def evaluate(self, profile):
+        """(status, reason, criteria_mask) for ``profile``."""
+        reason = None
+        failed = 0
+        for criterion, check, text in self.checks:
+            if not check(profile):
+                failed |= CRITERION_BIT[criterion]
+                if reason is None:
+                    reason = text
+        for criterion, check in self.flag_checks:
+            if not check(profile):
+                failed |= MASK_BIT[criterion]
+        mask = self.present | (self.present & ~failed) << PASSED_SHIFT
+        if reason is None:
+            return ELIGIBLE, MATCHED_ALL, mask
+        return NOT_ELIGIBLE, reason, mask
+
+
+RULE_FIELDS = (
+    'rule_id', 'scheme_id', 'category_id', 'age_min', 'age_max', 'gender',
+    'location', 'location_code', 'min_income', 'max_income', 'education_required',
+    'education_level', 'pension_status', 'disability_cert', 'unemployment_status',
+    'business_turnover_limit',
+)
+
+
+class RuleSet:
+    """
+    All compiled rules, bucketed by category and by scheme and sorted by
+    rule_id.  ``score_fields`` maps each scheme to the profile fields its
+    match score reads; ``index`` is the RuleIndex over them and
+    ``signatures`` the SignatureSpace for memoised evaluation, both built
+    on first use, and ``memo`` caches results per signature.  ``versions``
+    holds each category's rules_version as of loading.
+    """
+
+    def __init__(self, rules, versions=None):
+        self.versions = versions or {}
+        self.by_category = {}
+        self.by_scheme = {}
+        for rule in rules:
+            self.by_category.setdefault(rule.category_id, []).append(rule)
+            self.by_scheme.setdefault(rule.scheme_id, []).append(rule)
+        for bucket in (*self.by_category.values(), *self.by_scheme.values()):
+            bucket.sort(key=attrgetter('rule_id'))
+        self.score_fields = {
+            scheme_id: frozenset().union(*(r.score_fields for r in bucket))
+            for scheme_id, bucket in self.by_scheme.items()
+        }
+        self._index = None
+        self._signatures = None
+        self.memo = LRUCache(getattr(settings, 'ELIGIBILITY_MEMO_SIZE', 4096))
+        self.loaded_at = time.monotonic()
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = RuleIndex(self.by_category)
+        return self._index
+
+    @property
+    def signatures(self):
+        if self._signatures is None:
+            self._signatures = SignatureSpace(self.by_category)
+        return self._signatures
+
+    @classmethod
+    def load(cls):
+        # Versions first: an edit landing mid-load then looks newer than us.
+        versions = dict(Category.objects.values_list('category_id', 'rules_version'))
+        programs = scheme_programs()
+        rows = RuleEngine.objects.values(*RULE_FIELDS)
+        return cls((CompiledRule(row, programs.get(row['scheme_id'])) for row in rows), versions)
+
+    def __len__(self):
+        return sum(len(b) for b in self.by_category.values())
+
+    def rules_for(self, category_ids):
+        """Rules for the given categories, in rule_id order (cursor order)."""
+        buckets = [self.by_category[c] for c in set(category_ids) if c in self.by_category]
+        if len(buckets) == 1:
+            return iter(buckets[0])
+        return heapq.merge(*buckets, key=attrgetter('rule_id'))
+
+
+_rule_set = None
+_rule_set_lock = threading.Lock()
+
+
+def get_rule_set():
+    """Return the process-wide RuleSet, (re)loading it when stale."""
+    global _rule_set
+    ttl = getattr(settings, 'ELIGIBILITY_RULE_CACHE_SECONDS', 300)
+    rs = _rule_set
+    if rs is not None and time.monotonic() - rs.loaded_at < ttl:
+        return rs
+    with _rule_set_lock:
+        rs = _rule_set
+        if rs is None or time.monotonic() - rs.loaded_at >= ttl:
+            rs = _rule_set = RuleSet.load()
+    return rs
+
+
+def invalidate_rule_cache():
+    """Drop the cached RuleSet; the next evaluation reloads Rule_Engine."""
+    global _rule_set
+    with _rule_set_lock:
+        _rule_set = None
+
+
+# ── Evaluation ────────────────────────────────────────────────────────────
+def deciding_rules(category_ids, rule_set=None):
+    """
+    {scheme_id: rule} for the rule that decides each scheme.  When several
+    rules target the same scheme the highest rule_id wins, as with the
+    procedure's upsert, so the earlier ones never need evaluating.
+    """
+    rule_set = rule_set or get_rule_set()
+    return {rule.scheme_id: rule for rule in rule_set.rules_for(category_ids)}
+
+
+def _evaluate(profile, category_ids, rule_set):
+    results = {
+        scheme_id: rule.evaluate(profile)
+        for scheme_id, rule in deciding_rules(category_ids, rule_set).items()
+    }
+    return results, match_scores(profile, results, rule_set)
+
+
+def _memoised(profile, category_ids, rule_set):
+    """(results, scores), shared by every profile with the same signature."""
+    if rule_set.memo.maxsize <= 0:
+        return _evaluate(profile, category_ids, rule_set)
+    key = rule_set.signatures.signature(profile, category_ids)
+    cached = rule_set.memo.get(key)
+    if cached is None:
+        cached = _evaluate(profile, category_ids, rule_set)
+        rule_set.memo.put(key, cached)
+    return cached
+
+
+def evaluate(profile, category_ids, rule_set=None):
+    """
+    Evaluate ``profile`` against the rules in ``category_ids``.
+    Returns {scheme_id: (status, reason, criteria_mask)}.
+    """
+    rule_set = rule_set or get_rule_set()
+    return dict(_memoised(profile, category_ids, rule_set)[0])
+
+
+def evaluate_scored(profile, category_ids, rule_set=None):
+    """``evaluate`` plus the match score of every scheme it returns."""
+    rule_set = rule_set or get_rule_set()
+    results, scores = _memoised(profile, category_ids, rule_set)
+    return dict(results), dict(scores)
+
+
+def eligible_schemes(profile, category_ids, rule_set=None):
+    """
+    The Eligible part of ``evaluate``, found through the rule index instead
+    of a scan of every rule in ``category_ids``; every scheme missing from
+    the result is Not Eligible.
+    """
+    rule_set = rule_set or get_rule_set()
+    results = {}
+    for rule in rule_set.index.candidates(profile, category_ids):
+        outcome = rule.evaluate(profile)
+        if outcome[0] == ELIGIBLE:
+            results[rule.scheme_id] = outcome
+    return results
+
+
+def unpack_mask(mask):
+    """
+    (present, passed) tuples of MASK_CRITERIA names for a criteria_mask, so
+    explanations need neither Rule_Engine nor the profile.
+    """
+    present = tuple(c for c in MASK_CRITERIA if mask & MASK_BIT[c])
+    passed = tuple(c for c in present if mask >> PASSED_SHIFT & MASK_BIT[c])
+    return present, passed
+
+
+def mask_checklist(mask):
+    """[(label, passed)] for every criterion a stored criteria_mask records."""
+    present, passed = unpack_mask(mask)
+    return [(MASK_LABELS[c], c in passed) for c in present]
+
+
+def score_rules(profile, rules):
+    """0-100: share of the scheme's scored criteria that ``profile`` meets."""
+    if not rules:
+        return SCORE_NO_RULES
+    total = matched = 0
+    for rule in rules:
+        total += len(rule.score_checks)
+        matched += sum(1 for check in rule.score_checks if check(profile))
+    if total == 0:
+        return SCORE_NO_CRITERIA
+    return min(100, int(matched / total * 100))
+
+
+def match_scores(profile, scheme_ids, rule_set=None):
+    """{scheme_id: match score} for every scheme in ``scheme_ids``, in memory."""
+    rule_set = rule_set or get_rule_set()
+    return {
+        scheme_id: score_rules(profile, rule_set.by_scheme.get(scheme_id))
+        for scheme_id in scheme_ids
+    }
+
+
+def result_rows(user_id, results, scores=None):
+    """Unsaved UserEligibility instances for one user's ``results``."""
+    scores = scores or {}
+    return [
+        UserEligibility(user_id=user_id, scheme_id=scheme_id,
+                        eligibility_status=status, reason=reason,
+                        criteria_mask=mask, match_score=scores.get(scheme_id))
+        for scheme_id, (status, reason, mask) in results.items()
+    ]
+
+
+RESULT_FIELDS = ('eligibility_status', 'reason', 'criteria_mask', 'match_score')
+
+
+def upsert_rows(rows, batch_size=None):
+    """Insert-or-update User_Eligibility rows in one bulk statement."""
+    if not rows:
+        return
+    kwargs = {}
+    if connection.features.supports_update_conflicts_with_target:
+        kwargs['unique_fields'] = ['user', 'scheme']
+    UserEligibility.objects.bulk_create(
+        rows,
+        batch_size=batch_size,
+        update_conflicts=True,
+        update_fields=list(RESULT_FIELDS),
+        **kwargs,
+    )
+
+
+def sync_rows(rows, user_ids=None, batch_size=None):
+    """
+    Write ``rows`` (unsaved UserEligibility) as a diff against the table:
+    new (user, scheme) pairs are inserted, rows whose status, reason, mask
+    or score differ are updated, and identical rows are not touched, so a
+    recheck of a stable profile writes nothing.  If ``user_ids`` is given,
+    ``rows`` are those users' complete results and their rows for any other
+    scheme are deleted.  ``status_changed_on`` moves only when the status
+    does, and only users with a changed row get a new dashboard version.
+    Returns (inserted, updated, deleted).
+    """
+    if user_ids is not None:
+        existing = UserEligibility.objects.filter(user_id__in=list(user_ids))
+    elif rows:
+        existing = UserEligibility.objects.filter(
+            user_id__in={r.user_id for r in rows}, scheme_id__in={r.scheme_id for r in rows},
+        )
+    else:
+        return 0, 0, 0
+    current = {
+        (row[0], row[1]): row[2:]
+        for row in existing.values_list('user_id', 'scheme_id', 'eligibility_id', *RESULT_FIELDS)
+    }
+
+    now = timezone.now()
+    inserts, changed, restated = [], [], []
+    for row in rows:
+        old = current.pop((row.user_id, row.scheme_id), None)
+        if old is None:
+            row.status_changed_on = now
+            inserts.append(row)
+            continue
+        if old[1:] == tuple(getattr(row, f) for f in RESULT_FIELDS):
+            continue
+        row.eligibility_id = old[0]
+        if old[1] != row.eligibility_status:
+            row.status_changed_on = now
+            changed.append(row)
+        else:
+            restated.append(row)
+
+    # Inserts still go through the upsert, in case a concurrent run added the pair.
+    upsert_rows(inserts, batch_size=batch_size)
+    if changed:
+        UserEligibility.objects.bulk_update(
+            changed, [*RESULT_FIELDS, 'status_changed_on'], batch_size=batch_size)
+    if restated:
+        UserEligibility.objects.bulk_update(restated, list(RESULT_FIELDS), batch_size=batch_size)
+    deleted = 0
+    if user_ids is not None and current:
+        deleted, _ = UserEligibility.objects.filter(
+            eligibility_id__in=[old[0] for old in current.values()]
+        ).delete()
+    bump_dashboard_version(*(row.user_id for row in (*inserts, *changed, *restated)),
+                           *(user_id for user_id, _ in current if user_ids is not None))
+    return len(inserts), len(changed) + len(restated), deleted
+
+
+def save_results(user_id, results, scores=None, complete=False):
+    """
+    Write one user's ``results`` (and match ``scores``) to User_Eligibility,
+    touching only rows that changed.  ``complete`` means ``results`` cover
+    every scheme the user can reach, so rows for other schemes are deleted.
+    """
+    return sync_rows(result_rows(user_id, results, scores),
+                     user_ids=[user_id] if complete else None)
+
+
+def _user_category_ids(user):
+    return list(UserCategories.objects.filter(
+        user_id=user.user_id
+    ).values_list('category_id', flat=True))
+
+
+def stamp_rules_version(user_ids, category_ids, rule_set):
+    """Record on UserCategories that ``user_ids`` are up to date with ``rule_set``."""
+    by_version = {}
+    for category_id in set(category_ids):
+        by_version.setdefault(rule_set.versions.get(category_id, 0), []).append(category_id)
+    for version, categories in by_version.items():
+        UserCategories.objects.filter(
+            user_id__in=user_ids, category_id__in=categories
+        ).update(rules_version=version)
+
+
+def check_user_eligibility(user):
+    """Python replacement for ``CALL check_user_eligibility(user_id)``."""
+    rule_set = get_rule_set()
+    profile = Profile.from_user(user)
+    category_ids = _user_category_ids(user)
+    results, scores = evaluate_scored(profile, category_ids, rule_set)
+    misses = near_misses(profile, category_ids, rule_set)
+    with transaction.atomic():
+        save_results(user.user_id, results, scores, complete=True)
+        save_near_misses({user.user_id: misses}, [user.user_id])
+        stamp_rules_version([user.user_id], category_ids, rule_set)
+    return results
+
+
+def check_users_eligibility(users, rule_set=None):
+    """
+    ``check_user_eligibility`` for several users at once (a household, a
+    recompute chunk): one rule set, one UserCategories query and a single
+    transaction writing every user's rows in bulk.  Returns {user_id:
+    results}.
+    """
+    rule_set = rule_set or get_rule_set()
+    user_ids = [user.user_id for user in users]
+    categories = {}
+    for user_id, category_id in UserCategories.objects.filter(
+        user_id__in=user_ids
+    ).values_list('user_id', 'category_id'):
+        categories.setdefault(user_id, []).append(category_id)
+
+    checked, rows, misses = {}, [], {}
+    for user in users:
+        profile = Profile.from_user(user)
+        category_ids = categories.get(user.user_id, ())
+        results, scores = evaluate_scored(profile, category_ids, rule_set)
+        rows.extend(result_rows(user.user_id, results, scores))
+        misses[user.user_id] = near_misses(profile, category_ids, rule_set)
+        checked[user.user_id] = results
+    with transaction.atomic():
+        sync_rows(rows, user_ids=user_ids)
+        save_near_misses(misses, user_ids)
+        stamp_rules_version(user_ids, {c for cats in categories.values() for c in cats}, rule_set)
+    return checked
+
+
+def refresh_if_stale(user):
+    """
+    Recompute ``user`` if any of their categories' rules changed since their
+    eligibility was last computed (or it never was).  Returns True if a
+    recompute ran.  A cached RuleSet older than those changes is reloaded
+    first, since the edit may have happened in another process.
+    """
+    stale = dict(UserCategories.objects.filter(user_id=user.user_id).filter(
+        Q(rules_version__isnull=True) | Q(rules_version__lt=F('category__rules_version'))
+    ).values_list('category_id', 'category__rules_version'))
+    if not stale:
+        return False
+    rule_set = get_rule_set()
+    if any(version > rule_set.versions.get(c, 0) for c, version in stale.items()):
+        invalidate_rule_cache()
+    check_user_eligibility(user)
+    return True
+
+
+def recheck_changed_fields(user, changed_fields):
+    """
+    Incremental recompute after a profile edit.
+
+    Only schemes whose deciding rule or match score reads one of
+    ``changed_fields`` (or that have no User_Eligibility row yet) are
+    re-evaluated and written; an edit touching no eligibility field costs
+    nothing.  Returns the rows
+    whose status flipped as [(scheme_id, old_status, new_status)], with
+    ``old_status`` None for rows that did not exist before.
+    """
+    changed = ELIGIBILITY_FIELDS.intersection(changed_fields)
+    if not changed:
+        return []
+    rule_set = get_rule_set()
+    category_ids = _user_category_ids(user)
+    deciding = deciding_rules(category_ids, rule_set)
+    previous = dict(UserEligibility.objects.filter(
+        user_id=user.user_id, scheme_id__in=list(deciding)
+    ).values_list('scheme_id', 'eligibility_status'))
+
+    profile = Profile.from_user(user)
+    results = {
+        scheme_id: rule.evaluate(profile)
+        for scheme_id, rule in deciding.items()
+        if scheme_id not in previous
+        or (rule.fields | rule_set.score_fields[scheme_id]) & changed
+    }
+    scores = match_scores(profile, results, rule_set)
+    misses = near_misses(profile, category_ids, rule_set)
+    with transaction.atomic():
+        save_results(user.user_id, results, scores)
+        save_near_misses({user.user_id: misses}, [user.user_id])
+    return [
+        (scheme_id, previous.get(scheme_id), status)
+        for scheme_id, (status, _, _) in results.items()
+        if previous.get(scheme_id) != status
+    ]
+
+
+def recheck_categories(user, category_ids):
+    """
+    Incremental recompute after the user joined or left ``category_ids``.
+
+    Only schemes with a rule in those categories are touched: each is
+    re-evaluated against its deciding rule under the user's current
+    categories, or its User_Eligibility row is deleted when no rule in
+    those categories reaches it any more.  Returns the status flips as
+    [(scheme_id, old_status, new_status)], with None for a missing row.
+    """
+    rule_set = get_rule_set()
+    changed = set(category_ids)
+    member = set(_user_category_ids(user))
+    scheme_ids = {rule.scheme_id for c in changed for rule in rule_set.by_category.get(c, ())}
+    if not scheme_ids:
+        return []
+    previous = dict(UserEligibility.objects.filter(
+        user_id=user.user_id, scheme_id__in=list(scheme_ids)
+    ).values_list('scheme_id', 'eligibility_status'))
+
+    profile = Profile.from_user(user)
+    results, dropped = {}, []
+    for scheme_id in scheme_ids:
+        rules = [r for r in rule_set.by_scheme[scheme_id] if r.category_id in member]
+        if rules:
+            results[scheme_id] = rules[-1].evaluate(profile)
+        elif scheme_id in previous:
+            dropped.append(scheme_id)
+    scores = match_scores(profile, results, rule_set)
+    misses = near_misses(profile, member, rule_set)
+    with transaction.atomic():
+        if dropped:
+            UserEligibility.objects.filter(user_id=user.user_id, scheme_id__in=dropped).delete()
+        save_results(user.user_id, results, scores)
+        save_near_misses({user.user_id: misses}, [user.user_id])
+        stamp_rules_version([user.user_id], changed & member, rule_set)
+    flips = [(scheme_id, previous.get(scheme_id), None) for scheme_id in dropped]
+    flips += [
+        (scheme_id, previous.get(scheme_id), status)
+        for scheme_id, (status, _, _) in results.items()
+        if previous.get(scheme_id) != status
+    ]
+    return flips
+
+
+def simulate(user, overlay, rule_set=None):
+    """
+    "What-if" evaluation: ``user`` with the CustomUser field values in
+    ``overlay`` applied, evaluated in memory against the cached rule set.
+    Neither the user nor User_Eligibility is written.  Returns
+    ``(results, scores, previous)``: {scheme_id: (status, reason,
+    criteria_mask)} for every scheme that is Eligible either now or in the
+    stored state (the only ones whose status can differ), their match
+    scores and the stored {scheme_id: eligibility_status}.
+    """
+    rule_set = rule_set or get_rule_set()
+    what_if = copy.copy(user)
+    for field, value in overlay.items():
+        setattr(what_if, field, value)
+    if set(overlay) & set(user.DERIVED_FIELDS):
+        what_if.refresh_derived_fields()
+
+    profile = Profile.from_user(what_if)
+    category_ids = _user_category_ids(user)
+    previous = dict(UserEligibility.objects.filter(
+        user_id=user.user_id
+    ).values_list('scheme_id', 'eligibility_status'))
+    results = eligible_schemes(profile, category_ids, rule_set)
+    # Schemes that would be lost: evaluate just their deciding rule.
+    categories = set(category_ids)
+    for scheme_id, status in previous.items():
+        if status != ELIGIBLE or scheme_id in results:
+            continue
+        rules = [r for r in rule_set.by_scheme.get(scheme_id, ()) if r.category_id in categories]
+        if rules:
+            results[scheme_id] = rules[-1].evaluate(profile)
+    scores = match_scores(profile, results, rule_set)
+    return results, scores, previous
@@ -0,0 +1,427 @@
+"""
+Columnar eligibility for whole populations.
+
+The per-user engine in core/eligibility.py is the right tool for "what is
+*this* user eligible for".  For population questions ("how many registered
+users qualify for scheme X", rebuilding User_Eligibility after a bulk rule
+load) this module lays Rule_Engine and Users out as NumPy columns and
+evaluates every user against every rule as one broadcast boolean
+computation per chunk of users.  Semantics, including the NULL handling,
+"highest rule_id wins" per scheme and match scores, match the per-user
+engine.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+
+from . import eligibility, near_miss
+from .education import rule_education_level, user_education_level
+from .gazetteer import location_code, parse_address
+from .models import CustomUser, UserCategories, UserEligibility
+
+
+AGE_NONE_MIN    = -1
+AGE_NONE_MAX    = np.iinfo(np.int16).max
+INCOME_NONE_MIN = np.iinfo(np.int64).min
+INCOME_NONE_MAX = np.iinfo(np.int64).max
+GENDER_ANY      = -1     # rule: no gender constraint / user: gender NULL
+GENDER_OTHER    = -2     # user gender that no rule asks for
+
+DEFAULT_CHUNK = 20000
+
+
+def _paise(amount):
+    return int(amount * 100)
+
+
+class RuleMatrix:
+    """
+    Rule_Engine as parallel arrays, one entry per rule, sorted by rule_id.
+    ``versions`` are the category rules_versions of the source RuleSet.
+    """
+
+    def __init__(self, rules, versions=None):
+        rules = sorted(rules, key=lambda r: r.rule_id)
+        self.rules = rules
+        self.versions = versions or {}
+        n = len(rules)
+
+        self.category_ids = sorted({r.category_id for r in rules})
+        category_pos = {c: i for i, c in enumerate(self.category_ids)}
+        self.gender_codes = {}
+        self.locations = []
+        location_pos = {}
+
+        self.rule_ids     = np.empty(n, dtype=np.int64)
+        self.scheme_ids   = np.empty(n, dtype=np.int64)
+        self.category_idx = np.empty(n, dtype=np.int32)
+        self.age_min      = np.full(n, AGE_NONE_MIN, dtype=np.int16)
+        self.age_max      = np.full(n, AGE_NONE_MAX, dtype=np.int16)
+        self.gender       = np.full(n, GENDER_ANY, dtype=np.int16)
+        self.max_income   = np.full(n, INCOME_NONE_MAX, dtype=np.int64)
+        self.location_idx = np.full(n, -1, dtype=np.int32)
+        self.education    = np.zeros(n, dtype=np.int8)
+        self.reasons      = []
+
+        # Match-score criteria (see CompiledRule._compile_score)
+        self.min_income   = np.full(n, INCOME_NONE_MIN, dtype=np.int64)
+        self.score_age    = np.zeros(n, dtype=bool)
+        self.score_gender = np.zeros(n, dtype=bool)
+        self.gender_any   = np.zeros(n, dtype=bool)    # rule gender 'Any' / 'All'
+        self.score_income = np.zeros(n, dtype=bool)
+
+        # Criteria mask (see CompiledRule.present / flag_checks)
+        self.present        = np.zeros(n, dtype=np.int32)
+        self.turnover_limit = np.full(n, INCOME_NONE_MAX, dtype=np.int64)
+
+        # Scheme eligibility_rules programs: {program: rule positions}
+        self.programs = {}
+
+        for i, rule in enumerate(rules):
+            row = rule.row
+            self.rule_ids[i]     = rule.rule_id
+            self.scheme_ids[i]   = rule.scheme_id
+            self.category_idx[i] = category_pos[rule.category_id]
+            if row['age_min'] is not None:
+                self.age_min[i] = row['age_min']
+            if row['age_max'] is not None:
+                self.age_max[i] = row['age_max']
+            if row['gender']:
+                self.gender[i] = self.gender_codes.setdefault(
+                    row['gender'].lower(), len(self.gender_codes))
+            if row['max_income'] is not None:
+                self.max_income[i] = _paise(row['max_income'])
+            if row['min_income'] is not None:
+                self.min_income[i] = _paise(row['min_income'])
+            self.score_age[i] = row['age_min'] is not None or row['age_max'] is not None
+            self.score_gender[i] = bool(row['gender'])
+            self.gender_any[i] = bool(row['gender']) and row['gender'].lower() in ('any', 'all')
+            self.score_income[i] = row['min_income'] is not None or row['max_income'] is not None
+            if row['location']:
+                # (True, gazetteer code) when known, else (False, substring).
+                code = row.get('location_code') or location_code(row['location'])
+                needle = (True, code) if code else (False, row['location'].lower())
+                if needle not in location_pos:
+                    location_pos[needle] = len(self.locations)
+                    self.locations.append(needle)
+                self.location_idx[i] = location_pos[needle]
+            self.education[i] = rule_education_level(row['education_required'])
+            self.reasons.append({c: reason for c, _, reason in rule.checks})
+            self.present[i] = rule.present
+            if rule.program is not None:
+                self.programs.setdefault(rule.program, []).append(i)
+            if row['business_turnover_limit'] is not None:
+                self.turnover_limit[i] = _paise(row['business_turnover_limit'])
+
+        # Rules with no location read an always-true column appended last.
+        self.location_idx[self.location_idx < 0] = len(self.locations)
+
+        # Where several rules target one scheme, a later applicable rule
+        # overrides an earlier one (the procedure's upsert order).
+        by_scheme = {}
+        for i, scheme_id in enumerate(self.scheme_ids.tolist()):
+            by_scheme.setdefault(scheme_id, []).append(i)
+        self.shadowing = [
+            (idx[k], idx[k + 1:])
+            for idx in by_scheme.values() if len(idx) > 1
+            for k in range(len(idx) - 1)
+        ]
+
+        # Rules regrouped by scheme, so per-rule score counts can be summed
+        # per scheme with one reduceat: scheme_order lists rule positions
+        # scheme by scheme, scheme_starts where each scheme's run begins and
+        # scheme_col maps every rule to its scheme's column.
+        self.scheme_order = np.array([i for idx in by_scheme.values() for i in idx],
+                                     dtype=np.int64)
+        sizes = [len(idx) for idx in by_scheme.values()]
+        self.scheme_starts = np.cumsum([0] + sizes[:-1]).astype(np.int64)
+        self.scheme_col = np.empty(n, dtype=np.int64)
+        for col, idx in enumerate(by_scheme.values()):
+            self.scheme_col[idx] = col
+        total = self.score_age.astype(np.int64) + self.score_gender + self.score_income
+        self.scheme_score_total = (np.add.reduceat(total[self.scheme_order], self.scheme_starts)
+                                   if n else total)
+
+    @classmethod
+    def from_rule_set(cls, rule_set=None, scheme_ids=None):
+        rule_set = rule_set or eligibility.get_rule_set()
+        rules = [r for bucket in rule_set.by_category.values() for r in bucket]
+        if scheme_ids is not None:
+            wanted = set(scheme_ids)
+            rules = [r for r in rules if r.scheme_id in wanted]
+        return cls(rules, rule_set.versions)
+
+    def __len__(self):
+        return len(self.rules)
+
+
+class UserColumns:
+    """Users (and their UserCategories) as arrays aligned to a RuleMatrix."""
+
+    def __init__(self, rules, users, memberships):
+        ids, ages, genders, incomes, addresses, has_address, education = (
+            [], [], [], [], [], [], []
+        )
+        states, districts, score_genders, gender_text = [], [], [], []
+        pensions, disabilities, unemployed, turnovers = [], [], [], []
+        for (user_id, dob, gender, income, address, edu, edu_level,
+             state, district, pension, disability, unemployment, turnover) in users:
+            ids.append(user_id)
+            ages.append(eligibility.age_on(dob))
+            gender_text.append((gender or '').lower())
+            if gender is None:
+                genders.append(GENDER_ANY)
+                score_genders.append(GENDER_OTHER)
+            else:
+                genders.append(rules.gender_codes.get(gender.lower(), GENDER_OTHER))
+                score_genders.append(genders[-1])
+            incomes.append(-1 if income is None else _paise(income))
+            has_address.append(address is not None)
+            addresses.append((address or '').lower())
+            education.append(edu_level if edu_level is not None else user_education_level(edu))
+            if state is None and district is None and address:
+                state, district = parse_address(address)
+            states.append(state or '')
+            districts.append(district or '')
+            pensions.append(bool(pension))
+            disabilities.append(bool(disability))
+            unemployed.append(bool(unemployment))
+            turnovers.append(-1 if turnover is None else _paise(turnover))
+
+        n = len(ids)
+        self.user_ids  = np.array(ids, dtype=np.int64)
+        self.age       = np.array(ages, dtype=np.int16)
+        self.gender    = np.array(genders, dtype=np.int16)
+        self.income    = np.array(incomes, dtype=np.int64)
+        self.education = np.array(education, dtype=np.int8)
+        # The match score treats a missing gender as a mismatch and a
+        # missing income as 0, unlike eligibility.
+        self.score_gender = np.array(score_genders, dtype=np.int16)
+        self.score_income = np.maximum(self.income, 0)
+        self.pension      = np.array(pensions, dtype=bool)
+        self.disability   = np.array(disabilities, dtype=bool)
+        self.unemployment = np.array(unemployed, dtype=bool)
+        self.turnover     = np.array(turnovers, dtype=np.int64)
+        # Raw columns for scheme eligibility_rules programs ('' = missing).
+        self.gender_text  = np.array(gender_text, dtype=str)
+        self.state        = np.array(states, dtype=str)
+        self.district     = np.array(districts, dtype=str)
+
+        # One boolean column per distinct rule location, plus a trailing
+        # always-true column for rules without a location.
+        self.location = np.ones((n, len(rules.locations) + 1), dtype=bool)
+        if n and rules.locations:
+            text = np.array(addresses, dtype=str)
+            missing = ~np.array(has_address, dtype=bool)
+            for j, (is_code, needle) in enumerate(rules.locations):
+                if is_code:
+                    self.location[:, j] = missing | (self.state == needle) | (self.district == needle)
+                else:
+                    self.location[:, j] = missing | (np.char.find(text, needle) >= 0)
+
+        row_of = {user_id: i for i, user_id in enumerate(ids)}
+        col_of = {c: j for j, c in enumerate(rules.category_ids)}
+        self.membership = np.zeros((n, len(rules.category_ids)), dtype=bool)
+        for user_id, category_id in memberships:
+            i, j = row_of.get(user_id), col_of.get(category_id)
+            if i is not None and j is not None:
+                self.membership[i, j] = True
+
+    @classmethod
+    def load(cls, rules, user_ids=None):
+        users = CustomUser.objects.order_by('user_id').values_list(
+            'user_id', 'dob', 'gender', 'income', 'address', 'education', 'education_level',
+            'state_code', 'district_code', 'pension_status', 'disability_cert',
+            'unemployment_status', 'business_turnover',
+        )
+        memberships = UserCategories.objects.filter(
+            category_id__in=rules.category_ids
+        ).values_list('user_id', 'category_id')
+        if user_ids is not None:
+            users = users.filter(user_id__in=user_ids)
+            memberships = memberships.filter(user_id__in=user_ids)
+        return cls(rules, users.iterator(chunk_size=10000),
+                   memberships.iterator(chunk_size=10000))
+
+    def __len__(self):
+        return len(self.user_ids)
+
+
+# ── Broadcast evaluation ──────────────────────────────────────────────────
+def criteria_matrices(rules, users, rows=slice(None)):
+    """Per-criterion pass matrices (users x rules), in CRITERIA order."""
+    age    = users.age[rows, None]
+    gender = users.gender[rows, None]
+    programs = np.ones((len(users.user_ids[rows]), len(rules)), dtype=bool)
+    for program, cols in rules.programs.items():
+        programs[:, cols] = program.vector(users, rows)[:, None]
+    return [
+        age >= rules.age_min,
+        age <= rules.age_max,
+        (rules.gender == GENDER_ANY) | (gender == GENDER_ANY) | (gender == rules.gender),
+        users.income[rows, None] <= rules.max_income,
+        users.location[rows][:, rules.location_idx],
+        users.education[rows, None] >= rules.education,
+        programs,
+    ]
+
+
+def mask_block(rules, users, rows=slice(None), checks=None):
+    """criteria_mask values (users x rules), as CompiledRule.evaluate builds them."""
+    if checks is None:
+        checks = criteria_matrices(rules, users, rows)
+    age_min, age_max, gender, income, location, education, programs = checks
+    bit = eligibility.MASK_BIT
+    passed = (
+        (age_min & age_max) * np.int32(bit['age'])
+        + gender * np.int32(bit['gender'])
+        + income * np.int32(bit['income'])
+        + location * np.int32(bit['location'])
+        + education * np.int32(bit['education'])
+        + users.pension[rows, None] * np.int32(bit['pension'])
+        + users.disability[rows, None] * np.int32(bit['disability'])
+        + users.unemployment[rows, None] * np.int32(bit['unemployment'])
+        + (users.turnover[rows, None] <= rules.turnover_limit) * np.int32(bit['turnover'])
+        + programs * np.int32(bit['rules'])
+    )
+    return rules.present | (passed & rules.present) << eligibility.PASSED_SHIFT
+
+
+def evaluate_block(rules, users, rows=slice(None), with_failures=False, checks=None):
+    """
+    Evaluate a block of users against every rule.  Returns
+    ``(decisive, eligible, failure)`` matrices of shape (users, rules):
+    ``decisive`` marks the rule that determines each user's row for its
+    scheme, ``eligible`` whether that rule passed, and ``failure`` (only
+    with ``with_failures``) the index into CRITERIA of the first failing
+    criterion, or -1.  Precomputed ``checks`` from criteria_matrices can be
+    passed in to share them with mask_block.
+    """
+    if checks is None:
+        checks = criteria_matrices(rules, users, rows)
+    eligible = np.logical_and.reduce(checks)
+    decisive = users.membership[rows][:, rules.category_idx]
+    applicable = decisive.copy() if rules.shadowing else decisive
+    for earlier, later in rules.shadowing:
+        decisive[:, earlier] &= ~applicable[:, later].any(axis=1)
+    failure = None
+    if with_failures:
+        failure = np.select([~c for c in checks], list(range(len(checks))), default=-1)
+    return decisive, eligible, failure
+
+
+def score_block(rules, users, rows=slice(None)):
+    """
+    Match scores (users x rules): each entry is the score of the rule's
+    scheme, summed over all of that scheme's rules as the engine does.
+    """
+    age    = users.age[rows, None]
+    income = users.score_income[rows, None]
+    gender = users.score_gender[rows, None]
+    matched = (
+        (rules.score_age & (age >= rules.age_min) & (age <= rules.age_max)).astype(np.int64)
+        + (rules.score_gender & (rules.gender_any | (gender == rules.gender)))
+        + (rules.score_income & (income >= rules.min_income) & (income <= rules.max_income))
+    )
+    if not len(rules):
+        return matched
+    per_scheme = np.add.reduceat(matched[:, rules.scheme_order], rules.scheme_starts, axis=1)
+    total = rules.scheme_score_total
+    scores = np.where(
+        total == 0, eligibility.SCORE_NO_CRITERIA,
+        np.minimum(100, (per_scheme / np.maximum(total, 1) * 100).astype(np.int64)),
+    )
+    return scores[:, rules.scheme_col]
+
+
+def near_miss_block(rules, users, rows, checks, decisive, failure):
+    """
+    {user_id: ranked [Miss]} for a block, as near_miss.near_misses finds
+    them: deciding rules failing exactly one of NEAR_MISS_CRITERIA.
+    ``checks``, ``decisive`` and ``failure`` come from evaluate_block.
+    """
+    failing = np.add.reduce([~c for c in checks], dtype=np.int8)
+    user_rows, rule_cols = np.nonzero(decisive & (failing == 1))
+    user_ids = users.user_ids[rows]
+    ages, incomes, education = users.age[rows], users.income[rows], users.education[rows]
+    misses = {}
+    for i, j in zip(user_rows.tolist(), rule_cols.tolist()):
+        criterion = eligibility.CRITERIA[failure[i, j]]
+        if criterion == 'age_min':
+            gap = int(rules.age_min[j]) - int(ages[i])
+        elif criterion == 'income':
+            gap = Decimal(int(incomes[i]) - int(rules.max_income[j])) / 100
+        elif criterion == 'education':
+            gap = int(rules.education[j]) - int(education[i])
+        else:
+            continue
+        miss = near_miss.describe(rules.rules[j], criterion, gap)
+        if miss is not None:
+            misses.setdefault(int(user_ids[i]), []).append(miss)
+    return {user_id: near_miss.rank(found) for user_id, found in misses.items()}
+
+
+def _blocks(n, chunk_size):
+    for start in range(0, n, chunk_size):
+        yield slice(start, min(start + chunk_size, n))
+
+
+def eligible_counts(scheme_ids=None, chunk_size=DEFAULT_CHUNK, rules=None, users=None):
+    """{scheme_id: number of users eligible} across the whole population."""
+    if rules is None:
+        rules = RuleMatrix.from_rule_set(scheme_ids=scheme_ids)
+    if users is None:
+        users = UserColumns.load(rules)
+    per_rule = np.zeros(len(rules), dtype=np.int64)
+    for block in _blocks(len(users), chunk_size):
+        decisive, eligible, _ = evaluate_block(rules, users, block)
+        per_rule += (decisive & eligible).sum(axis=0)
+    counts = {}
+    for scheme_id, n in zip(rules.scheme_ids.tolist(), per_rule.tolist()):
+        counts[scheme_id] = counts.get(scheme_id, 0) + n
+    return counts
+
+
+def write_population(chunk_size=DEFAULT_CHUNK, batch_size=2000, progress=None,
+                     rules=None, users=None):
+    """
+    Recompute User_Eligibility and Near_Misses for every user from the
+    matrix and write the differences back in bulk, one transaction per
+    chunk of users.  Returns the number of User_Eligibility rows inserted,
+    updated or deleted.
+    """
+    if rules is None:
+        rules = RuleMatrix.from_rule_set()
+    if users is None:
+        users = UserColumns.load(rules)
+    written = 0
+    for block in _blocks(len(users), chunk_size):
+        checks = criteria_matrices(rules, users, block)
+        decisive, eligible, failure = evaluate_block(rules, users, block,
+                                                     with_failures=True, checks=checks)
+        masks = mask_block(rules, users, block, checks)
+        scores = score_block(rules, users, block)
+        user_rows, rule_cols = np.nonzero(decisive)
+        user_ids = users.user_ids[block]
+        rows = []
+        for i, j in zip(user_rows.tolist(), rule_cols.tolist()):
+            if eligible[i, j]:
+                status, reason = eligibility.ELIGIBLE, eligibility.MATCHED_ALL
+            else:
+                status = eligibility.NOT_ELIGIBLE
+                reason = rules.reasons[j][eligibility.CRITERIA[failure[i, j]]]
+            rows.append(UserEligibility(
+                user_id=int(user_ids[i]), scheme_id=int(rules.scheme_ids[j]),
+                eligibility_status=status, reason=reason,
+                criteria_mask=int(masks[i, j]), match_score=int(scores[i, j]),
+            ))
+        misses = near_miss_block(rules, users, block, checks, decisive, failure)
+        with transaction.atomic():
+            written += sum(eligibility.sync_rows(rows, user_ids=user_ids.tolist(),
+                                                 batch_size=batch_size))
+            near_miss.save_near_misses(misses, user_ids.tolist(), batch_size=batch_size)
+            eligibility.stamp_rules_version(user_ids.tolist(), rules.category_ids, rules)
+        if progress:
+            progress(block.stop, len(users))
+    return written
@@ -0,0 +1,55 @@
+"""
+Scheme facets: the states and benefit types offered by the dashboard
+filters, each with how many schemes carry it.
+
+The catalog only changes through the admin scheme pages and Load.py, so the
+facets are built with one grouped query and kept in the Django cache.
+Scheme post_save / post_delete (core/signals.py) and Load.py drop the entry;
+the next reader rebuilds it.  With the default per-process LocMemCache a
+write only clears its own worker's copy, so the entry also expires after
+SCHEME_FACET_CACHE_SECONDS; configure a shared CACHES backend to make
+invalidation immediate everywhere.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+
+from .models import Scheme
+
+
+FACET_CACHE_KEY = 'core:scheme_facets'
+
+
+def build_scheme_facets():
+    """
+    {'states': [(state, n)], 'benefit_types': [(type, n)]}, sorted by name,
+    from a single query grouped on (state, benefit_type).  Blank values are
+    left out.
+    """
+    states, benefit_types = {}, {}
+    for state, benefit_type, n in (
+        Scheme.objects.order_by().values_list('state', 'benefit_type').annotate(n=Count('pk'))
+    ):
+        if state and state.strip():
+            states[state] = states.get(state, 0) + n
+        if benefit_type and benefit_type.strip():
+            benefit_types[benefit_type] = benefit_types.get(benefit_type, 0) + n
+    return {'states': sorted(states.items()), 'benefit_types': sorted(benefit_types.items())}
+
+
+def scheme_facets():
+    """The cached facets, built on a miss."""
+    facets = cache.get(FACET_CACHE_KEY)
+    if facets is None:
+        facets = rebuild_scheme_facets()
+    return facets
+
+
+def rebuild_scheme_facets():
+    facets = build_scheme_facets()
+    cache.set(FACET_CACHE_KEY, facets, getattr(settings, 'SCHEME_FACET_CACHE_SECONDS', 3600))
+    return facets
+
+
+def invalidate_scheme_facets():
+    cache.delete(FACET_CACHE_KEY)
@@ -2,6 +2,7 @@ import re
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm, PasswordChangeForm
 from .models import CustomUser, Category, Scheme
+from .scheme_rules import RuleSyntaxError, compile_program
 
 
 # ── Verhoeff Checksum Algorithm for Aadhaar validation ────────────────────
@@ -208,4 +209,12 @@ class SchemeForm(forms.ModelForm):
             'registration_link': forms.URLInput(attrs={'class': 'form-control'}),
             'benefit_type': forms.TextInput(attrs={'class': 'form-control'}),
             'state': forms.TextInput(attrs={'class': 'form-control'}),
-        }
\ No newline at end of file
+        }
+
+    def clean_eligibility_rules(self):
+        rules = self.cleaned_data.get('eligibility_rules')
+        try:
+            compile_program(rules)
+        except RuleSyntaxError as e:
+            raise forms.ValidationError(f'Invalid eligibility rules: {e}')
+        return rules
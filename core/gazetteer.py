@@ -0,0 +1,266 @@
+"""
+Local gazetteer of Indian states / union territories and major districts.
+
+``parse_address`` turns a free-text CustomUser.address into structured
+(state_code, district_code) pairs at save time, and ``location_code`` does
+the same for Rule_Engine.location and Schemes.state.  Eligibility then
+compares short codes instead of running ``address LIKE '%location%'`` per
+rule, which could not use an index and matched substrings ("Goa" inside
+"Goalpara").
+
+State codes are the two-letter vehicle-registration / ISO 3166-2:IN
+suffixes; district codes are ``<state>-<slug>``.  Like core/education.py
+this module has no Django imports so Load.py can use it.
+"""
+import difflib
+import re
+
+# code: (canonical name, extra aliases incl. common misspellings / old names)
+STATES = {
+    'AN': ('Andaman and Nicobar Islands', ('andaman', 'andaman nicobar', 'andaman & nicobar')),
+    'AP': ('Andhra Pradesh', ('andhra', 'andhrapradesh', 'andra pradesh')),
+    'AR': ('Arunachal Pradesh', ('arunachal', 'arunachalpradesh')),
+    'AS': ('Assam', ('asam',)),
+    'BR': ('Bihar', ('bihaar',)),
+    'CH': ('Chandigarh', ('chandigadh',)),
+    'CG': ('Chhattisgarh', ('chattisgarh', 'chhatisgarh', 'chattisgadh', 'chhattisgadh')),
+    'DH': ('Dadra and Nagar Haveli and Daman and Diu',
+           ('dadra and nagar haveli', 'dadra nagar haveli', 'daman and diu', 'daman', 'diu',
+            'silvassa')),
+    'DL': ('Delhi', ('new delhi', 'nct of delhi', 'dilli')),
+    'GA': ('Goa', ()),
+    'GJ': ('Gujarat', ('gujrat', 'gujarath')),
+    'HR': ('Haryana', ('hariyana', 'haryanah')),
+    'HP': ('Himachal Pradesh', ('himachal', 'himachalpradesh')),
+    'JK': ('Jammu and Kashmir', ('jammu kashmir', 'jammu & kashmir', 'j&k', 'kashmir')),
+    'JH': ('Jharkhand', ('jharkhad', 'jharkand')),
+    'KA': ('Karnataka', ('karnatak', 'karnatka', 'karanataka')),
+    'KL': ('Kerala', ('kerela', 'keralam')),
+    'LA': ('Ladakh', ('ladak',)),
+    'LD': ('Lakshadweep', ('lakshadeep', 'laccadives')),
+    'MP': ('Madhya Pradesh', ('madhyapradesh', 'madya pradesh')),
+    'MH': ('Maharashtra', ('maharastra', 'maharashtr', 'maharashra')),
+    'MN': ('Manipur', ()),
+    'ML': ('Meghalaya', ('meghalay',)),
+    'MZ': ('Mizoram', ()),
+    'NL': ('Nagaland', ()),
+    'OD': ('Odisha', ('orissa', 'odissa', 'odisa')),
+    'PY': ('Puducherry', ('pondicherry', 'pondichery', 'puduchery')),
+    'PB': ('Punjab', ('panjab',)),
+    'RJ': ('Rajasthan', ('rajastan', 'rajsthan', 'rajasthaan')),
+    'SK': ('Sikkim', ('sikim',)),
+    'TN': ('Tamil Nadu', ('tamilnadu', 'tamil nadu', 'tamilnad', 'tamizh nadu', 'tamil naadu')),
+    'TS': ('Telangana', ('telengana', 'telangna', 'telagana')),
+    'TR': ('Tripura', ()),
+    'UP': ('Uttar Pradesh', ('uttarpradesh', 'utter pradesh', 'uttar pardesh')),
+    'UK': ('Uttarakhand', ('uttaranchal', 'uttrakhand', 'uttarkhand')),
+    'WB': ('West Bengal', ('westbengal', 'bengal', 'paschim banga', 'paschimbanga')),
+}
+
+# Abbreviations only count when written in capitals ("Chennai, TN"), so
+# ordinary words like "up" or "ka" in an address never match.
+STATE_ABBREVIATIONS = {
+    'AP': 'AP', 'UP': 'UP', 'MP': 'MP', 'HP': 'HP', 'TN': 'TN', 'WB': 'WB',
+    'J&K': 'JK', 'JK': 'JK', 'NCR': 'DL',
+}
+
+# state code: (district name, aliases) — major districts and cities
+DISTRICTS = {
+    'AP': [('Visakhapatnam', ('vizag', 'vishakhapatnam', 'visakapatnam')),
+           ('Vijayawada', ('bezawada',)), ('Guntur', ()), ('Nellore', ()),
+           ('Kurnool', ()), ('Tirupati', ('tirupathi',)), ('Anantapur', ('ananthapur', 'anantapuramu')),
+           ('Kadapa', ('cuddapah',)), ('Chittoor', ()), ('Srikakulam', ()), ('Kakinada', ())],
+    'AR': [('Itanagar', ()), ('Tawang', ())],
+    'AS': [('Guwahati', ('gauhati',)), ('Kamrup', ()), ('Dibrugarh', ()), ('Silchar', ()),
+           ('Jorhat', ()), ('Tezpur', ()), ('Goalpara', ())],
+    'BR': [('Patna', ()), ('Gaya', ()), ('Muzaffarpur', ()), ('Bhagalpur', ()),
+           ('Darbhanga', ()), ('Purnia', ('purnea',)), ('Aurangabad', ())],
+    'CG': [('Raipur', ()), ('Bilaspur', ()), ('Durg', ()), ('Bhilai', ()), ('Korba', ()),
+           ('Raigarh', ()), ('Bastar', ('jagdalpur',))],
+    'DL': [('New Delhi', ()), ('South Delhi', ()), ('North Delhi', ()), ('East Delhi', ()),
+           ('West Delhi', ()), ('Shahdara', ('shahdra',))],
+    'GA': [('North Goa', ('panaji', 'panjim', 'mapusa')), ('South Goa', ('margao', 'madgaon', 'vasco'))],
+    'GJ': [('Ahmedabad', ('amdavad', 'ahmadabad')), ('Surat', ()), ('Vadodara', ('baroda',)),
+           ('Rajkot', ()), ('Bhavnagar', ()), ('Jamnagar', ()), ('Gandhinagar', ()),
+           ('Junagadh', ()), ('Kutch', ('kachchh', 'bhuj'))],
+    'HR': [('Gurugram', ('gurgaon',)), ('Faridabad', ()), ('Panipat', ()), ('Ambala', ()),
+           ('Karnal', ()), ('Hisar', ('hissar',)), ('Rohtak', ()), ('Sonipat', ('sonepat',))],
+    'HP': [('Shimla', ('simla',)), ('Kangra', ('dharamshala', 'dharamsala')), ('Kullu', ('kulu',)),
+           ('Solan', ()), ('Hamirpur', ()), ('Bilaspur', ()), ('Chamba', ())],
+    'JK': [('Srinagar', ()), ('Jammu', ()), ('Anantnag', ()), ('Baramulla', ()), ('Udhampur', ())],
+    'JH': [('Ranchi', ()), ('Jamshedpur', ('east singhbhum',)), ('Dhanbad', ()), ('Bokaro', ()),
+           ('Hazaribagh', ('hazaribag',)), ('Deoghar', ())],
+    'KA': [('Bengaluru', ('bangalore', 'bengaluru urban', 'bangaluru', 'banglore')),
+           ('Mysuru', ('mysore',)), ('Mangaluru', ('mangalore', 'dakshina kannada')),
+           ('Hubballi', ('hubli', 'dharwad', 'hubli dharwad')), ('Belagavi', ('belgaum',)),
+           ('Kalaburagi', ('gulbarga',)), ('Ballari', ('bellary',)), ('Shivamogga', ('shimoga',)),
+           ('Tumakuru', ('tumkur',)), ('Udupi', ()), ('Vijayapura', ('bijapur',))],
+    'KL': [('Thiruvananthapuram', ('trivandrum', 'tvm')), ('Kochi', ('cochin', 'ernakulam')),
+           ('Kozhikode', ('calicut',)), ('Thrissur', ('trichur',)), ('Kollam', ('quilon',)),
+           ('Kannur', ('cannanore',)), ('Palakkad', ('palghat',)), ('Alappuzha', ('alleppey',)),
+           ('Kottayam', ()), ('Malappuram', ())],
+    'LA': [('Leh', ()), ('Kargil', ())],
+    'MP': [('Bhopal', ()), ('Indore', ()), ('Jabalpur', ()), ('Gwalior', ()), ('Ujjain', ()),
+           ('Sagar', ()), ('Rewa', ()), ('Satna', ())],
+    'MH': [('Mumbai', ('bombay', 'mumbai suburban', 'mumbai city')), ('Pune', ('poona',)),
+           ('Nagpur', ()), ('Nashik', ('nasik',)), ('Thane', ()),
+           ('Aurangabad', ('chhatrapati sambhajinagar', 'sambhajinagar')), ('Solapur', ('sholapur',)),
+           ('Kolhapur', ()), ('Amravati', ()), ('Raigad', ()), ('Satara', ()), ('Latur', ())],
+    'MN': [('Imphal', ())],
+    'ML': [('Shillong', ('east khasi hills',)), ('Tura', ())],
+    'MZ': [('Aizawl', ())],
+    'NL': [('Kohima', ()), ('Dimapur', ())],
+    'OD': [('Bhubaneswar', ('bhubaneshwar', 'khordha', 'khurda')), ('Cuttack', ()),
+           ('Puri', ()), ('Sambalpur', ()), ('Berhampur', ('brahmapur', 'ganjam')),
+           ('Rourkela', ('sundargarh',)), ('Balasore', ('baleshwar',))],
+    'PY': [('Karaikal', ()), ('Mahe', ()), ('Yanam', ())],
+    'PB': [('Ludhiana', ()), ('Amritsar', ()), ('Jalandhar', ('jullundur',)), ('Patiala', ()),
+           ('Bathinda', ('bhatinda',)), ('Mohali', ('sas nagar',))],
+    'RJ': [('Jaipur', ()), ('Jodhpur', ()), ('Udaipur', ()), ('Kota', ()), ('Ajmer', ()),
+           ('Bikaner', ()), ('Alwar', ()), ('Bhilwara', ()), ('Sikar', ()), ('Barmer', ()),
+           ('Jaisalmer', ())],
+    'SK': [('Gangtok', ('east sikkim',))],
+    'TN': [('Chennai', ('madras',)), ('Coimbatore', ('kovai',)), ('Madurai', ()),
+           ('Tiruchirappalli', ('trichy', 'tiruchi', 'tiruchirapalli')), ('Salem', ()),
+           ('Tirunelveli', ('nellai',)), ('Tiruppur', ('tirupur',)), ('Vellore', ()),
+           ('Erode', ()), ('Thoothukudi', ('tuticorin',)), ('Thanjavur', ('tanjore',)),
+           ('Kanniyakumari', ('kanyakumari', 'nagercoil')), ('Dindigul', ()),
+           ('Kancheepuram', ('kanchipuram',)), ('Chengalpattu', ())],
+    'TS': [('Hyderabad', ('secunderabad',)), ('Warangal', ()), ('Karimnagar', ()),
+           ('Nizamabad', ()), ('Khammam', ()), ('Rangareddy', ('ranga reddy',))],
+    'TR': [('Agartala', ('west tripura',))],
+    'UP': [('Lucknow', ()), ('Kanpur', ('cawnpore',)), ('Varanasi', ('banaras', 'benares', 'kashi')),
+           ('Prayagraj', ('allahabad',)), ('Agra', ()), ('Ghaziabad', ()),
+           ('Gautam Buddha Nagar', ('noida', 'greater noida')), ('Meerut', ()),
+           ('Gorakhpur', ()), ('Bareilly', ()), ('Aligarh', ()), ('Moradabad', ()),
+           ('Jhansi', ()), ('Ayodhya', ('faizabad',)), ('Hamirpur', ()), ('Pratapgarh', ())],
+    'UK': [('Dehradun', ('dehra dun',)), ('Haridwar', ('hardwar',)), ('Nainital', ()),
+           ('Udham Singh Nagar', ('rudrapur',))],
+    'WB': [('Kolkata', ('calcutta',)), ('Howrah', ('haora',)), ('North 24 Parganas', ()),
+           ('South 24 Parganas', ()), ('Darjeeling', ('darjiling', 'siliguri')),
+           ('Paschim Bardhaman', ('asansol', 'durgapur')), ('Purba Bardhaman', ('burdwan', 'bardhaman')),
+           ('Murshidabad', ()), ('Nadia', ('krishnanagar',)), ('Hooghly', ('hugli',))],
+}
+DISTRICTS['RJ'].append(('Pratapgarh', ()))
+
+_NON_ALNUM = re.compile(r'[^a-z0-9&]+')
+_MAX_PHRASE_WORDS = 4
+
+
+def _normalise(text):
+    return _NON_ALNUM.sub(' ', text.lower()).split()
+
+
+def _slug(name):
+    return '-'.join(_normalise(name))
+
+
+def district_code(state, name):
+    return f'{state}-{_slug(name)}'
+
+
+def _build_indexes():
+    states = {}
+    for code, (name, aliases) in STATES.items():
+        for alias in (name,) + aliases:
+            states[' '.join(_normalise(alias))] = code
+    districts = {}
+    for state, entries in DISTRICTS.items():
+        for name, aliases in entries:
+            code = district_code(state, name)
+            for alias in (name,) + aliases:
+                districts.setdefault(' '.join(_normalise(alias)), set()).add(code)
+    return states, districts
+
+
+STATE_INDEX, DISTRICT_INDEX = _build_indexes()
+
+# State aliases by first letter; misspellings almost always keep it, and it
+# keeps the fuzzy fallback to a handful of comparisons per phrase.
+_FUZZY_CANDIDATES = {}
+for _alias in STATE_INDEX:
+    _FUZZY_CANDIDATES.setdefault(_alias[0], []).append(_alias)
+STATE_NAMES = {code: name for code, (name, _) in STATES.items()}
+
+
+def state_of(district):
+    return district.split('-', 1)[0]
+
+
+def _phrases(words):
+    """(position, phrase) for every 1..4-word window, longest first."""
+    for n in range(min(_MAX_PHRASE_WORDS, len(words)), 0, -1):
+        for i in range(len(words) - n + 1):
+            yield i, ' '.join(words[i:i + n])
+
+
+def parse_address(address):
+    """
+    Return (state_code, district_code) for a free-text address; either may
+    be None.  The state mentioned last wins (Indian addresses end with the
+    state); a district is only accepted if it agrees with that state, a
+    district alone implies its state, and misspelt state names are only
+    tried when nothing else matched.
+    """
+    if not address:
+        return None, None
+    words = _normalise(address)
+    state_hits, district_hits = [], []
+    for pos, phrase in _phrases(words):
+        if phrase in STATE_INDEX:
+            state_hits.append((pos, STATE_INDEX[phrase]))
+        if phrase in DISTRICT_INDEX:
+            district_hits.append((pos, DISTRICT_INDEX[phrase]))
+    for token in re.findall(r'\b[A-Z&]{2,3}\b', address):
+        if token in STATE_ABBREVIATIONS:
+            state_hits.append((len(words), STATE_ABBREVIATIONS[token]))
+
+    state = max(state_hits)[1] if state_hits else None
+    district = None
+    for _, codes in sorted(district_hits, reverse=True):
+        if state:
+            match = [c for c in codes if state_of(c) == state]
+        else:
+            match = list(codes)
+        if len(match) == 1:
+            district = match[0]
+            break
+    if state is None:
+        state = state_of(district) if district else _fuzzy_state(words)
+    return state, district
+
+
+def _fuzzy_state(words):
+    """Last-resort match of misspelt state names ("karnatakka", "rajastahn")."""
+    for _, phrase in _phrases(words):
+        if len(phrase) < 5:
+            continue
+        candidates = _FUZZY_CANDIDATES.get(phrase[0], ())
+        close = difflib.get_close_matches(phrase, candidates, n=1, cutoff=0.88)
+        if close:
+            return STATE_INDEX[close[0]]
+    return None
+
+
+def location_code(text):
+    """
+    Code for a rule location or scheme state: a state code when the text
+    names a state, otherwise a district code, otherwise None ("Central",
+    "Multiple States", unknown places).
+    """
+    if not text:
+        return None
+    phrase = ' '.join(_normalise(text))
+    if phrase in STATE_INDEX:
+        return STATE_INDEX[phrase]
+    codes = DISTRICT_INDEX.get(phrase)
+    if codes and len(codes) == 1:
+        return next(iter(codes))
+    state, district = parse_address(text)
+    return district or state
+
+
+def state_code(text):
+    """State-level code for a Schemes.state value, or None."""
+    code = location_code(text)
+    return state_of(code) if code else None
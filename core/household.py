@@ -0,0 +1,47 @@
+"""
+Household (family) eligibility.
+
+Field workers register whole families at once.  Rather than a separate
+``check_user_eligibility`` per member, each with its own rule lookup and
+write, ``check_household_eligibility`` loads the members in one query and
+hands them to ``eligibility.check_users_eligibility``: one rule set, one
+UserCategories query and one bulk write for the whole family.
+
+``household_benefits`` merges the members' stored results into a single
+view: every scheme at least one member qualifies for, with who qualifies.
+"""
+from .eligibility import ELIGIBLE, check_users_eligibility
+from .models import CustomUser, UserEligibility
+
+
+def household_members(household_id):
+    return list(CustomUser.objects.filter(household_id=household_id).order_by('dob', 'user_id'))
+
+
+def check_household_eligibility(household_id, members=None):
+    """Full check of every member of ``household_id``; {user_id: results}."""
+    if members is None:
+        members = household_members(household_id)
+    if not members:
+        return {}
+    return check_users_eligibility(members)
+
+
+def household_benefits(household_id, members=None):
+    """
+    [{'scheme', 'members', 'score'}] for each scheme at least one member is
+    Eligible for, with those members and their best match score; schemes
+    more of the family qualify for come first.
+    """
+    if members is None:
+        members = household_members(household_id)
+    by_id = {member.user_id: member for member in members}
+    benefits = {}
+    for row in UserEligibility.objects.filter(
+        user_id__in=list(by_id), eligibility_status=ELIGIBLE
+    ).select_related('scheme').order_by('scheme_id', 'user_id'):
+        entry = benefits.setdefault(row.scheme_id, {'scheme': row.scheme, 'members': [], 'score': 0})
+        entry['members'].append(by_id[row.user_id])
+        entry['score'] = max(entry['score'], row.match_score or 0)
+    return sorted(benefits.values(), key=lambda e: (-len(e['members']), -e['score'],
+                                                    e['scheme'].scheme_name))
@@ -0,0 +1,195 @@
+"""
+Queued eligibility runs.
+
+Views request eligibility runs with ``enqueue_eligibility_job``.  By default
+the run happens before it returns, on an unsaved job, so nothing is written
+to Eligibility_Jobs.  With ELIGIBILITY_JOBS_ASYNC on, views redirect
+straight away instead; the ``process_eligibility_jobs`` management command
+claims queued jobs from the Eligibility_Jobs table and runs them with the
+in-process engine, and the dashboard polls ``job_progress`` over JSON until
+the job has finished.
+
+At most one job per user is ever queued: a second request while the first
+is still waiting merges into it (a full check absorbs any incremental one,
+two incremental rechecks union their changed fields and categories).  Once
+a worker has claimed a job, new requests queue a fresh one, so edits made
+during a run are never lost.
+"""
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import eligibility
+from .models import EligibilityJob, Scheme, UserEligibility
+
+
+def _split(value):
+    return [item for item in (value or '').split(',') if item]
+
+
+def _merge_fields(queued, requested):
+    """Combine the changed-field lists of two requests; None means a full check."""
+    if queued is None or requested is None:
+        return None
+    return ','.join(sorted(set(_split(queued)) | set(_split(requested))))
+
+
+def enqueue_eligibility_job(user, changed_fields=None, changed_categories=None):
+    """
+    Queue an eligibility run for ``user`` and return its EligibilityJob.
+    ``changed_fields`` and ``changed_categories`` limit the run to an
+    incremental recheck of those profile fields and of the schemes ruled
+    by those categories; with neither, a full check is queued.  With
+    ``ELIGIBILITY_JOBS_ASYNC`` off (the default) the run happens right away
+    and the finished job is returned without being saved.
+    """
+    fields = categories = None
+    if changed_fields is not None or changed_categories is not None:
+        fields = ','.join(sorted(eligibility.ELIGIBILITY_FIELDS.intersection(changed_fields or ())))
+        categories = ','.join(sorted({str(c) for c in changed_categories or ()}))
+
+    if not getattr(settings, 'ELIGIBILITY_JOBS_ASYNC', False):
+        return run_job(EligibilityJob(
+            user=user, status=EligibilityJob.RUNNING, started_at=timezone.now(),
+            changed_fields=fields, changed_categories=categories,
+        ))
+
+    while True:
+        job = EligibilityJob.objects.filter(pending_user_id=user.user_id).first()
+        if job is not None:
+            merged = _merge_fields(job.changed_fields, fields)
+            merged_categories = None if merged is None else _merge_fields(
+                job.changed_categories or '', categories)
+            if EligibilityJob.objects.filter(
+                job_id=job.job_id, pending_user_id=user.user_id
+            ).update(changed_fields=merged, changed_categories=merged_categories):
+                job.changed_fields = merged
+                job.changed_categories = merged_categories
+                break
+            # A worker claimed it meanwhile; queue a new one behind it.
+            continue
+        try:
+            with transaction.atomic():
+                job = EligibilityJob.objects.create(
+                    user_id=user.user_id, pending_user_id=user.user_id,
+                    changed_fields=fields, changed_categories=categories,
+                )
+            break
+        except IntegrityError:
+            # Another request queued one between our SELECT and INSERT.
+            continue
+    return job
+
+
+def _claimable(stale_after):
+    """Queued jobs, plus running ones whose worker has been silent too long."""
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    return Q(status=EligibilityJob.QUEUED) | Q(status=EligibilityJob.RUNNING, started_at__lt=cutoff)
+
+
+def claim_job(job_id, stale_after=None):
+    """Atomically mark ``job_id`` as running; False if someone else got it."""
+    if stale_after is None:
+        stale_after = getattr(settings, 'ELIGIBILITY_JOB_TIMEOUT_SECONDS', 300)
+    return bool(EligibilityJob.objects.filter(_claimable(stale_after), job_id=job_id).update(
+        status=EligibilityJob.RUNNING, started_at=timezone.now(), pending_user_id=None,
+    ))
+
+
+def claim_next_job(stale_after=None):
+    """The oldest claimable job, now marked running, or None."""
+    if stale_after is None:
+        stale_after = getattr(settings, 'ELIGIBILITY_JOB_TIMEOUT_SECONDS', 300)
+    candidates = EligibilityJob.objects.filter(
+        _claimable(stale_after)
+    ).order_by('job_id').values_list('job_id', flat=True)[:10]
+    for job_id in candidates:
+        if claim_job(job_id, stale_after):
+            return EligibilityJob.objects.select_related('user').get(job_id=job_id)
+    return None
+
+
+def _full_check(user):
+    previous = dict(UserEligibility.objects.filter(
+        user_id=user.user_id
+    ).values_list('scheme_id', 'eligibility_status'))
+    results = eligibility.check_user_eligibility(user)
+    return [
+        (scheme_id, previous.get(scheme_id), status)
+        for scheme_id, (status, _, _) in results.items()
+        if previous.get(scheme_id) != status
+    ]
+
+
+def _combine_flips(first, second):
+    """Chain two passes' flips: a scheme keeps its first old and last new status."""
+    combined = {scheme_id: [old, new] for scheme_id, old, new in first}
+    for scheme_id, old, new in second:
+        combined.setdefault(scheme_id, [old, new])[1] = new
+    return [(scheme_id, old, new) for scheme_id, (old, new) in combined.items() if old != new]
+
+
+def describe_flips(flips):
+    """{'gained': [...], 'lost': [...]} scheme names from [(scheme_id, old, new)]."""
+    gained = [sid for sid, old, new in flips if new == eligibility.ELIGIBLE]
+    lost   = [sid for sid, old, new in flips
+              if old == eligibility.ELIGIBLE and new != eligibility.ELIGIBLE]
+    names = dict(Scheme.objects.filter(
+        scheme_id__in=gained + lost
+    ).values_list('scheme_id', 'scheme_name')) if gained or lost else {}
+    return {
+        'gained': [names.get(s, f'#{s}') for s in gained],
+        'lost':   [names.get(s, f'#{s}') for s in lost],
+    }
+
+
+def run_job(job):
+    """Run a claimed job and record its outcome on the row, if it has one."""
+    try:
+        if job.changed_fields is None:
+            flips = _full_check(job.user)
+        else:
+            flips = eligibility.recheck_changed_fields(job.user, _split(job.changed_fields))
+            categories = [int(c) for c in _split(job.changed_categories)]
+            if categories:
+                flips = _combine_flips(
+                    flips, eligibility.recheck_categories(job.user, categories))
+        job.result = describe_flips(flips)
+        job.status = EligibilityJob.DONE
+    except Exception:
+        job.error = traceback.format_exc()
+        job.status = EligibilityJob.FAILED
+    job.finished_at = timezone.now()
+    if job.pk is not None:
+        job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+    return job
+
+
+def purge_finished_jobs(days):
+    """Delete jobs that finished more than ``days`` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = EligibilityJob.objects.filter(
+        status__in=[EligibilityJob.DONE, EligibilityJob.FAILED], finished_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def job_progress(job):
+    """JSON-ready status of ``job`` for the dashboard's poller."""
+    data = {
+        'job_id':   job.job_id,
+        'status':   job.status,
+        'finished': job.is_finished,
+        'progress': {EligibilityJob.QUEUED: 0, EligibilityJob.RUNNING: 50}.get(job.status, 100),
+    }
+    if job.status == EligibilityJob.QUEUED:
+        data['position'] = EligibilityJob.objects.filter(
+            status=EligibilityJob.QUEUED, job_id__lt=job.job_id
+        ).count() + 1
+    if job.status == EligibilityJob.DONE:
+        data['result'] = job.result or {'gained': [], 'lost': []}
+    return data
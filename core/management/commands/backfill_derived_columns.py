@@ -0,0 +1,79 @@
+"""
+Populate the columns models derive on save() — education levels
+(core/education.py) and gazetteer location codes (core/gazetteer.py) — for
+rows written before the columns existed, by raw SQL that skipped them, or
+after the keyword / gazetteer tables changed.
+
+Rules whose codes change bump their categories' rules_version, so users'
+stored eligibility is recomputed like after any other rule edit.  Users
+whose own codes change are marked stale in every category they belong to,
+and recomputed on their next dashboard load as well.
+
+Usage:
+    python manage.py backfill_derived_columns
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.dashboard_cache import bump_catalog_version, bump_dashboard_version
+from core.eligibility import invalidate_rule_cache
+from core.models import CustomUser, RuleEngine, Scheme
+from core.recompute import bump_rules_version, mark_category_dirty, mark_users_stale
+
+
+class Command(BaseCommand):
+    help = 'Recompute education levels and location codes from their free-text source columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def _backfill(self, model, batch_size, key=None):
+        """
+        Rewrite ``model``'s derived columns where they changed.  Returns the
+        number of rows updated and the set of their ``key`` values.
+        """
+        key = key or model._meta.pk.attname
+        sources = list(model.DERIVED_FIELDS)
+        derived = [f for fields in model.DERIVED_FIELDS.values() for f in fields]
+        changed, keys = [], set()
+        total = 0
+        queryset = model.objects.only(model._meta.pk.name, key, *sources, *derived)
+        for obj in queryset.iterator(chunk_size=batch_size):
+            before = [getattr(obj, f) for f in derived]
+            obj.refresh_derived_fields()
+            if [getattr(obj, f) for f in derived] != before:
+                changed.append(obj)
+                keys.add(getattr(obj, key))
+            if len(changed) >= batch_size:
+                total += self._flush(model, changed, derived, batch_size)
+                changed = []
+        return total + self._flush(model, changed, derived, batch_size), keys
+
+    @staticmethod
+    def _flush(model, objs, fields, batch_size):
+        if objs:
+            with transaction.atomic():
+                model.objects.bulk_update(objs, fields, batch_size=batch_size)
+        return len(objs)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        users, user_ids = self._backfill(CustomUser, batch_size)
+        rules, rule_categories = self._backfill(RuleEngine, batch_size, 'category_id')
+        schemes, _ = self._backfill(Scheme, batch_size)
+        if users:
+            mark_users_stale(user_ids, batch_size)
+            bump_dashboard_version(*user_ids)
+        if schemes and not rules:
+            bump_catalog_version()
+        if rules:
+            invalidate_rule_cache()
+            bump_catalog_version()
+            bump_rules_version(*rule_categories)
+            if getattr(settings, 'ELIGIBILITY_EAGER_RECOMPUTE', False):
+                mark_category_dirty(*rule_categories)
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated derived columns on {users} user(s), {rules} rule(s) '
+            f'and {schemes} scheme(s).'
+        ))
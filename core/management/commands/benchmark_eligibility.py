@@ -0,0 +1,92 @@
+"""
+Time the eligibility engine on synthetic populations and emit JSON.
+
+Runs only with beneficiary_system/settings_benchmark.py (local SQLite by
+default, local MySQL when BENCHMARK_MYSQL_DATABASE is set), because it drops
+and refills the eligibility tables.
+
+Usage:
+    python manage.py benchmark_eligibility --settings=beneficiary_system.settings_benchmark
+    python manage.py benchmark_eligibility --settings=beneficiary_system.settings_benchmark \\
+        --users 1000 100000 1000000 --rules 5000 --output bench.json
+    python manage.py benchmark_eligibility --settings=beneficiary_system.settings_benchmark \\
+        --scenario evaluate --scenario match_scores
+"""
+import json
+import platform
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core.benchmarks import SCENARIOS, build_population, run_suite
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=settings.BASE_DIR, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = 'Benchmark eligibility evaluation on synthetic populations (JSON output).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, nargs='+', default=[1000, 10000],
+                            help='Population sizes to build and time (e.g. 1000 1000000).')
+        parser.add_argument('--rules', type=int, default=300,
+                            help='Rule_Engine rows per population (schemes = rules / 3).')
+        parser.add_argument('--categories', type=int, default=12)
+        parser.add_argument('--sample', type=int, default=200,
+                            help='Users timed individually per scenario.')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=sorted(SCENARIOS),
+                            help='Only run these scenarios (repeatable).')
+        parser.add_argument('--seed', type=int, default=7)
+        parser.add_argument('--output', help='Write the JSON here instead of stdout.')
+
+    def handle(self, *args, **options):
+        if not getattr(settings, 'ELIGIBILITY_BENCHMARK_DATABASE', False):
+            raise CommandError(
+                'This command drops the eligibility tables. Run it with '
+                '--settings=beneficiary_system.settings_benchmark.'
+            )
+
+        report = {
+            'commit':   _git_commit(),
+            'database': connection.vendor,
+            'python':   platform.python_version(),
+            'started':  time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'runs':     [],
+        }
+        for users in options['users']:
+            self.stderr.write(f'Building {users} users x {options["rules"]} rules...')
+            started = time.perf_counter()
+            population = build_population(users, rules=options['rules'],
+                                          categories=options['categories'], seed=options['seed'])
+            built = time.perf_counter() - started
+            self.stderr.write(f'  built in {built:.1f}s, timing...')
+            results = run_suite(population, sample=options['sample'],
+                                scenarios=options['scenarios'], seed=options['seed'])
+            for name, stats in results.items():
+                self.stderr.write(f'  {name:<24} median {stats["median_ms"]:10.3f} ms'
+                                  f'  ({stats["calls"]} call(s))')
+            report['runs'].append({
+                'population': population,
+                'build_s':    round(built, 2),
+                'results':    results,
+            })
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Wrote {options["output"]}'))
+        else:
+            self.stdout.write(text)
@@ -0,0 +1,129 @@
+"""
+Benchmark the rule index against the linear per-category scan.
+
+Rules and profiles are synthesised in memory (nothing is read from or
+written to the database), shaped like state-specific Rule_Engine data:
+most rules carry a state or district, an age band, an income ceiling and an
+education requirement.  Both paths must return the same eligible schemes.
+
+Usage:
+    python manage.py benchmark_rule_index                       # 1k, 10k, 100k rules
+    python manage.py benchmark_rule_index --sizes 50000 --profiles 500
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.eligibility import (
+    ELIGIBLE, CompiledRule, Profile, RuleSet, eligible_schemes, evaluate,
+)
+from core.gazetteer import DISTRICTS, STATES, district_code
+
+GENDERS = ('Male', 'Female')
+EDUCATION = (None, '10th Pass', '12th Pass', 'Diploma', 'Graduate', 'Post Graduate')
+
+
+def _locations():
+    codes = list(STATES)
+    codes += [district_code(state, name) for state, entries in DISTRICTS.items()
+              for name, _ in entries]
+    return codes
+
+
+def synthetic_rules(n, categories, rng):
+    locations = _locations()
+    rules = []
+    for rule_id in range(1, n + 1):
+        age_min = rng.choice((None, 14, 18, 21, 25, 40, 60))
+        age_max = rng.choice((None, 35, 45, 59, 80)) if rng.random() < 0.6 else None
+        location = rng.choice(locations) if rng.random() < 0.9 else None
+        rules.append(CompiledRule({
+            'rule_id':                 rule_id,
+            'scheme_id':               rng.randrange(1, n // 3 + 2),
+            'category_id':             rng.randrange(1, categories + 1),
+            'age_min':                 age_min,
+            'age_max':                 age_max,
+            'gender':                  rng.choice(GENDERS) if rng.random() < 0.3 else None,
+            'location':                location,
+            'location_code':           location,
+            'min_income':              None,
+            'max_income':              (Decimal(rng.randrange(1, 20) * 50000)
+                                        if rng.random() < 0.7 else None),
+            'education_required':      rng.choice(EDUCATION),
+            'education_level':         None,
+            'pension_status':          False,
+            'disability_cert':         rng.random() < 0.05,
+            'unemployment_status':     False,
+            'business_turnover_limit': None,
+        }))
+    return rules
+
+
+def synthetic_profiles(n, rng):
+    states = list(DISTRICTS)
+    profiles = []
+    for user_id in range(1, n + 1):
+        state = rng.choice(states)
+        name, _ = rng.choice(DISTRICTS[state])
+        profiles.append(Profile(
+            user_id=user_id,
+            age=rng.randrange(16, 80),
+            gender=rng.choice(GENDERS).lower(),
+            income=Decimal(rng.randrange(0, 1000000)),
+            address=f'{name}, {STATES[state][0]}'.lower(),
+            locations=frozenset((state, district_code(state, name))),
+            education_level=rng.randrange(0, 6),
+        ))
+    return profiles
+
+
+class Command(BaseCommand):
+    help = 'Compare indexed and linear rule matching on synthetic rule sets.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                            help='Rule-set sizes to benchmark.')
+        parser.add_argument('--profiles', type=int, default=200,
+                            help='Profiles evaluated per size.')
+        parser.add_argument('--categories', type=int, default=12,
+                            help='Number of categories rules are spread over.')
+        parser.add_argument('--seed', type=int, default=7)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        profiles = synthetic_profiles(options['profiles'], rng)
+        memberships = [
+            rng.sample(range(1, options['categories'] + 1), k=min(2, options['categories']))
+            for _ in profiles
+        ]
+        self.stdout.write(f'{len(profiles)} profiles, {options["categories"]} categories')
+
+        for size in options['sizes']:
+            rule_set = RuleSet(synthetic_rules(size, options['categories'], rng))
+            started = time.perf_counter()
+            rule_set.index
+            built = time.perf_counter() - started
+
+            started = time.perf_counter()
+            linear = [
+                {sid: out for sid, out in evaluate(p, cats, rule_set).items() if out[0] == ELIGIBLE}
+                for p, cats in zip(profiles, memberships)
+            ]
+            linear_time = time.perf_counter() - started
+
+            started = time.perf_counter()
+            indexed = [eligible_schemes(p, cats, rule_set)
+                       for p, cats in zip(profiles, memberships)]
+            indexed_time = time.perf_counter() - started
+
+            if linear != indexed:
+                raise CommandError(f'{size} rules: index and linear scan disagree')
+            per = 1000 / len(profiles)
+            self.stdout.write(
+                f'{size:>7} rules: linear {linear_time * per:8.3f} ms/profile, '
+                f'indexed {indexed_time * per:8.3f} ms/profile '
+                f'({linear_time / max(indexed_time, 1e-9):5.1f}x), '
+                f'index built in {built:.2f}s'
+            )
@@ -0,0 +1,47 @@
+"""
+Worker for eligibility runs queued by the views in Eligibility_Jobs.
+
+Usage:
+    python manage.py process_eligibility_jobs            # run forever
+    python manage.py process_eligibility_jobs --once     # drain the queue and exit
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.jobs import claim_next_job, purge_finished_jobs, run_job
+
+
+class Command(BaseCommand):
+    help = 'Process queued eligibility jobs.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Seconds to wait between polls when the queue is empty.')
+        parser.add_argument(
+            '--keep-days', type=int,
+            default=getattr(settings, 'ELIGIBILITY_JOB_RETENTION_DAYS', 7),
+            help='Finished jobs older than this are deleted while idle.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process every queued job and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+            if job is None:
+                purge_finished_jobs(options['keep_days'])
+                if options['once']:
+                    return
+                time.sleep(options['sleep'])
+                continue
+            run_job(job)
+            if job.status == job.DONE:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Job {job.job_id} (user {job.user_id}): '
+                    f'{len(job.result["gained"])} gained, {len(job.result["lost"])} lost.'
+                ))
+            else:
+                self.stderr.write(f'Job {job.job_id} (user {job.user_id}) failed:\n{job.error}')
@@ -0,0 +1,61 @@
+"""
+Background eligibility recompute for categories marked dirty by rule or
+scheme edits.
+
+Usage:
+    python manage.py recompute_eligibility            # run forever
+    python manage.py recompute_eligibility --once     # drain one batch and exit
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.recompute import recompute_dirty_categories
+
+
+class Command(BaseCommand):
+    help = 'Recompute User_Eligibility for users in categories whose rules changed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--window', type=int,
+            default=getattr(settings, 'ELIGIBILITY_RECOMPUTE_WINDOW_SECONDS', 30),
+            help='Seconds a category must stay dirty before it is processed, '
+                 'so bursts of edits coalesce into one recompute.')
+        parser.add_argument(
+            '--max-wait', type=int,
+            default=getattr(settings, 'ELIGIBILITY_RECOMPUTE_MAX_WAIT_SECONDS', 300),
+            help='Seconds after its first pending edit a category is processed '
+                 'even if edits keep arriving.')
+        parser.add_argument(
+            '--chunk-size', type=int,
+            default=getattr(settings, 'ELIGIBILITY_RECOMPUTE_CHUNK_SIZE', 500),
+            help='Users per transaction.')
+        parser.add_argument(
+            '--sleep', type=float, default=5.0,
+            help='Seconds to wait between polls when nothing is dirty.')
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Process a single batch and exit.')
+
+    def handle(self, *args, **options):
+        def progress(done, total):
+            self.stdout.write(f'  {done}/{total} users recomputed')
+
+        while True:
+            categories, users = recompute_dirty_categories(
+                window_seconds=options['window'],
+                max_wait_seconds=options['max_wait'],
+                chunk_size=options['chunk_size'],
+                progress=progress,
+            )
+            if categories:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Recomputed {users} user(s) across {categories} dirty categor'
+                    f'{"y" if categories == 1 else "ies"}.'
+                ))
+            if options['once']:
+                return
+            if not categories:
+                time.sleep(options['sleep'])
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_fix_missing_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyCategory',
+            fields=[
+                ('category', models.OneToOneField(db_column='category_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='core.category')),
+                ('generation', models.IntegerField(default=1)),
+                ('marked_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'Dirty_Categories',
+                'managed': False,
+            },
+        ),
+    ]
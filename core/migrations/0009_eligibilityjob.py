@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-16 21:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_dirtycategory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EligibilityJob',
+            fields=[
+                ('job_id', models.AutoField(primary_key=True, serialize=False)),
+                ('pending_user_id', models.IntegerField(blank=True, null=True, unique=True)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Queued', max_length=10)),
+                ('changed_fields', models.CharField(blank=True, max_length=255, null=True)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'Eligibility_Jobs',
+                'managed': False,
+            },
+        ),
+    ]
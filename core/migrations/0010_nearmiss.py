@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_eligibilityjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NearMiss',
+            fields=[
+                ('near_miss_id', models.AutoField(primary_key=True, serialize=False)),
+                ('criterion', models.CharField(max_length=20)),
+                ('gap', models.DecimalField(decimal_places=2, max_digits=15)),
+                ('relative_gap', models.FloatField()),
+                ('message', models.CharField(max_length=255)),
+                ('computed_on', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'Near_Misses',
+                'managed': False,
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+"""
+Migration 0012: Announcements becomes a managed table with an optional
+display window (starts_at / ends_at).
+
+The table may already exist without the new columns (run_setup.py and
+migration 0007 used to create it by hand), so the schema change is done by
+``ensure_schedule_columns``, which creates the table or adds whichever
+column is missing.
+"""
+from django.db import migrations, models
+
+
+def ensure_schedule_columns(apps, schema_editor):
+    Announcement = apps.get_model('core', 'Announcement')
+    table = Announcement._meta.db_table
+    introspection = schema_editor.connection.introspection
+    with schema_editor.connection.cursor() as cursor:
+        if table not in introspection.table_names(cursor):
+            schema_editor.create_model(Announcement)
+            return
+        columns = {column.name for column in introspection.get_table_description(cursor, table)}
+    for name in ('starts_at', 'ends_at'):
+        if name not in columns:
+            schema_editor.add_field(Announcement, Announcement._meta.get_field(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_household'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AddField(
+                model_name='announcement',
+                name='starts_at',
+                field=models.DateTimeField(blank=True, null=True),
+            ),
+            migrations.AddField(
+                model_name='announcement',
+                name='ends_at',
+                field=models.DateTimeField(blank=True, null=True),
+            ),
+        ]),
+        migrations.RunPython(ensure_schedule_columns, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,15 @@
 from django.db import models
 
+from .education import rule_education_level, user_education_level
+from .gazetteer import location_code, parse_address, state_code
+
 
 class Category(models.Model):
     category_id = models.AutoField(primary_key=True)
     category_name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
+    # Bumped on every rule / scheme edit in the category (core/signals.py)
+    rules_version = models.IntegerField(default=0, editable=False)
 
     class Meta:
         managed = False
@@ -14,6 +19,24 @@ class Category(models.Model):
         return self.category_name
 
 
+class Household(models.Model):
+    """
+    A family registered together; its members' eligibility is evaluated as
+    one batch (see core/household.py).
+    """
+    household_id = models.AutoField(primary_key=True)
+    name         = models.CharField(max_length=255)
+    address      = models.CharField(max_length=255, blank=True, null=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'Households'
+
+    def __str__(self):
+        return self.name
+
+
 class CustomUser(models.Model):
     user_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
@@ -26,9 +49,26 @@ class CustomUser(models.Model):
     income = models.DecimalField(max_digits=15, decimal_places=2, blank=True, null=True)
     occupation = models.CharField(max_length=100, blank=True, null=True)
     education = models.CharField(max_length=100, blank=True, null=True)
+    # Derived from `education` on every save (see core/education.py)
+    education_level = models.SmallIntegerField(blank=True, null=True, editable=False)
+    # Derived from `address` on every save (see core/gazetteer.py)
+    state_code = models.CharField(max_length=4, blank=True, null=True, editable=False)
+    district_code = models.CharField(max_length=40, blank=True, null=True, editable=False)
+    pension_status = models.BooleanField(blank=True, null=True, default=False)
+    disability_cert = models.BooleanField(blank=True, null=True, default=False)
+    unemployment_status = models.BooleanField(blank=True, null=True, default=False)
+    business_turnover = models.DecimalField(max_digits=15, decimal_places=2, blank=True, null=True)
+    household = models.ForeignKey(Household, on_delete=models.SET_NULL, db_column='household_id',
+                                  blank=True, null=True, related_name='members')
     created_at = models.DateTimeField(auto_now_add=True)
     last_login = models.DateTimeField(null=True, blank=True)
 
+    # source column -> columns computed from it by refresh_derived_fields()
+    DERIVED_FIELDS = {
+        'education': ('education_level',),
+        'address': ('state_code', 'district_code'),
+    }
+
     class Meta:
         managed = False
         db_table = 'Users'
@@ -36,12 +76,22 @@ class CustomUser(models.Model):
     def __str__(self):
         return self.name
 
+    def refresh_derived_fields(self):
+        self.education_level = user_education_level(self.education)
+        self.state_code, self.district_code = parse_address(self.address)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        super().save(*args, **kwargs)
+
 
 class UserCategories(models.Model):
     user_cat_id = models.AutoField(primary_key=True)
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column='user_id')
     category = models.ForeignKey(Category, on_delete=models.CASCADE, db_column='category_id')
     selected_on = models.DateTimeField(auto_now_add=True)
+    # Category.rules_version this user's eligibility was last computed against
+    rules_version = models.IntegerField(blank=True, null=True, editable=False)
 
     class Meta:
         managed = False
@@ -62,9 +112,13 @@ class Scheme(models.Model):
     registration_link = models.URLField(max_length=500, blank=True, null=True)
     benefit_type = models.CharField(max_length=100, blank=True, null=True)
     state = models.CharField(max_length=100, blank=True, null=True)
+    # Gazetteer code for `state`; NULL for Central / multi-state schemes
+    state_code = models.CharField(max_length=4, blank=True, null=True, editable=False)
     # is_active removed: column does not exist in Railway MySQL
     # Will be re-added after DB migration is fixed
 
+    DERIVED_FIELDS = {'state': ('state_code',)}
+
     class Meta:
         managed = False
         db_table = 'Schemes'
@@ -72,14 +126,23 @@ class Scheme(models.Model):
     def __str__(self):
         return self.scheme_name
 
+    def refresh_derived_fields(self):
+        self.state_code = state_code(self.state)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        super().save(*args, **kwargs)
+
 
 class Announcement(models.Model):
     message = models.TextField()
     is_active = models.BooleanField(default=False)
+    # Optional display window; an active announcement outside it is hidden.
+    starts_at = models.DateTimeField(blank=True, null=True)
+    ends_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        managed = False   # Table created by run_setup.py, not by Django migrations
         db_table = 'Announcements'
 
     def __str__(self):
@@ -99,7 +162,14 @@ class UserEligibility(models.Model):
         max_length=20, choices=ELIGIBILITY_CHOICES, default='Pending'
     )
     reason = models.TextField(blank=True, null=True)
+    # Written by the eligibility engine (see core/eligibility.py): which
+    # criteria the deciding rule sets / the user met, and a 0-100 score
+    criteria_mask = models.IntegerField(blank=True, null=True)
+    match_score = models.SmallIntegerField(blank=True, null=True)
     applied_on = models.DateTimeField(auto_now_add=True)
+    # Last time eligibility_status actually changed; rewrites with the same
+    # result leave both timestamps alone.
+    status_changed_on = models.DateTimeField(blank=True, null=True)
 
     class Meta:
         managed = False
@@ -117,21 +187,125 @@ class RuleEngine(models.Model):
     age_max = models.IntegerField(blank=True, null=True)
     gender = models.CharField(max_length=10, blank=True, null=True)
     location = models.CharField(max_length=100, blank=True, null=True)
+    # Gazetteer state or district code for `location`; NULL if unrecognised
+    location_code = models.CharField(max_length=40, blank=True, null=True, editable=False)
     min_income = models.DecimalField(max_digits=15, decimal_places=2, blank=True, null=True)
     max_income = models.DecimalField(max_digits=15, decimal_places=2, blank=True, null=True)
     pension_status = models.BooleanField(blank=True, null=True)
     disability_cert = models.BooleanField(blank=True, null=True)
     unemployment_status = models.BooleanField(blank=True, null=True)
     education_required = models.CharField(max_length=100, blank=True, null=True)
+    # Derived from `education_required` on every save; 0 means no requirement.
+    # Kept for reporting only: the column defaults to 0 on rows written
+    # outside the model, so the engines classify education_required themselves.
+    education_level = models.SmallIntegerField(default=0, editable=False)
     business_turnover_limit = models.DecimalField(
         max_digits=15, decimal_places=2, blank=True, null=True
     )
     scheme = models.ForeignKey(Scheme, on_delete=models.CASCADE, db_column='scheme_id')
 
+    DERIVED_FIELDS = {
+        'education_required': ('education_level',),
+        'location': ('location_code',),
+    }
+
     class Meta:
         managed = False
         db_table = 'Rule_Engine'
 
+    def refresh_derived_fields(self):
+        self.education_level = rule_education_level(self.education_required)
+        self.location_code = location_code(self.location)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        super().save(*args, **kwargs)
+
+
+class DirtyCategory(models.Model):
+    """
+    A category whose rules or schemes changed and whose users still need an
+    eligibility recompute. ``generation`` is bumped on every further edit so
+    the recompute worker only clears markers it has actually processed.
+    ``marked_at`` is the latest edit and ``first_marked_at`` the oldest one
+    not yet recomputed.
+    """
+    category        = models.OneToOneField(Category, on_delete=models.CASCADE,
+                                           primary_key=True, db_column='category_id')
+    generation      = models.IntegerField(default=1)
+    marked_at       = models.DateTimeField(auto_now_add=True)
+    first_marked_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = False
+        db_table = 'Dirty_Categories'
+
+    def __str__(self):
+        return f"Dirty category {self.category_id} (gen {self.generation})"
+
+
+class EligibilityJob(models.Model):
+    """
+    A queued eligibility run for one user, processed by
+    ``python manage.py process_eligibility_jobs``. ``pending_user_id`` holds
+    the user id while the job is queued and is cleared when a worker claims
+    it; its unique index keeps at most one queued job per user, so repeated
+    requests merge into the job already waiting.
+    """
+    QUEUED, RUNNING, DONE, FAILED = 'Queued', 'Running', 'Done', 'Failed'
+    STATUS_CHOICES = [(s, s) for s in (QUEUED, RUNNING, DONE, FAILED)]
+
+    job_id          = models.AutoField(primary_key=True)
+    user            = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column='user_id')
+    pending_user_id = models.IntegerField(unique=True, blank=True, null=True)
+    status          = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Comma-separated profile fields for an incremental recheck; NULL = full check
+    changed_fields  = models.CharField(max_length=255, blank=True, null=True)
+    # Comma-separated category ids the user joined or left since the last run
+    changed_categories = models.CharField(max_length=255, blank=True, null=True)
+    result          = models.JSONField(blank=True, null=True)
+    error           = models.TextField(blank=True, null=True)
+    created_at      = models.DateTimeField(auto_now_add=True)
+    started_at      = models.DateTimeField(blank=True, null=True)
+    finished_at     = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        managed = False
+        db_table = 'Eligibility_Jobs'
+
+    def __str__(self):
+        return f"Eligibility job {self.job_id} for user {self.user_id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+
+class NearMiss(models.Model):
+    """
+    A scheme the user fails on exactly one measurable criterion (age, income
+    or education), refreshed with every eligibility run by core/near_miss.py.
+    ``gap`` is how far off they are in that criterion's unit (years, rupees
+    or education levels) and ``relative_gap`` the same as a fraction of the
+    threshold, which ranks them.
+    """
+    near_miss_id = models.AutoField(primary_key=True)
+    user         = models.ForeignKey(CustomUser, on_delete=models.CASCADE, db_column='user_id')
+    scheme       = models.ForeignKey(Scheme, on_delete=models.CASCADE, db_column='scheme_id')
+    criterion    = models.CharField(max_length=20)
+    gap          = models.DecimalField(max_digits=15, decimal_places=2)
+    relative_gap = models.FloatField()
+    message      = models.CharField(max_length=255)
+    computed_on  = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = False
+        db_table = 'Near_Misses'
+        unique_together = ('user', 'scheme')
+
+    def __str__(self):
+        return f"{self.user_id} misses {self.scheme_id} on {self.criterion}"
+
 
 # ── NEW MODELS ─────────────────────────────────────────────────────────────
 
@@ -0,0 +1,151 @@
+"""
+Near misses: schemes a user fails on exactly one measurable criterion.
+
+A scheme whose deciding rule fails only its minimum age, its income limit
+or its education requirement is within reach (a birthday, a lower declared
+income, a qualification), and how far off the user is can be measured.
+Gender, location and scheme-rule failures have no such distance, and a
+maximum age only moves further away, so they are never near misses.
+
+``near_misses`` finds them through the rule index instead of scanning every
+rule: one query with the education requirement relaxed, and one that stabs
+the age trees at each of the next ``ELIGIBILITY_NEAR_MISS_MAX_AGE_GAP``
+years.  Every candidate's checks are run and those failing exactly one
+of the criteria above are kept, ranked by the gap as a fraction of the
+threshold (Rs.5,000 over a Rs.1,00,000 limit is nearer than one level short
+of a diploma).  The closest ``ELIGIBILITY_NEAR_MISS_LIMIT`` are stored in
+Near_Misses by every eligibility run, so the dashboard and the assistant
+read them without evaluating anything.
+"""
+from decimal import Decimal
+from itertools import chain
+
+from django.conf import settings
+from django.utils import timezone
+
+from .dashboard_cache import bump_dashboard_version
+from .education import rule_education_level
+from .models import NearMiss
+
+
+NEAR_MISS_CRITERIA = ('age_min', 'income', 'education')
+CENTS = Decimal('0.01')
+
+
+class Miss:
+    """One scheme the user fails on ``criterion`` alone, ``gap`` units short."""
+    __slots__ = ('scheme_id', 'criterion', 'gap', 'relative_gap', 'message')
+
+    def __init__(self, scheme_id, criterion, gap, relative_gap, message):
+        self.scheme_id    = scheme_id
+        self.criterion    = criterion
+        self.gap          = gap
+        self.relative_gap = relative_gap
+        self.message      = message
+
+    def values(self):
+        return (self.criterion, self.gap, self.relative_gap, self.message)
+
+
+def max_age_gap():
+    return getattr(settings, 'ELIGIBILITY_NEAR_MISS_MAX_AGE_GAP', 5)
+
+
+def required_education(row):
+    return rule_education_level(row['education_required'])
+
+
+def describe(rule, criterion, gap):
+    """
+    The Miss for ``rule`` failing only ``criterion`` by ``gap`` (years,
+    rupees or education levels), or None if it is out of reach.
+    """
+    row = rule.row
+    if criterion == 'age_min':
+        if gap > max_age_gap() or (row['age_max'] is not None and row['age_max'] < row['age_min']):
+            return None
+        threshold = row['age_min']
+        message = f'Eligible in {gap} year{"s" if gap != 1 else ""} (minimum age {threshold})'
+    elif criterion == 'income':
+        threshold = row['max_income']
+        message = f'Income Rs.{gap:.2f} above the Rs.{threshold:.2f} limit'
+    else:
+        threshold = required_education(row)
+        message = f'Requires {row["education_required"]} education'
+    gap = Decimal(gap).quantize(CENTS)
+    return Miss(rule.scheme_id, criterion, gap, float(gap) / max(float(threshold), 1.0), message)
+
+
+def rank(misses, limit=None):
+    """The ``limit`` nearest misses, closest first."""
+    if limit is None:
+        limit = getattr(settings, 'ELIGIBILITY_NEAR_MISS_LIMIT', 5)
+    return sorted(misses, key=lambda m: (m.relative_gap, m.scheme_id))[:limit]
+
+
+def _gap(rule, criterion, profile):
+    row = rule.row
+    if criterion == 'age_min':
+        return row['age_min'] - profile.age
+    if criterion == 'income':
+        return profile.income - row['max_income']
+    return required_education(row) - profile.education_level
+
+
+def near_misses(profile, category_ids, rule_set, limit=None):
+    """Ranked [Miss] for ``profile`` against the rules in ``category_ids``."""
+    index = rule_set.index
+    ages = range(profile.age + 1, profile.age + max_age_gap() + 1)
+    checked, misses = set(), []
+    for rule in chain(index.candidates(profile, category_ids, any_education=True),
+                      index.candidates(profile, category_ids, ages=ages)):
+        if rule.rule_id in checked:
+            continue
+        checked.add(rule.rule_id)
+        failed = [criterion for criterion, check, _ in rule.checks if not check(profile)]
+        if len(failed) != 1 or failed[0] not in NEAR_MISS_CRITERIA:
+            continue
+        miss = describe(rule, failed[0], _gap(rule, failed[0], profile))
+        if miss is not None:
+            misses.append(miss)
+    return rank(misses, limit)
+
+
+def save_near_misses(misses, user_ids, batch_size=None):
+    """
+    Make Near_Misses hold exactly ``misses`` ({user_id: [Miss]}) for
+    ``user_ids``, writing only the rows that changed.
+    """
+    existing = {
+        (user_id, scheme_id): (pk, (criterion, gap, relative_gap, message))
+        for pk, user_id, scheme_id, criterion, gap, relative_gap, message
+        in NearMiss.objects.filter(user_id__in=user_ids).values_list(
+            'near_miss_id', 'user_id', 'scheme_id', 'criterion', 'gap',
+            'relative_gap', 'message',
+        )
+    }
+    now = timezone.now()
+    inserts, updates = [], []
+    for user_id in user_ids:
+        for miss in misses.get(user_id, ()):
+            pk, values = existing.pop((user_id, miss.scheme_id), (None, None))
+            if values == miss.values():
+                continue
+            row = NearMiss(
+                near_miss_id=pk, user_id=user_id, scheme_id=miss.scheme_id,
+                criterion=miss.criterion, gap=miss.gap, relative_gap=miss.relative_gap,
+                message=miss.message, computed_on=now,
+            )
+            (inserts if pk is None else updates).append(row)
+    if existing:
+        NearMiss.objects.filter(near_miss_id__in=[pk for pk, _ in existing.values()]).delete()
+    if inserts:
+        NearMiss.objects.bulk_create(inserts, batch_size=batch_size, ignore_conflicts=True)
+    if updates:
+        NearMiss.objects.bulk_update(
+            updates, ['criterion', 'gap', 'relative_gap', 'message', 'computed_on'],
+            batch_size=batch_size,
+        )
+    bump_dashboard_version(*(row.user_id for row in (*inserts, *updates)),
+                           *(user_id for user_id, _ in existing))
+    return len(inserts), len(updates), len(existing)
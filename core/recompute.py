@@ -0,0 +1,151 @@
+"""
+Deferred eligibility recompute after rule and scheme edits.
+
+Rule and scheme edits no longer recompute anybody inline (the old
+``trg_after_rule_update`` trigger re-ran the procedure for every user in the
+category, once per updated row, inside the UPDATE).  They call
+``bump_rules_version``, and each user is recomputed lazily the next time
+their dashboard is opened (``eligibility.refresh_if_stale``).
+
+With ``ELIGIBILITY_EAGER_RECOMPUTE`` on they also call
+``mark_category_dirty``; the ``recompute_eligibility`` management command
+then picks up every category that has gone one batch window without an
+edit, or has waited ELIGIBILITY_RECOMPUTE_MAX_WAIT_SECONDS since its first
+unprocessed edit, recomputes each affected user exactly once, and commits
+per chunk.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import eligibility
+from .models import Category, CustomUser, DirtyCategory, UserCategories
+
+
+def bump_rules_version(*category_ids):
+    """Advance the rules_version of ``category_ids``, making their users stale."""
+    category_ids = {c for c in category_ids if c is not None}
+    if category_ids:
+        Category.objects.filter(category_id__in=category_ids).update(
+            rules_version=F('rules_version') + 1
+        )
+
+
+def mark_users_stale(user_ids, batch_size=2000):
+    """
+    Make ``user_ids`` stale in all their categories, as a rules_version bump
+    would, without touching anyone else in those categories.
+    """
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), batch_size):
+        UserCategories.objects.filter(
+            user_id__in=user_ids[start:start + batch_size]
+        ).update(rules_version=None)
+
+
+def mark_category_dirty(*category_ids):
+    """
+    Record that the users of ``category_ids`` need a recompute.  Marking a
+    category again restarts its batch window, so a burst of edits is
+    recomputed once, a window after the last of them; ``first_marked_at``
+    is left alone so a category edited without pause still gets recomputed
+    after the maximum wait.
+    """
+    for category_id in {c for c in category_ids if c is not None}:
+        now = timezone.now()
+        updated = DirtyCategory.objects.filter(category_id=category_id).update(
+            generation=F('generation') + 1, marked_at=now,
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                DirtyCategory.objects.create(category_id=category_id)
+        except IntegrityError:
+            # Another request marked it between our UPDATE and INSERT.
+            DirtyCategory.objects.filter(category_id=category_id).update(
+                generation=F('generation') + 1, marked_at=now,
+            )
+
+
+def claim_dirty_categories(window_seconds, max_wait_seconds=None):
+    """
+    {category_id: generation} for markers untouched for the batch window,
+    or first marked more than ``max_wait_seconds`` ago.
+    """
+    if max_wait_seconds is None:
+        max_wait_seconds = getattr(settings, 'ELIGIBILITY_RECOMPUTE_MAX_WAIT_SECONDS', 300)
+    now = timezone.now()
+    return dict(
+        DirtyCategory.objects.filter(
+            Q(marked_at__lte=now - timedelta(seconds=window_seconds))
+            | Q(first_marked_at__lte=now - timedelta(seconds=max_wait_seconds))
+        ).values_list('category_id', 'generation')
+    )
+
+
+def release_dirty_categories(claimed, started_at):
+    """
+    Clear processed markers.  One re-marked meanwhile stays, with its
+    maximum wait counted from ``started_at``, when the recompute began.
+    """
+    for category_id, generation in claimed.items():
+        if not DirtyCategory.objects.filter(
+            category_id=category_id, generation=generation
+        ).delete()[0]:
+            DirtyCategory.objects.filter(category_id=category_id).update(
+                first_marked_at=started_at,
+            )
+
+
+def affected_user_ids(category_ids):
+    return list(
+        UserCategories.objects.filter(category_id__in=category_ids)
+        .values_list('user_id', flat=True).distinct().order_by('user_id')
+    )
+
+
+def recompute_users(user_ids, chunk_size=None, progress=None):
+    """
+    Recompute eligibility for ``user_ids`` in chunks, one transaction per
+    chunk, so no lock is held across the whole run.  ``progress`` is called
+    as ``progress(done, total)`` after every chunk.
+    """
+    chunk_size = chunk_size or getattr(settings, 'ELIGIBILITY_RECOMPUTE_CHUNK_SIZE', 500)
+    rule_set = eligibility.get_rule_set()
+    total = len(user_ids)
+    for start in range(0, total, chunk_size):
+        chunk = user_ids[start:start + chunk_size]
+        users = CustomUser.objects.filter(user_id__in=chunk).only(
+            'user_id', 'dob', 'gender', 'income', 'address', 'education', 'education_level',
+            'state_code', 'district_code', 'pension_status', 'disability_cert',
+            'unemployment_status', 'business_turnover',
+        )
+        eligibility.check_users_eligibility(list(users), rule_set)
+
+        if progress:
+            progress(min(start + chunk_size, total), total)
+    return total
+
+
+def recompute_dirty_categories(window_seconds=None, chunk_size=None, progress=None,
+                               max_wait_seconds=None):
+    """
+    Process one batch window: claim settled markers, recompute every user in
+    those categories once, then release the markers.  Returns
+    (categories_processed, users_recomputed).
+    """
+    if window_seconds is None:
+        window_seconds = getattr(settings, 'ELIGIBILITY_RECOMPUTE_WINDOW_SECONDS', 30)
+    started_at = timezone.now()
+    claimed = claim_dirty_categories(window_seconds, max_wait_seconds)
+    if not claimed:
+        return 0, 0
+    eligibility.invalidate_rule_cache()
+    user_ids = affected_user_ids(list(claimed))
+    recompute_users(user_ids, chunk_size=chunk_size, progress=progress)
+    release_dirty_categories(claimed, started_at)
+    return len(claimed), len(user_ids)
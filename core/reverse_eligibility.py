@@ -0,0 +1,165 @@
+"""
+Reverse eligibility: which users qualify for a given scheme.
+
+The engine in core/eligibility.py answers "what is this user eligible for"
+one user at a time.  When a scheme is created or its rules change, the
+question is the other way round.  ``scheme_user_filter`` turns the scheme's
+Rule_Engine rows into predicates over Users that can use its indexes:
+
+    age       -> dob range (age_min / age_max shifted back from today)
+    income    -> income <= max_income
+    gender    -> equality
+    location  -> state_code / district_code equality
+    education -> education_level >= required
+
+plus UserCategories membership, including the "highest rule_id wins"
+shadowing between rules of the same scheme.  One query then returns the
+candidate users.  Users whose derived columns were never backfilled are
+let through by the SQL and settled by the compiled rule, which also
+applies the scheme's eligibility_rules expression and produces each row's
+criteria mask and match score.
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from . import eligibility
+from .education import rule_education_level
+from .gazetteer import location_code, state_of
+from .models import CustomUser, RuleEngine, UserCategories, UserEligibility
+from .scheme_rules import scheme_program
+
+
+CHUNK_SIZE = 2000
+
+
+def years_before(day, years):
+    """``day`` shifted back ``years`` years; 29 Feb becomes 28 Feb."""
+    try:
+        return day.replace(year=day.year - years)
+    except ValueError:
+        return day.replace(year=day.year - years, day=28)
+
+
+def rule_user_filter(row, today=None):
+    """Q over CustomUser for the users that pass Rule_Engine ``row``."""
+    today = today or date.today()
+    q = Q()
+    # age_on(dob) >= n  <=>  dob <= today - n years
+    if row['age_min'] is not None:
+        q &= Q(dob__lte=years_before(today, row['age_min']))
+    if row['age_max'] is not None:
+        q &= Q(dob__gt=years_before(today, row['age_max'] + 1))
+
+    if row['gender']:
+        q &= Q(gender__isnull=True) | Q(gender__iexact=row['gender'])
+
+    if row['max_income'] is not None:
+        q &= Q(income__isnull=True) | Q(income__lte=row['max_income'])
+
+    if row['location']:
+        code = row.get('location_code') or location_code(row['location'])
+        if not code:
+            where = Q(address__icontains=row['location'])
+        else:
+            if code == state_of(code):
+                where = Q(state_code=code)
+            else:
+                where = Q(state_code=state_of(code), district_code=code)
+            where |= Q(state_code__isnull=True, district_code__isnull=True)
+        q &= Q(address__isnull=True) | where
+
+    required = rule_education_level(row['education_required'])
+    if required:
+        q &= Q(education_level__gte=required) | Q(education_level__isnull=True)
+    return q
+
+
+def _member(category_ids):
+    return Exists(UserCategories.objects.filter(
+        user_id=OuterRef('user_id'), category_id__in=category_ids,
+    ))
+
+
+def scheme_rules(scheme_id):
+    """The scheme's compiled rules, freshly read, in rule_id order."""
+    rows = RuleEngine.objects.filter(scheme_id=scheme_id).order_by('rule_id').values(
+        *eligibility.RULE_FIELDS
+    )
+    program = scheme_program(scheme_id)
+    return [eligibility.CompiledRule(row, program) for row in rows]
+
+
+def scheme_user_filter(rules, today=None):
+    """
+    Q over CustomUser for users eligible under ``rules`` (one scheme's rules
+    in rule_id order), or None if the scheme has none.  A rule only decides
+    for users in its category and in none of the later rules' categories.
+    """
+    q = None
+    later = set()
+    for rule in reversed(rules):
+        if rule.category_id in later:
+            continue        # always shadowed by a later rule of the same category
+        deciding = _member([rule.category_id])
+        if later:
+            deciding &= ~_member(list(later))
+        branch = Q(deciding) & rule_user_filter(rule.row, today)
+        q = branch if q is None else q | branch
+        later.add(rule.category_id)
+    return q
+
+
+def eligible_user_ids(scheme_id, rules=None, today=None):
+    """Ids of the users eligible for ``scheme_id``, from one set-based query."""
+    rules = scheme_rules(scheme_id) if rules is None else rules
+    q = scheme_user_filter(rules, today)
+    if q is None:
+        return []
+    return list(CustomUser.objects.filter(q).values_list('user_id', flat=True))
+
+
+def apply_scheme_eligibility(scheme_id):
+    """
+    Find every user eligible for ``scheme_id`` and upsert their Eligible
+    User_Eligibility rows in bulk.  Returns (eligible, newly_eligible).
+    """
+    rules = scheme_rules(scheme_id)
+    candidates = eligible_user_ids(scheme_id, rules)
+    if not candidates:
+        return 0, 0
+    already = set(UserEligibility.objects.filter(
+        scheme_id=scheme_id, eligibility_status=eligibility.ELIGIBLE,
+    ).values_list('user_id', flat=True))
+    by_rule_id = {rule.rule_id: rule for rule in rules}
+
+    eligible = newly = 0
+    for start in range(0, len(candidates), CHUNK_SIZE):
+        chunk = candidates[start:start + CHUNK_SIZE]
+        categories = {}
+        for user_id, category_id in UserCategories.objects.filter(
+            user_id__in=chunk, category_id__in={r.category_id for r in rules},
+        ).values_list('user_id', 'category_id'):
+            categories.setdefault(user_id, set()).add(category_id)
+
+        rows = []
+        for user in CustomUser.objects.filter(user_id__in=chunk):
+            member = categories.get(user.user_id, ())
+            rule_id = max((r.rule_id for r in rules if r.category_id in member), default=None)
+            if rule_id is None:
+                continue
+            profile = eligibility.Profile.from_user(user)
+            status, reason, mask = by_rule_id[rule_id].evaluate(profile)
+            if status != eligibility.ELIGIBLE:
+                continue
+            rows.append(UserEligibility(
+                user_id=user.user_id, scheme_id=scheme_id,
+                eligibility_status=status, reason=reason, criteria_mask=mask,
+                match_score=eligibility.score_rules(profile, rules),
+            ))
+            newly += user.user_id not in already
+        with transaction.atomic():
+            eligibility.sync_rows(rows)
+        eligible += len(rows)
+    return eligible, newly
@@ -0,0 +1,167 @@
+"""
+Rule index for sub-linear "which rules does this profile pass" lookups.
+
+``RuleSet.rules_for`` hands the engine every rule in a user's categories,
+which is fine for the shipped 300 rules but linear in Rule_Engine.  For
+questions that only need the rules a profile *passes*, such as the what-if
+API's eligibility diff, this module compiles each category's rules into a
+small decision tree:
+
+    gender bucket -> location bucket -> education level -> age interval tree
+
+Gender and location code are hashed (a rule with no constraint lives in
+the ``None`` bucket), education requirements are a handful of levels, and
+the age band of every rule sits in a centred interval tree, so a stabbing
+query costs O(log n + k).  Income is a one-sided ``max_income`` limit and
+is left to the compiled predicates, which confirm every candidate, so
+results always agree with ``CompiledRule.evaluate``.  Rule locations the
+gazetteer does not know fall back to a per-category substring list.
+"""
+from bisect import bisect_right
+
+from .education import rule_education_level
+from .gazetteer import location_code
+
+
+AGE_LOW  = -1
+AGE_HIGH = 1 << 15
+
+
+class AgeIntervalTree:
+    """
+    Static centred interval tree over the [age_min, age_max] band of each
+    rule (missing bounds are open).  Each node keeps the rules spanning its
+    centre twice: by lower bound ascending and by upper bound descending.
+    """
+    __slots__ = ('center', 'by_low', 'lows', 'by_high', 'highs', 'left', 'right')
+
+    def __init__(self, items):
+        # items: [(low, high, rule)]
+        points = sorted(p for low, high, _ in items for p in (low, high))
+        self.center = points[len(points) // 2]
+        here, left, right = [], [], []
+        for item in items:
+            if item[1] < self.center:
+                left.append(item)
+            elif item[0] > self.center:
+                right.append(item)
+            else:
+                here.append(item)
+        self.by_low  = sorted(here, key=lambda i: i[0])
+        self.lows    = [i[0] for i in self.by_low]
+        self.by_high = sorted(here, key=lambda i: -i[1])
+        self.highs   = [-i[1] for i in self.by_high]
+        self.left    = AgeIntervalTree(left) if left else None
+        self.right   = AgeIntervalTree(right) if right else None
+
+    def stab(self, age):
+        """Every rule whose age band contains ``age``."""
+        node = self
+        while node is not None:
+            if age < node.center:
+                # Rules here end at or after the centre; keep those starting <= age.
+                for _, _, rule in node.by_low[:bisect_right(node.lows, age)]:
+                    yield rule
+                node = node.left
+            elif age > node.center:
+                for _, _, rule in node.by_high[:bisect_right(node.highs, -age)]:
+                    yield rule
+                node = node.right
+            else:
+                for _, _, rule in node.by_low:
+                    yield rule
+                return
+
+
+class CategoryIndex:
+    """The decision tree for one category's rules."""
+
+    def __init__(self, rules):
+        grouped = {}
+        self.substring = []          # (needle, rule) for non-gazetteer locations
+        for rule in rules:
+            row = rule.row
+            gender = row['gender'].lower() if row['gender'] else None
+            location = None
+            if row['location']:
+                location = row.get('location_code') or location_code(row['location'])
+                if not location:
+                    self.substring.append((row['location'].lower(), rule))
+                    continue
+            education = rule_education_level(row['education_required'])
+            low = row['age_min'] if row['age_min'] is not None else AGE_LOW
+            high = row['age_max'] if row['age_max'] is not None else AGE_HIGH
+            if low > high:
+                continue        # empty age band: no profile can pass
+            grouped.setdefault((gender, location, education), []).append((low, high, rule))
+
+        self.buckets = {}
+        for (gender, location, education), items in grouped.items():
+            self.buckets.setdefault(gender, {}).setdefault(location, []).append(
+                (education, AgeIntervalTree(items))
+            )
+        for by_location in self.buckets.values():
+            for levels in by_location.values():
+                levels.sort(key=lambda level: level[0])
+
+    def candidates(self, profile, ages=None, any_education=False):
+        """
+        Rules whose gender, location, education and age band admit
+        ``profile``.  ``ages`` stabs the age trees at each of those ages
+        instead of the profile's, and ``any_education`` ignores the
+        education requirement, for near-miss searches.
+        """
+        ages = (profile.age,) if ages is None else ages
+        genders = self.buckets if profile.gender is None else (None, profile.gender)
+        for gender in genders:
+            by_location = self.buckets.get(gender)
+            if not by_location:
+                continue
+            if profile.address is None:
+                locations = by_location
+            else:
+                locations = (None, *profile.locations)
+            for location in locations:
+                for education, tree in by_location.get(location, ()):
+                    if education > profile.education_level and not any_education:
+                        break
+                    for age in ages:
+                        yield from tree.stab(age)
+        for needle, rule in self.substring:
+            if profile.address is None or needle in profile.address:
+                yield rule
+
+
+class RuleIndex:
+    """
+    ``CategoryIndex`` per category plus, per category, the highest rule_id
+    of each scheme, so candidates can be checked against the "highest
+    rule_id wins" shadowing without looking at the other rules.
+    """
+
+    def __init__(self, by_category):
+        self.categories = {c: CategoryIndex(rules) for c, rules in by_category.items()}
+        self.last_rule = {}
+        for category_id, rules in by_category.items():
+            last = self.last_rule[category_id] = {}
+            for rule in rules:
+                if rule.rule_id > last.get(rule.scheme_id, -1):
+                    last[rule.scheme_id] = rule.rule_id
+
+    def candidates(self, profile, category_ids, ages=None, any_education=False):
+        """
+        Deciding rules in ``category_ids`` that may admit ``profile``: each
+        is the highest rule_id of its scheme across those categories, and
+        only needs its remaining predicates checked.  ``ages`` and
+        ``any_education`` relax the search as in CategoryIndex.candidates.
+        """
+        category_ids = [c for c in set(category_ids) if c in self.categories]
+        seen = set()
+        for category_id in category_ids:
+            for rule in self.categories[category_id].candidates(profile, ages, any_education):
+                if rule.scheme_id in seen:
+                    continue
+                deciding = max(self.last_rule[c].get(rule.scheme_id, -1) for c in category_ids)
+                if rule.rule_id == deciding:
+                    seen.add(rule.scheme_id)
+                    yield rule
@@ -0,0 +1,346 @@
+"""
+Scheme-level eligibility expressions.
+
+Rule_Engine rows are flat ANDs of fixed criteria, and several rows for one
+scheme never combine: the highest rule_id in the user's categories decides.
+``Scheme.eligibility_rules`` can hold a small expression over the profile
+instead, which the engine tests after the deciding rule's own criteria:
+
+    {"all": [
+        {"field": "age", "op": ">=", "value": 18},
+        {"any": [
+            {"field": "income", "op": "<=", "value": 250000},
+            {"field": "disability_cert", "op": "==", "value": true}
+        ]},
+        {"not": {"field": "location", "op": "in", "value": ["Goa", "Kerala"]}}
+    ],
+     "reason": "Only for adults on a low income or with a disability certificate"}
+
+Nodes are ``all`` / ``any`` (lists), ``not`` (one node) and comparisons of a
+FIELDS entry.  A comparison on a missing profile value is false.  Dicts
+with none of those keys (the field's old free-text use) are not programs.
+
+``compile_program`` turns the JSON into a SchemeProgram once per distinct
+source: nested closures with short-circuiting for the per-user engine and
+a NumPy twin over UserColumns for core/eligibility_matrix.py.  Compiled
+programs are cached on the source text, so a reloaded RuleSet reuses them
+until the scheme's rules actually change.
+"""
+import json
+import operator
+from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+
+import numpy as np
+
+from .education import rule_education_level
+from .gazetteer import location_code
+from .models import Scheme
+
+
+DEFAULT_REASON = 'Does not meet the scheme eligibility rules'
+
+# field -> (kind, Profile attribute, CustomUser field it reads)
+FIELDS = {
+    'age':                 ('number', 'age', 'dob'),
+    'income':              ('money', 'income', 'income'),
+    'business_turnover':   ('money', 'business_turnover', 'business_turnover'),
+    'gender':              ('text', 'gender', 'gender'),
+    'education':           ('education', 'education_level', 'education'),
+    'location':            ('location', 'locations', 'address'),
+    'pension_status':      ('flag', 'pension_status', 'pension_status'),
+    'disability_cert':     ('flag', 'disability_cert', 'disability_cert'),
+    'unemployment_status': ('flag', 'unemployment_status', 'unemployment_status'),
+}
+
+COMPARISONS = {
+    '==': operator.eq, '!=': operator.ne,
+    '<':  operator.lt, '<=': operator.le,
+    '>':  operator.gt, '>=': operator.ge,
+}
+MEMBERSHIP = ('in', 'not in')
+OPERATORS = {
+    'number':    (*COMPARISONS, *MEMBERSHIP),
+    'money':     (*COMPARISONS, *MEMBERSHIP),
+    'education': tuple(COMPARISONS),
+    'text':      ('==', '!=', *MEMBERSHIP),
+    'location':  ('==', '!=', *MEMBERSHIP),
+    'flag':      ('==', '!='),
+}
+NODE_KEYS = ('all', 'any', 'not', 'field')
+
+
+class RuleSyntaxError(ValueError):
+    """An eligibility_rules expression that cannot be compiled."""
+
+
+class SchemeProgram:
+    """
+    A compiled expression.  ``test(profile)`` and ``vector(users, rows)``
+    (a boolean array over a UserColumns block) always agree; ``fields``
+    are the CustomUser fields it reads, ``points`` the values it compares
+    each FIELDS entry against and ``reason`` the Not Eligible text recorded
+    when it fails.
+    """
+    __slots__ = ('test', 'vector', 'fields', 'points', 'reason')
+
+    def __init__(self, test, vector, fields, points, reason):
+        self.test   = test
+        self.vector = vector
+        self.fields = fields
+        self.points = points
+        self.reason = reason
+
+
+def is_program(spec):
+    return isinstance(spec, dict) and any(key in spec for key in NODE_KEYS)
+
+
+# ── Leaves ────────────────────────────────────────────────────────────────
+def _money(value):
+    if isinstance(value, bool):
+        raise RuleSyntaxError(f'Expected an amount, got {value!r}')
+    try:
+        return Decimal(str(value))
+    except (InvalidOperation, ValueError):
+        raise RuleSyntaxError(f'Expected an amount, got {value!r}')
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RuleSyntaxError(f'Expected a whole number, got {value!r}')
+    return value
+
+
+def _education(value):
+    if isinstance(value, str):
+        return rule_education_level(value)
+    return _number(value)
+
+
+def _text(value):
+    if not isinstance(value, str) or not value.strip():
+        raise RuleSyntaxError(f'Expected text, got {value!r}')
+    return value.strip().lower()
+
+
+def _place(value):
+    code = location_code(value) if isinstance(value, str) else None
+    if not code:
+        raise RuleSyntaxError(f'Unknown state or district: {value!r}')
+    return code
+
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise RuleSyntaxError(f'Expected true or false, got {value!r}')
+    return value
+
+
+CONVERT = {
+    'number': _number, 'money': _money, 'education': _education,
+    'text': _text, 'location': _place, 'flag': _flag,
+}
+
+
+def _column(users, rows, field):
+    """(values, missing) arrays of ``field`` for a UserColumns block; missing may be None."""
+    if field == 'age':
+        return users.age[rows], None
+    if field in ('income', 'business_turnover'):
+        values = (users.income if field == 'income' else users.turnover)[rows]
+        return values, values < 0
+    if field == 'gender':
+        values = users.gender_text[rows]
+        return values, values == ''
+    if field == 'education':
+        return users.education[rows], None
+    return {
+        'pension_status':      users.pension,
+        'disability_cert':     users.disability,
+        'unemployment_status': users.unemployment,
+    }[field][rows], None
+
+
+def _compile_leaf(node):
+    field, op = node.get('field'), node.get('op')
+    if field not in FIELDS:
+        raise RuleSyntaxError(f'Unknown field {field!r}; expected one of {", ".join(FIELDS)}')
+    kind, attr, source = FIELDS[field]
+    if op not in OPERATORS[kind]:
+        raise RuleSyntaxError(f'Operator {op!r} is not allowed on {field}')
+    if 'value' not in node:
+        raise RuleSyntaxError(f'Comparison on {field} has no value')
+    convert = CONVERT[kind]
+    if op in MEMBERSHIP:
+        if not isinstance(node['value'], list) or not node['value']:
+            raise RuleSyntaxError(f'"{op}" on {field} needs a non-empty list')
+        value = frozenset(convert(v) for v in node['value'])
+    else:
+        value = convert(node['value'])
+    negate = op in ('!=', 'not in')
+    get = operator.attrgetter(attr)
+    if kind == 'text':
+        get = lambda p: getattr(p, attr) or None     # '' is as missing as NULL
+
+    # Per-profile closure.  Missing values fail every comparison.
+    if kind == 'location':
+        codes = value if op in MEMBERSHIP else frozenset([value])
+        if negate:
+            def test(p):
+                return bool(p.locations) and p.locations.isdisjoint(codes)
+        else:
+            def test(p):
+                return not p.locations.isdisjoint(codes)
+    elif op in MEMBERSHIP:
+        if negate:
+            def test(p):
+                v = get(p)
+                return v is not None and v not in value
+        else:
+            def test(p):
+                return get(p) in value
+    else:
+        compare = COMPARISONS[op]
+
+        def test(p):
+            v = get(p)
+            return v is not None and compare(v, value)
+
+    # Vectorised twin over a UserColumns block.
+    def vector(users, rows):
+        if kind == 'location':
+            state, district = users.state[rows], users.district[rows]
+            codes = list(value) if op in MEMBERSHIP else [value]
+            hit = np.isin(state, codes) | np.isin(district, codes)
+            if negate:
+                return ~hit & ((state != '') | (district != ''))
+            return hit
+        values, missing = _column(users, rows, field)
+        target = value
+        if kind == 'money':
+            target = ([int(v * 100) for v in value] if op in MEMBERSHIP else int(value * 100))
+        elif op in MEMBERSHIP:
+            target = list(value)
+        if op in MEMBERSHIP:
+            result = np.isin(values, target)
+            if negate:
+                result = ~result
+        else:
+            result = COMPARISONS[op](values, target)
+        return result if missing is None else result & ~missing
+
+    points = {field: set(value) if op in MEMBERSHIP else {value}}
+    return test, vector, {source}, points
+
+
+def _merge_points(parts):
+    points = {}
+    for part in parts:
+        for field, values in part.items():
+            points.setdefault(field, set()).update(values)
+    return points
+
+
+# ── Combinators ───────────────────────────────────────────────────────────
+def _compile_node(node, depth=0):
+    if depth > 32:
+        raise RuleSyntaxError('Expression is nested too deeply')
+    if not isinstance(node, dict):
+        raise RuleSyntaxError(f'Expected an object, got {node!r}')
+    keys = [key for key in NODE_KEYS if key in node]
+    if len(keys) != 1:
+        raise RuleSyntaxError('Each node needs exactly one of "all", "any", "not" or "field"')
+    key = keys[0]
+    if key == 'field':
+        return _compile_leaf(node)
+    if key == 'not':
+        test, vector, fields, points = _compile_node(node['not'], depth + 1)
+        return (lambda p: not test(p)), (lambda users, rows: ~vector(users, rows)), fields, points
+
+    children = node[key]
+    if not isinstance(children, list) or not children:
+        raise RuleSyntaxError(f'"{key}" needs a non-empty list')
+    parts = []
+    for child in children:
+        # all-inside-all / any-inside-any add nothing but a call per level.
+        if isinstance(child, dict) and list(child) == [key]:
+            parts.extend(_compile_node(c, depth + 1) for c in child[key])
+        else:
+            parts.append(_compile_node(child, depth + 1))
+    tests = tuple(part[0] for part in parts)
+    vectors = tuple(part[1] for part in parts)
+    fields = set().union(*(part[2] for part in parts))
+    points = _merge_points(part[3] for part in parts)
+    if len(tests) == 1:
+        return tests[0], vectors[0], fields, points
+
+    if key == 'all':
+        def test(p):
+            for t in tests:
+                if not t(p):
+                    return False
+            return True
+
+        def vector(users, rows):
+            return np.logical_and.reduce([v(users, rows) for v in vectors])
+    else:
+        def test(p):
+            for t in tests:
+                if t(p):
+                    return True
+            return False
+
+        def vector(users, rows):
+            return np.logical_or.reduce([v(users, rows) for v in vectors])
+    return test, vector, fields, points
+
+
+@lru_cache(maxsize=1024)
+def _compile_source(source):
+    spec = json.loads(source)
+    reason = spec.get('reason') or DEFAULT_REASON
+    if not isinstance(reason, str):
+        raise RuleSyntaxError('"reason" must be text')
+    test, vector, fields, points = _compile_node(
+        {key: value for key, value in spec.items() if key != 'reason'}
+    )
+    points = {field: frozenset(values) for field, values in points.items()}
+    return SchemeProgram(test, vector, frozenset(fields), points, reason)
+
+
+def compile_program(spec):
+    """
+    SchemeProgram for an eligibility_rules value, or None if it holds no
+    expression.  Raises RuleSyntaxError for a malformed one.
+    """
+    if not is_program(spec):
+        return None
+    return _compile_source(json.dumps(spec, sort_keys=True))
+
+
+def _programs(rows):
+    programs = {}
+    for scheme_id, spec in rows:
+        try:
+            program = compile_program(spec)
+        except RuleSyntaxError:
+            # Saved before SchemeForm validated the field; the flat rules still apply.
+            continue
+        if program is not None:
+            programs[scheme_id] = program
+    return programs
+
+
+def scheme_programs():
+    """{scheme_id: SchemeProgram} for every scheme with an expression."""
+    return _programs(Scheme.objects.filter(
+        eligibility_rules__isnull=False
+    ).values_list('scheme_id', 'eligibility_rules'))
+
+
+def scheme_program(scheme_id):
+    """The SchemeProgram of one scheme, freshly read, or None."""
+    return _programs(Scheme.objects.filter(
+        scheme_id=scheme_id
+    ).values_list('scheme_id', 'eligibility_rules')).get(scheme_id)
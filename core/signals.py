@@ -0,0 +1,73 @@
+"""
+Model signal receivers.
+
+Rule and scheme writes only bump their categories' rules_version (plus a
+dirty-category marker when ``ELIGIBILITY_EAGER_RECOMPUTE`` is on) and drop
+this worker's compiled rule cache; the actual recompute is deferred (see
+core/recompute.py).  Scheme writes also drop the cached dashboard facets
+(core/facets.py) once the transaction commits.
+
+Rule and scheme writes also bump the dashboard's catalog version, and writes
+to a user's own rows (applications, grievances, search categories, profile)
+bump that user's version (core/dashboard_cache.py).
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .dashboard_cache import bump_catalog_version, bump_dashboard_version
+from .eligibility import invalidate_rule_cache
+from .facets import invalidate_scheme_facets
+from .models import Application, CustomUser, Grievance, RuleEngine, Scheme, UserCategories
+from .recompute import bump_rules_version, mark_category_dirty
+
+
+def _rules_changed(*category_ids):
+    bump_rules_version(*category_ids)
+    if getattr(settings, 'ELIGIBILITY_EAGER_RECOMPUTE', False):
+        mark_category_dirty(*category_ids)
+
+
+@receiver(pre_save, sender=RuleEngine)
+def remember_rule_category(sender, instance, **kwargs):
+    # A rule moved to another category leaves its old users stale as well.
+    instance._previous_category_id = None
+    if instance.pk:
+        instance._previous_category_id = (
+            RuleEngine.objects.filter(pk=instance.pk)
+            .values_list('category_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=RuleEngine)
+@receiver(post_delete, sender=RuleEngine)
+def rule_changed(sender, instance, **kwargs):
+    invalidate_rule_cache()
+    bump_catalog_version()
+    _rules_changed(instance.category_id,
+                   getattr(instance, '_previous_category_id', None))
+
+
+@receiver(post_save, sender=Scheme)
+@receiver(post_delete, sender=Scheme)
+def scheme_changed(sender, instance, **kwargs):
+    invalidate_rule_cache()
+    # After commit, so a reader cannot re-cache the old catalog in between.
+    transaction.on_commit(invalidate_scheme_facets)
+    bump_catalog_version()
+    rule_categories = RuleEngine.objects.filter(
+        scheme_id=instance.scheme_id
+    ).values_list('category_id', flat=True)
+    _rules_changed(instance.target_category_id, *rule_categories)
+
+
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+@receiver(post_save, sender=Grievance)
+@receiver(post_delete, sender=Grievance)
+@receiver(post_save, sender=UserCategories)
+@receiver(post_delete, sender=UserCategories)
+@receiver(post_save, sender=CustomUser)
+def user_rows_changed(sender, instance, **kwargs):
+    bump_dashboard_version(instance.user_id)
@@ -0,0 +1,128 @@
+"""
+Canonical profile signatures for memoised eligibility.
+
+Two profiles that sit on the same side of every threshold the rule set
+compares against get identical results from the engine, so one evaluation
+can serve both.  ``SignatureSpace`` collects those thresholds from the
+compiled rules (age bounds, income and turnover limits, education levels,
+location codes and substrings, plus the values scheme eligibility_rules
+programs compare with) and reduces a profile to a tuple:
+
+    (categories with rules, age position, gender, income position,
+     education position, location codes, has a location,
+     location substrings, flags, turnover position)
+
+A position records, for every breakpoint, whether the value is below,
+equal to or above it, which decides any <, <=, ==, >=, > or ``in`` test
+against it.  Users registering from one district with similar ages and
+incomes mostly collapse onto a few signatures.
+
+``LRUCache`` is the bounded, thread-safe store the RuleSet keeps the
+results in; a reloaded RuleSet starts with an empty one.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from .education import rule_education_level
+from .gazetteer import location_code
+
+
+def position(points, value):
+    """Where ``value`` falls among the sorted ``points``; None stays None."""
+    if value is None:
+        return None
+    low = bisect_left(points, value)
+    return 2 * low + (bisect_right(points, value) > low)
+
+
+class SignatureSpace:
+    """The thresholds of one RuleSet and the signatures they induce."""
+
+    def __init__(self, by_category):
+        ages, incomes, turnovers, levels = set(), set(), set(), set()
+        codes, needles = set(), set()
+        programs = set()
+        for rules in by_category.values():
+            for rule in rules:
+                row = rule.row
+                if row['age_min'] is not None:
+                    ages.add(row['age_min'])
+                if row['age_max'] is not None:
+                    ages.add(row['age_max'])
+                for field in ('min_income', 'max_income'):
+                    if row[field] is not None:
+                        incomes.add(row[field])
+                if row['business_turnover_limit'] is not None:
+                    turnovers.add(row['business_turnover_limit'])
+                levels.add(rule_education_level(row['education_required']))
+                if row['location']:
+                    code = row.get('location_code') or location_code(row['location'])
+                    if code:
+                        codes.add(code)
+                    else:
+                        needles.add(row['location'].lower())
+                if rule.program is not None:
+                    programs.add(rule.program)
+        for program in programs:
+            points = program.points
+            ages.update(points.get('age', ()))
+            incomes.update(points.get('income', ()))
+            turnovers.update(points.get('business_turnover', ()))
+            levels.update(points.get('education', ()))
+            codes.update(points.get('location', ()))
+
+        self.categories = frozenset(by_category)
+        self.ages       = sorted(ages)
+        self.incomes    = sorted(incomes)
+        self.turnovers  = sorted(turnovers)
+        self.levels     = sorted(levels)
+        self.codes      = frozenset(codes)
+        self.needles    = tuple(sorted(needles))
+
+    def signature(self, profile, category_ids):
+        address = profile.address
+        return (
+            self.categories.intersection(category_ids),
+            position(self.ages, profile.age),
+            profile.gender,
+            position(self.incomes, profile.income),
+            position(self.levels, profile.education_level),
+            self.codes.intersection(profile.locations), bool(profile.locations),
+            None if address is None else tuple(n in address for n in self.needles),
+            (profile.pension_status, profile.disability_cert, profile.unemployment_status),
+            position(self.turnovers, profile.business_turnover),
+        )
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used key."""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,98 @@
+"""
+core/announcements.py: display windows are applied against the clock on
+every call, and admin changes reach the cached snapshot once committed.
+"""
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import announcements
+from core.announcements import active_announcement
+from core.models import Announcement
+
+
+class ActiveAnnouncementTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', 'admin@example.com', 'pw', is_staff=True)
+
+    def setUp(self):
+        cache.clear()
+        announcements._snapshot = None
+        self.now = timezone.now()
+
+    def tearDown(self):
+        # The snapshot is process-wide and outlives the test's rollback.
+        announcements._snapshot = None
+
+    def announce(self, message, starts_in=None, ends_in=None, is_active=True):
+        return Announcement.objects.create(
+            message=message, is_active=is_active,
+            starts_at=self.now + timedelta(hours=starts_in) if starts_in is not None else None,
+            ends_at=self.now + timedelta(hours=ends_in) if ends_in is not None else None,
+        )
+
+    def later(self, hours):
+        return self.now + timedelta(hours=hours)
+
+    def test_future_announcement_waits_for_its_start(self):
+        self.announce('Portal open')
+        self.announce('Maintenance on Sunday', starts_in=2)
+        self.assertEqual(active_announcement(self.now), 'Portal open')
+        with self.assertNumQueries(0):
+            self.assertEqual(active_announcement(self.later(3)), 'Maintenance on Sunday')
+
+    def test_inactive_announcement_is_never_shown(self):
+        self.announce('Draft', is_active=False)
+        self.assertIsNone(active_announcement(self.now))
+
+    def test_expired_announcement_disappears_on_its_own(self):
+        self.announce('Apply before Friday', ends_in=1)
+        self.assertEqual(active_announcement(self.now), 'Apply before Friday')
+        with self.assertNumQueries(0):
+            self.assertIsNone(active_announcement(self.later(1)))
+        # A reload no longer even fetches it.
+        announcements._snapshot = None
+        self.announce('Already over', starts_in=-3, ends_in=-1)
+        self.assertEqual(active_announcement(self.now), 'Apply before Friday')
+        self.assertEqual(len(announcements._snapshot.entries), 1)
+
+    def test_unannounced_edits_wait_for_the_ttl(self):
+        notice = self.announce('Old notice')
+        self.assertEqual(active_announcement(self.now), 'Old notice')
+        Announcement.objects.filter(pk=notice.pk).update(message='New notice')
+        self.assertEqual(active_announcement(self.now), 'Old notice')
+        with override_settings(ANNOUNCEMENT_CACHE_SECONDS=0):
+            self.assertEqual(active_announcement(self.now), 'New notice')
+
+    def admin_post(self, **data):
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('admin_announcements'), data)
+        self.assertRedirects(response, reverse('admin_announcements'), fetch_redirect_response=False)
+
+    def test_toggle_reloads_the_snapshot(self):
+        notice = self.announce('Server upgrade tonight')
+        self.assertEqual(active_announcement(), 'Server upgrade tonight')
+        self.admin_post(action='toggle', ann_id=notice.pk)
+        self.assertIsNone(active_announcement())
+        self.admin_post(action='toggle', ann_id=notice.pk)
+        self.assertEqual(active_announcement(), 'Server upgrade tonight')
+
+    def test_delete_reloads_the_snapshot(self):
+        notice = self.announce('Server upgrade tonight')
+        self.assertEqual(active_announcement(), 'Server upgrade tonight')
+        self.admin_post(action='delete', ann_id=notice.pk)
+        self.assertIsNone(active_announcement())
+
+    def test_create_reloads_the_snapshot(self):
+        self.announce('Old notice')
+        self.assertEqual(active_announcement(), 'Old notice')
+        self.admin_post(action='create', message='New notice', is_active='on')
+        self.assertEqual(active_announcement(), 'New notice')
+        self.assertEqual(Announcement.objects.filter(is_active=True).count(), 1)
@@ -0,0 +1,83 @@
+"""
+manage.py backfill_derived_columns: rewritten codes make the affected
+users' stored eligibility stale, so their next dashboard load recomputes it.
+"""
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import eligibility
+from core.models import Category, CustomUser, RuleEngine, Scheme, UserCategories, UserEligibility
+
+
+class BackfillDerivedColumnsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Fishermen')
+        cls.untouched = Category.objects.create(category_name='Artisans')
+        cls.scheme = Scheme.objects.create(scheme_name='Matsya Sampada', target_category=cls.category)
+        cls.rule = RuleEngine.objects.create(category=cls.category, scheme=cls.scheme, location='Kerala')
+        cls.user = CustomUser.objects.create(
+            name='Thomas', dob=date(1975, 6, 1), aadhaar_no='777766665555', address='Fort Kochi',
+        )
+        UserCategories.objects.create(user=cls.user, category=cls.category)
+        UserCategories.objects.create(user=cls.user, category=cls.untouched)
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+
+    def status(self):
+        return UserEligibility.objects.get(user=self.user, scheme=self.scheme).eligibility_status
+
+    def backfill(self):
+        out = StringIO()
+        call_command('backfill_derived_columns', stdout=out)
+        return out.getvalue()
+
+    def test_nothing_to_do_bumps_nothing(self):
+        eligibility.check_user_eligibility(self.user)
+        self.assertIn('0 user(s), 0 rule(s)', self.backfill())
+        self.assertFalse(eligibility.refresh_if_stale(self.user))
+
+    def test_rewritten_rules_bump_their_categories(self):
+        # A rule coded by an older gazetteer, or by raw SQL.
+        RuleEngine.objects.filter(pk=self.rule.pk).update(location_code='TN', education_level=3)
+        eligibility.invalidate_rule_cache()
+        eligibility.check_user_eligibility(self.user)
+        self.assertEqual(self.status(), 'Not Eligible')
+        versions = dict(Category.objects.values_list('category_id', 'rules_version'))
+
+        self.assertIn('1 rule(s)', self.backfill())
+        self.assertEqual(RuleEngine.objects.values_list('location_code', 'education_level').get(),
+                         ('KL', 0))
+        after = dict(Category.objects.values_list('category_id', 'rules_version'))
+        self.assertEqual(after[self.category.category_id], versions[self.category.category_id] + 1)
+        self.assertEqual(after[self.untouched.category_id], versions[self.untouched.category_id])
+        self.assertTrue(eligibility.refresh_if_stale(self.user))
+        self.assertEqual(self.status(), 'Eligible')
+
+    def test_rewritten_users_are_stale(self):
+        other = CustomUser.objects.create(name='Mary', dob=date(1980, 2, 2), aadhaar_no='12',
+                                          address='Kollam, Kerala')
+        UserCategories.objects.create(user=other, category=self.category)
+        # Coded before the gazetteer knew Fort Kochi.
+        CustomUser.objects.filter(pk=self.user.pk).update(state_code=None, district_code='XX')
+        self.user.refresh_from_db()
+        for user in (self.user, other):
+            eligibility.check_user_eligibility(user)
+        self.assertEqual(self.status(), 'Not Eligible')
+        versions = dict(Category.objects.values_list('category_id', 'rules_version'))
+
+        self.assertIn('1 user(s)', self.backfill())
+        self.assertEqual(dict(Category.objects.values_list('category_id', 'rules_version')), versions)
+        self.assertEqual(set(UserCategories.objects.filter(rules_version__isnull=True)
+                             .values_list('user_id', flat=True)), {self.user.user_id})
+        self.assertFalse(eligibility.refresh_if_stale(other))
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.state_code, self.user.district_code), ('KL', 'KL-kochi'))
+        self.assertTrue(eligibility.refresh_if_stale(self.user))
+        self.assertEqual(self.status(), 'Eligible')
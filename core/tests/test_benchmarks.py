@@ -0,0 +1,93 @@
+"""
+core/benchmarks.py: the scenarios run on a small synthetic population, and
+the eligibility paths they time agree with each other.
+
+build_population drops and recreates its tables, which SQLite cannot do
+inside a TestCase transaction, so these are plain pytest functions sharing
+one population per module.
+"""
+import pytest
+
+from core import eligibility
+from core.benchmarks import SCENARIOS, build_population, reset_tables, run_suite
+from core.dashboard import DASHBOARD_QUERY_BUDGET
+from core.eligibility_matrix import eligible_counts
+from core.models import CustomUser, UserCategories, UserEligibility
+from core.reverse_eligibility import apply_scheme_eligibility
+
+
+USERS = 150
+# Generous ceiling on the mean in-memory evaluation of one user, so a slow
+# CI machine passes but an accidental per-rule query does not.
+EVALUATE_MEAN_MS = 25
+
+
+@pytest.fixture(scope='module')
+def population():
+    population = build_population(users=USERS, rules=60, categories=6)
+    yield population
+    reset_tables()
+    eligibility.invalidate_rule_cache()
+
+
+def _categories():
+    categories = {}
+    for user_id, category_id in UserCategories.objects.values_list('user_id', 'category_id'):
+        categories.setdefault(user_id, []).append(category_id)
+    return categories
+
+
+def _eligible(results):
+    return {scheme_id for scheme_id, outcome in results.items() if outcome[0] == eligibility.ELIGIBLE}
+
+
+def test_population_sizes(population):
+    assert CustomUser.objects.count() == USERS
+    assert population['schemes'] == 20
+    assert UserCategories.objects.count() == population['user_categories']
+
+
+def test_evaluate_agrees_with_check_user_eligibility(population):
+    rule_set = eligibility.get_rule_set()
+    categories = _categories()
+    for user in CustomUser.objects.order_by('user_id')[:40]:
+        profile = eligibility.Profile.from_user(user)
+        expected = _eligible(eligibility.evaluate(profile, categories.get(user.user_id, ()), rule_set))
+
+        assert _eligible(eligibility.check_user_eligibility(user)) == expected
+        assert set(UserEligibility.objects.filter(
+            user_id=user.user_id, eligibility_status=eligibility.ELIGIBLE,
+        ).values_list('scheme_id', flat=True)) == expected
+        assert set(eligibility.eligible_schemes(
+            profile, categories.get(user.user_id, ()), rule_set)) == expected
+
+
+def test_population_counts_agree_with_evaluate(population):
+    rule_set = eligibility.get_rule_set()
+    categories = _categories()
+    expected = {}
+    for user in CustomUser.objects.all():
+        profile = eligibility.Profile.from_user(user)
+        for scheme_id in _eligible(eligibility.evaluate(profile, categories.get(user.user_id, ()), rule_set)):
+            expected[scheme_id] = expected.get(scheme_id, 0) + 1
+
+    assert expected, 'the synthetic population should qualify for some schemes'
+    counts = eligible_counts()
+    assert {s: n for s, n in counts.items() if n} == expected
+    for scheme_id in range(1, 6):
+        assert apply_scheme_eligibility(scheme_id)[0] == counts.get(scheme_id, 0)
+
+
+def test_every_scenario_runs(population):
+    results = run_suite(population, sample=20, schemes=3)
+
+    assert set(results) == set(SCENARIOS)
+    for name, stats in results.items():
+        assert stats['calls'] >= 1, name
+        assert 0 <= stats['median_ms'] <= stats['p95_ms'], name
+        assert stats['total_s'] >= 0, name
+    assert results['check_user_eligibility']['calls'] == 20
+    assert results['reverse_query']['calls'] == 3
+    assert 0 <= results['memoised_evaluate']['hit_rate'] <= 1
+    assert results['dashboard']['max_queries'] <= DASHBOARD_QUERY_BUDGET
+    assert results['evaluate']['mean_ms'] < EVALUATE_MEAN_MS
@@ -0,0 +1,129 @@
+"""
+core/dashboard.py: the dashboard stays within DASHBOARD_QUERY_BUDGET for a
+user with more eligible schemes than fit on one page.
+"""
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from core.dashboard import DASHBOARD_QUERY_BUDGET, eligible_page, fill_scores, load_dashboard
+from core.facets import FACET_CACHE_KEY, scheme_facets
+from core.models import (
+    Application, Category, CustomUser, NearMiss, Scheme, UserCategories, UserEligibility,
+)
+
+
+PAGE_SIZE = 5
+
+
+@override_settings(DASHBOARD_PAGE_SIZE=PAGE_SIZE)
+class DashboardQueryBudgetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Students')
+        cls.user = CustomUser.objects.create(
+            name='Asha', dob=date(1998, 4, 1), aadhaar_no='123412341234',
+            address='Anna Nagar, Chennai, Tamil Nadu', income=120000, education='B.Tech',
+        )
+        UserCategories.objects.create(user=cls.user, category=category)
+
+        now = timezone.now()
+        schemes = []
+        for n in range(3 * PAGE_SIZE + 2):
+            state = 'Tamil Nadu' if n % 2 else 'Kerala'
+            benefit_type = 'Scholarship' if n % 3 else 'Loan'
+            schemes.append(Scheme.objects.create(
+                scheme_name=f'Scheme {n}', description='Support for students',
+                target_category=category, state=state, benefit_type=benefit_type,
+            ))
+        for n, scheme in enumerate(schemes):
+            UserEligibility.objects.create(
+                user=cls.user, scheme=scheme, eligibility_status='Eligible',
+                reason='Meets all criteria', match_score=50 + n,
+                status_changed_on=now - timedelta(minutes=n % 4),
+            )
+        Application.objects.create(user=cls.user, scheme=schemes[0])
+        cls.schemes = schemes
+
+    def setUp(self):
+        # The facets are cached across requests; start every test with them
+        # built, as a live site would be.
+        cache.clear()
+        scheme_facets()
+
+    def assertWithinBudget(self, context):
+        self.assertLessEqual(
+            len(context.captured_queries), DASHBOARD_QUERY_BUDGET,
+            '\n'.join(q['sql'] for q in context.captured_queries),
+        )
+
+    def load(self, **filters):
+        with CaptureQueriesContext(connection) as context:
+            data = load_dashboard(self.user, strict=True, **filters)
+        self.assertWithinBudget(context)
+        return data
+
+    def test_unfiltered(self):
+        data = self.load()
+        self.assertEqual(len(data['eligible_schemes']), PAGE_SIZE)
+        self.assertIsNotNone(data['next_cursor'])
+        self.assertEqual(data['total_eligible'], len(self.schemes))
+        self.assertEqual(data['total_shown'], len(self.schemes))
+        self.assertEqual(data['total_applications'], 1)
+        self.assertEqual(dict(data['states']), {'Kerala': 9, 'Tamil Nadu': 8})
+
+    def test_filtered(self):
+        data = self.load(search_q='Scheme', filter_state='Tamil Nadu',
+                         filter_type='Scholarship', sort='score')
+        expected = [s for n, s in enumerate(self.schemes) if n % 2 and n % 3]
+        self.assertEqual(data['total_shown'], len(expected))
+        self.assertEqual(data['total_eligible'], len(self.schemes))
+        self.assertTrue(all(row['state'] == 'Tamil Nadu' for row in data['eligible_schemes']))
+        scores = [row['score'] for row in data['eligible_schemes']]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    def test_cold_facet_cache_costs_one_query(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            load_dashboard(self.user, strict=True)
+        self.assertEqual(len(context.captured_queries), DASHBOARD_QUERY_BUDGET + 1)
+        self.assertIsNotNone(cache.get(FACET_CACHE_KEY))
+
+    def test_next_pages(self):
+        for sort in ('recent', 'score'):
+            with self.subTest(sort=sort):
+                rows, cursor = eligible_page(self.user.user_id, sort=sort)
+                seen = [row['scheme_id'] for row in rows]
+                while cursor:
+                    with CaptureQueriesContext(connection) as context:
+                        rows, cursor = eligible_page(self.user.user_id, sort=sort, cursor=cursor)
+                        fill_scores(self.user, rows)
+                    self.assertWithinBudget(context)
+                    self.assertLessEqual(len(rows), PAGE_SIZE)
+                    seen.extend(row['scheme_id'] for row in rows)
+                self.assertEqual(sorted(seen), sorted(s.scheme_id for s in self.schemes))
+
+    def test_next_page_with_filters(self):
+        rows, cursor = eligible_page(self.user.user_id, filter_state='Kerala', page_size=2)
+        seen = [row['scheme_id'] for row in rows]
+        while cursor:
+            with CaptureQueriesContext(connection) as context:
+                rows, cursor = eligible_page(self.user.user_id, filter_state='Kerala',
+                                             cursor=cursor, page_size=2)
+            self.assertEqual(len(context.captured_queries), 1)
+            seen.extend(row['scheme_id'] for row in rows)
+        self.assertEqual(sorted(seen),
+                         [s.scheme_id for n, s in enumerate(self.schemes) if not n % 2])
+
+    def test_near_misses_do_not_cost_extra_queries(self):
+        NearMiss.objects.bulk_create([
+            NearMiss(user=self.user, scheme=scheme, criterion='income', gap=1000,
+                     relative_gap=0.1, message='Income is 1000 over the limit')
+            for scheme in self.schemes[:3]
+        ])
+        self.assertEqual(len(self.load()['near_misses']), 3)
@@ -0,0 +1,132 @@
+"""
+core/dashboard_cache.py: writes to a user's rows drop that user's token,
+scheme edits drop the catalog token and the facets, and sections are only
+cached on a backend every worker shares.
+"""
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import eligibility
+from core.dashboard_cache import (
+    CATALOG, _version_key, cached_sections, dashboard_versions, section_cache_seconds,
+    store_sections,
+)
+from core.facets import FACET_CACHE_KEY, scheme_facets
+from core.models import Application, Category, CustomUser, Grievance, Scheme, UserCategories
+
+
+class DashboardCacheTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Weavers')
+        cls.other_category = Category.objects.create(category_name='Potters')
+        cls.scheme = Scheme.objects.create(scheme_name='Handloom Support', target_category=cls.category)
+        cls.user = CustomUser.objects.create(
+            name='Lalitha', dob=date(1982, 2, 2), aadhaar_no='666655554444',
+            email='lalitha@example.com',
+        )
+        cls.neighbour = CustomUser.objects.create(name='Devi', dob=date(1983, 3, 3), aadhaar_no='6')
+        cls.login = User.objects.create_user('lalitha', 'lalitha@example.com', 'pw')
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        cache.clear()
+
+
+class SharedCacheTests(DashboardCacheTestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.shared = override_settings(CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': self.cache_dir,
+        }})
+        self.shared.enable()
+        super().setUp()
+
+    def tearDown(self):
+        self.shared.disable()
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def assertBumps(self, write, user=True, catalog=False):
+        before = dashboard_versions(self.user.user_id)
+        neighbour = dashboard_versions(self.neighbour.user_id)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        after = dashboard_versions(self.user.user_id)
+        self.assertEqual(after[0] != before[0], user, 'user token')
+        self.assertEqual(after[1] != before[1], catalog, 'catalog token')
+        self.assertEqual(dashboard_versions(self.neighbour.user_id)[0], neighbour)
+
+    def test_user_rows_bump_only_their_user(self):
+        writes = [
+            lambda: Application.objects.create(user=self.user, scheme=self.scheme),
+            lambda: Application.objects.filter(user=self.user).get().delete(),
+            lambda: Grievance.objects.create(user=self.user, complaint='No reply'),
+            lambda: Grievance.objects.filter(user=self.user).update(status='Resolved'),
+            lambda: Grievance.objects.get(user=self.user).save(),
+            lambda: Grievance.objects.get(user=self.user).delete(),
+            lambda: UserCategories.objects.create(user=self.user, category=self.category),
+            lambda: UserCategories.objects.get(user=self.user).delete(),
+            lambda: self.user.save(),
+        ]
+        for n, write in enumerate(writes):
+            with self.subTest(write=n):
+                # A queryset .update() sends no signal and bumps nothing.
+                self.assertBumps(write, user=n != 3)
+
+    def test_scheme_edits_bump_the_catalog_and_facets(self):
+        scheme_facets()
+        self.assertIsNotNone(cache.get(FACET_CACHE_KEY))
+        self.scheme.scheme_name = 'Handloom Weavers Support'
+        self.assertBumps(self.scheme.save, user=False, catalog=True)
+        self.assertIsNone(cache.get(FACET_CACHE_KEY))
+
+    def test_tokens_drop_only_on_commit(self):
+        before = dashboard_versions(self.user.user_id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Application.objects.create(user=self.user, scheme=self.scheme)
+            self.assertEqual(dashboard_versions(self.user.user_id), before)
+        self.assertTrue(callbacks)
+
+    def test_cached_dashboard_skips_refresh_until_a_write(self):
+        self.assertEqual(section_cache_seconds(), 120)
+        self.client.force_login(self.login)
+        with mock.patch('core.views.refresh_if_stale') as refresh:
+            self.client.get(reverse('dashboard'))
+            self.client.get(reverse('dashboard'))
+            self.assertEqual(refresh.call_count, 1)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Application.objects.create(user=self.user, scheme=self.scheme)
+            self.client.get(reverse('dashboard'))
+            self.assertEqual(refresh.call_count, 2)
+
+
+class ProcessLocalCacheTests(DashboardCacheTestCase):
+
+    def test_sections_are_not_cached(self):
+        self.assertEqual(section_cache_seconds(), 0)
+        versions = dashboard_versions(self.user.user_id)
+        store_sections(self.user.user_id, versions, ('',), '<p>sections</p>')
+        self.assertIsNone(cached_sections(self.user.user_id, ('',)))
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}})
+    def test_dummy_cache_is_process_local_too(self):
+        self.assertEqual(section_cache_seconds(), 0)
+
+    def test_every_dashboard_load_refreshes(self):
+        self.client.force_login(self.login)
+        with mock.patch('core.views.refresh_if_stale') as refresh:
+            self.client.get(reverse('dashboard'))
+            self.client.get(reverse('dashboard'))
+        self.assertEqual(refresh.call_count, 2)
+        self.assertIsNotNone(cache.get(_version_key(CATALOG)))
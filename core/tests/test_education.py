@@ -0,0 +1,104 @@
+"""
+core/education.py: the user-side and rule-side keyword tables.
+
+Plain unittest cases; the module is Django-free.
+"""
+import unittest
+
+from core.education import rule_education_level, user_education_level
+
+
+class UserEducationLevelTests(unittest.TestCase):
+
+    def test_levels(self):
+        cases = {
+            'PhD in Chemistry':    6,
+            'MBA':                 5,
+            'M.Tech':              5,
+            'Post Graduate':       5,
+            'B.Tech':              4,
+            'B.Com':               4,
+            'Graduate':            4,
+            'Diploma in Civil':    3,
+            'Polytechnic':         3,
+            '12th pass':           2,
+            'HSC':                 2,
+            'Intermediate':        2,
+            '10th pass':           1,
+            'SSLC':                1,
+            'Matriculation':       1,
+        }
+        for text, level in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(user_education_level(text), level)
+
+    def test_case_insensitive(self):
+        self.assertEqual(user_education_level('b.tech'), user_education_level('B.TECH'))
+        self.assertEqual(user_education_level('phd'), 6)
+
+    def test_highest_level_wins(self):
+        # Checked top-down: "M.Tech" must not fall through to a lower level.
+        self.assertEqual(user_education_level('M.Tech after Diploma'), 5)
+
+    def test_blank_and_unknown(self):
+        for text in (None, '', 'Literate', 'Self taught', 'Primary school'):
+            with self.subTest(text=text):
+                self.assertEqual(user_education_level(text), 0)
+
+
+class RuleEducationLevelTests(unittest.TestCase):
+
+    def test_levels(self):
+        cases = {
+            'PhD':           6,
+            'Post Graduate': 5,
+            'Masters':       5,
+            'Graduate':      4,
+            'Degree':        4,
+            'Diploma':       3,
+            '12th':          2,
+            '12th pass':     2,
+            '10th':          1,
+            'Secondary':     1,
+        }
+        for text, level in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(rule_education_level(text), level)
+
+    def test_no_requirement(self):
+        for text in (None, '', 'Any', 'ANY', 'any'):
+            with self.subTest(text=text):
+                self.assertEqual(rule_education_level(text), 0)
+
+    def test_unknown_is_no_requirement(self):
+        # Unrecognised requirements do not restrict anyone.
+        self.assertEqual(rule_education_level('Literate'), 0)
+
+    def test_post_graduate_is_not_graduate(self):
+        self.assertGreater(rule_education_level('Post Graduate'), rule_education_level('Graduate'))
+
+
+class SharedScaleTests(unittest.TestCase):
+    """A user meets a rule when their level is at least the rule's."""
+
+    def assertMeets(self, user, rule):
+        self.assertGreaterEqual(user_education_level(user), rule_education_level(rule),
+                                f'{user!r} should meet {rule!r}')
+
+    def assertFails(self, user, rule):
+        self.assertLess(user_education_level(user), rule_education_level(rule),
+                        f'{user!r} should not meet {rule!r}')
+
+    def test_scale(self):
+        self.assertMeets('B.Tech', 'Graduate')
+        self.assertMeets('MBA', 'Graduate')
+        self.assertMeets('PhD', 'Post Graduate')
+        self.assertMeets('12th pass', '10th')
+        self.assertMeets('Diploma', '12th')
+        self.assertFails('12th pass', 'Graduate')
+        self.assertFails('B.Com', 'Post Graduate')
+        self.assertFails(None, '10th')
+
+    def test_anyone_meets_no_requirement(self):
+        self.assertMeets(None, 'Any')
+        self.assertMeets('Literate', None)
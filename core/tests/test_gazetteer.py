@@ -0,0 +1,49 @@
+"""
+core/gazetteer.py: parse_address on all-caps and mixed-case addresses.
+
+Plain unittest cases; the module is Django-free.
+"""
+import unittest
+
+from core.gazetteer import location_code, parse_address
+
+
+class ParseAddressTests(unittest.TestCase):
+
+    def assertParses(self, address, state, district):
+        self.assertEqual(parse_address(address), (state, district), address)
+
+    def test_all_caps_words_do_not_yield_abbreviations(self):
+        # "TANAP" used to match "AP" and "UPPER" used to match "UP".
+        self.assertParses('NO 5 TANAP STREET, CHENNAI', 'TN', 'TN-chennai')
+        self.assertParses('PLOT 9, UPPER BAZAAR, RANCHI', 'JH', 'JH-ranchi')
+        self.assertParses('WARD 3, MPNAGAR, BHOPAL', 'MP', 'MP-bhopal')
+
+    def test_all_caps_addresses(self):
+        self.assertParses('12 GANDHI ROAD, PUNE, MAHARASHTRA', 'MH', 'MH-pune')
+        self.assertParses('HNO 12 UPPAL, HYDERABAD', 'TS', 'TS-hyderabad')
+
+    def test_mixed_case_addresses(self):
+        self.assertParses('No 5 Tanap Street, Chennai', 'TN', 'TN-chennai')
+        self.assertParses('Plot 9, Upper Bazaar, Ranchi', 'JH', 'JH-ranchi')
+        self.assertParses('12 MG Road, Bengaluru, Karnataka', 'KA', 'KA-bengaluru')
+
+    def test_capitalised_abbreviations(self):
+        self.assertParses('Flat 3, Anna Nagar, Chennai, TN', 'TN', 'TN-chennai')
+        self.assertParses('12 STATION ROAD, LUCKNOW, UP', 'UP', 'UP-lucknow')
+        self.assertParses('House 4, Srinagar, J&K', 'JK', 'JK-srinagar')
+        self.assertEqual(parse_address('Near bus stand, UP')[0], 'UP')
+
+    def test_lower_case_abbreviations_are_ignored(self):
+        self.assertEqual(parse_address('walk up the hill, near the ka temple'), (None, None))
+
+    def test_blank(self):
+        self.assertEqual(parse_address(''), (None, None))
+        self.assertEqual(parse_address(None), (None, None))
+
+
+class LocationCodeTests(unittest.TestCase):
+
+    def test_state_and_district(self):
+        self.assertEqual(location_code('Tamil Nadu'), 'TN')
+        self.assertEqual(location_code('Chennai'), 'TN-chennai')
@@ -0,0 +1,55 @@
+"""
+core/jobs.py: inline runs leave no Eligibility_Jobs rows behind; queued
+runs merge into the job already waiting.
+"""
+from datetime import date
+
+from django.test import TestCase, override_settings
+
+from core import eligibility
+from core.jobs import enqueue_eligibility_job
+from core.models import (
+    Category, CustomUser, EligibilityJob, RuleEngine, Scheme, UserCategories, UserEligibility,
+)
+
+
+class EnqueueEligibilityJobTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Farmers')
+        cls.scheme = Scheme.objects.create(scheme_name='Crop Support', target_category=category)
+        RuleEngine.objects.create(category=category, scheme=cls.scheme, max_income=200000)
+        cls.user = CustomUser.objects.create(
+            name='Ravi', dob=date(1980, 1, 1), aadhaar_no='111122223333', income=90000,
+        )
+        UserCategories.objects.create(user=cls.user, category=category)
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+
+    @override_settings(ELIGIBILITY_JOBS_ASYNC=False)
+    def test_inline_runs_without_saving_a_job(self):
+        job = enqueue_eligibility_job(self.user)
+        self.assertIsNone(job.pk)
+        self.assertEqual(job.status, EligibilityJob.DONE)
+        self.assertEqual(job.result, {'gained': ['Crop Support'], 'lost': []})
+        self.assertFalse(EligibilityJob.objects.exists())
+        self.assertTrue(UserEligibility.objects.filter(
+            user=self.user, scheme=self.scheme, eligibility_status='Eligible').exists())
+
+    @override_settings(ELIGIBILITY_JOBS_ASYNC=False)
+    def test_inline_failure_is_reported_on_the_job(self):
+        job = enqueue_eligibility_job(self.user, changed_categories=['not-a-number'])
+        self.assertEqual(job.status, EligibilityJob.FAILED)
+        self.assertIn('ValueError', job.error)
+        self.assertFalse(EligibilityJob.objects.exists())
+
+    @override_settings(ELIGIBILITY_JOBS_ASYNC=True)
+    def test_queued_requests_merge(self):
+        first = enqueue_eligibility_job(self.user, changed_fields=['income'])
+        second = enqueue_eligibility_job(self.user, changed_fields=['dob'])
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(second.status, EligibilityJob.QUEUED)
+        self.assertEqual(EligibilityJob.objects.get().changed_fields, 'dob,income')
+        self.assertFalse(UserEligibility.objects.exists())
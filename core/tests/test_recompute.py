@@ -0,0 +1,75 @@
+"""
+core/recompute.py: dirty-category batch windows and the maximum wait.
+"""
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core import eligibility
+from core.models import (
+    Category, CustomUser, DirtyCategory, RuleEngine, Scheme, UserCategories, UserEligibility,
+)
+from core.recompute import (
+    claim_dirty_categories, mark_category_dirty, recompute_dirty_categories,
+    release_dirty_categories,
+)
+
+
+class DirtyCategoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Seniors')
+
+    def age(self, **times):
+        """Move the marker's timestamps ``times`` seconds into the past."""
+        now = timezone.now()
+        DirtyCategory.objects.filter(category=self.category).update(
+            **{field: now - timedelta(seconds=seconds) for field, seconds in times.items()})
+
+    def test_re_marking_restarts_the_window(self):
+        mark_category_dirty(self.category.category_id)
+        self.age(marked_at=60, first_marked_at=60)
+        self.assertEqual(claim_dirty_categories(30, 300), {self.category.category_id: 1})
+
+        mark_category_dirty(self.category.category_id)
+        self.assertEqual(claim_dirty_categories(30, 300), {})
+        marker = DirtyCategory.objects.get()
+        self.assertEqual(marker.generation, 2)
+        self.assertLess(marker.first_marked_at, marker.marked_at - timedelta(seconds=30))
+
+    def test_constant_edits_are_claimed_after_the_maximum_wait(self):
+        mark_category_dirty(self.category.category_id)
+        self.age(first_marked_at=301)
+        mark_category_dirty(self.category.category_id)
+        self.assertEqual(claim_dirty_categories(30, 300), {self.category.category_id: 2})
+
+    def test_release_keeps_markers_edited_meanwhile(self):
+        mark_category_dirty(self.category.category_id)
+        self.age(marked_at=60, first_marked_at=600)
+        claimed = claim_dirty_categories(30, 300)
+        started_at = timezone.now()
+        mark_category_dirty(self.category.category_id)
+
+        release_dirty_categories(claimed, started_at)
+        marker = DirtyCategory.objects.get()
+        self.assertEqual(marker.first_marked_at, started_at)
+        self.assertEqual(claim_dirty_categories(30, 300), {})
+
+        release_dirty_categories({self.category.category_id: marker.generation}, started_at)
+        self.assertFalse(DirtyCategory.objects.exists())
+
+    def test_recompute_dirty_categories(self):
+        scheme = Scheme.objects.create(scheme_name='Old Age Pension', target_category=self.category)
+        RuleEngine.objects.create(category=self.category, scheme=scheme, age_min=60)
+        user = CustomUser.objects.create(name='Meena', dob=date(1950, 5, 5), aadhaar_no='999988887777')
+        UserCategories.objects.create(user=user, category=self.category)
+        eligibility.invalidate_rule_cache()
+
+        mark_category_dirty(self.category.category_id)
+        self.assertEqual(recompute_dirty_categories(window_seconds=30, max_wait_seconds=300), (0, 0))
+        self.age(marked_at=31)
+        self.assertEqual(recompute_dirty_categories(window_seconds=30, max_wait_seconds=300), (1, 1))
+        self.assertEqual(UserEligibility.objects.get(user=user).eligibility_status, 'Eligible')
+        self.assertFalse(DirtyCategory.objects.exists())
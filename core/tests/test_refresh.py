@@ -0,0 +1,111 @@
+"""
+Lazy recompute after rule edits: saving a rule bumps its categories'
+rules_version, and the next dashboard load of a member refreshes their
+stored results, rewriting only the rows the edit changed.
+"""
+from datetime import date, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from core import eligibility
+from core.models import Category, CustomUser, RuleEngine, Scheme, UserCategories, UserEligibility
+from core.recompute import bump_rules_version
+
+
+class RefreshIfStaleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Category.objects.create(category_name='Farmers')
+        cls.women = Category.objects.create(category_name='Women')
+        cls.credit = Scheme.objects.create(scheme_name='Kisan Credit', target_category=cls.farmers)
+        cls.rule = RuleEngine.objects.create(category=cls.farmers, scheme=cls.credit, max_income=300000)
+        cls.udyam = Scheme.objects.create(scheme_name='Mahila Udyam', target_category=cls.women)
+        RuleEngine.objects.create(category=cls.women, scheme=cls.udyam, gender='Female')
+        cls.user = CustomUser.objects.create(
+            name='Savita', dob=date(1985, 3, 3), aadhaar_no='222233334444',
+            email='savita@example.com', gender='Female', income=200000,
+        )
+        cls.other = CustomUser.objects.create(
+            name='Rekha', dob=date(1990, 9, 9), aadhaar_no='222233335555',
+            email='rekha@example.com', gender='Female', income=200000,
+        )
+        for user, categories in ((cls.user, (cls.farmers, cls.women)), (cls.other, (cls.women,))):
+            for category in categories:
+                UserCategories.objects.create(user=user, category=category)
+            User.objects.create_user(user.name.lower(), user.email, 'pw')
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        for user in (self.user, self.other):
+            eligibility.check_user_eligibility(user)
+        # Backdate every row, so a rewrite shows up as a newer timestamp.
+        self.past = timezone.now() - timedelta(days=1)
+        UserEligibility.objects.update(status_changed_on=self.past)
+
+    def versions(self):
+        return dict(Category.objects.values_list('category_id', 'rules_version'))
+
+    def rows(self, user):
+        return {row.scheme_id: row for row in UserEligibility.objects.filter(user=user)}
+
+    def load_dashboard(self, user):
+        self.client.force_login(User.objects.get(email=user.email))
+        with mock.patch('core.eligibility.check_user_eligibility',
+                        wraps=eligibility.check_user_eligibility) as check:
+            self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        return check.call_count
+
+    def test_fresh_users_are_not_recomputed(self):
+        self.assertFalse(eligibility.refresh_if_stale(self.user))
+        self.assertEqual(self.load_dashboard(self.user), 0)
+
+    def test_rule_save_bumps_only_its_category(self):
+        before = self.versions()
+        self.rule.max_income = 100000
+        self.rule.save()
+        after = self.versions()
+        self.assertEqual(after[self.farmers.category_id], before[self.farmers.category_id] + 1)
+        self.assertEqual(after[self.women.category_id], before[self.women.category_id])
+
+        self.assertTrue(eligibility.refresh_if_stale(self.user))
+        self.assertFalse(eligibility.refresh_if_stale(self.user))
+        self.assertFalse(eligibility.refresh_if_stale(self.other))
+
+    def test_moving_a_rule_bumps_both_categories(self):
+        before = self.versions()
+        self.rule.category = self.women
+        self.rule.save()
+        after = self.versions()
+        self.assertEqual(after, {c: v + 1 for c, v in before.items()})
+
+    def test_next_dashboard_load_rewrites_only_stale_rows(self):
+        self.rule.max_income = 100000
+        self.rule.save()
+
+        self.assertEqual(self.load_dashboard(self.other), 0)
+        self.assertEqual(self.load_dashboard(self.user), 1)
+        rows = self.rows(self.user)
+        self.assertEqual(rows[self.credit.scheme_id].eligibility_status, 'Not Eligible')
+        self.assertGreater(rows[self.credit.scheme_id].status_changed_on, self.past)
+        self.assertEqual(rows[self.udyam.scheme_id].eligibility_status, 'Eligible')
+        self.assertEqual(rows[self.udyam.scheme_id].status_changed_on, self.past)
+        self.assertEqual({r.status_changed_on for r in self.rows(self.other).values()}, {self.past})
+
+        versions = self.versions()
+        self.assertEqual(dict(UserCategories.objects.filter(user=self.user)
+                              .values_list('category_id', 'rules_version')), versions)
+        self.assertEqual(self.load_dashboard(self.user), 0)
+
+    def test_rules_edited_in_another_process_are_reloaded(self):
+        eligibility.get_rule_set()
+        # No signal reaches this process's cached RuleSet.
+        RuleEngine.objects.filter(pk=self.rule.pk).update(max_income=100000)
+        bump_rules_version(self.farmers.category_id)
+
+        self.assertTrue(eligibility.refresh_if_stale(self.user))
+        self.assertEqual(self.rows(self.user)[self.credit.scheme_id].eligibility_status, 'Not Eligible')
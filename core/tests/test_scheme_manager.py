@@ -0,0 +1,60 @@
+"""
+Scheme manager: editing a scheme or asking for its matches marks its
+categories for the batch recompute instead of scanning every user inline.
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from core import eligibility
+from core.models import Category, CustomUser, DirtyCategory, RuleEngine, Scheme, UserCategories, UserEligibility
+
+
+class SchemeMatchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Category.objects.create(category_name='Farmers')
+        cls.widows = Category.objects.create(category_name='Widows')
+        cls.scheme = Scheme.objects.create(scheme_name='Crop Support', target_category=cls.farmers)
+        RuleEngine.objects.create(category=cls.widows, scheme=cls.scheme, max_income=200000)
+        cls.user = CustomUser.objects.create(
+            name='Meena', dob=date(1970, 5, 5), aadhaar_no='999988887777', income=50000,
+        )
+        UserCategories.objects.create(user=cls.user, category=cls.widows)
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'pw', is_staff=True)
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        self.client.force_login(self.staff)
+
+    def eligible(self):
+        return UserEligibility.objects.filter(
+            scheme=self.scheme, eligibility_status='Eligible').count()
+
+    def assertMarked(self, response):
+        self.assertRedirects(response, reverse('admin_schemes'), fetch_redirect_response=False)
+        self.assertEqual(set(DirtyCategory.objects.values_list('category_id', flat=True)),
+                         {self.farmers.category_id, self.widows.category_id})
+        self.assertEqual(self.eligible(), 0)
+        self.assertIn('Matching users for Crop Support in the background; '
+                      'its Eligible Users count updates when that finishes.',
+                      [str(m) for m in get_messages(response.wsgi_request)])
+
+    def test_match_users_is_deferred(self):
+        self.assertMarked(self.client.post(reverse('scheme_match_users', args=[self.scheme.pk])))
+        self.assertContains(self.client.get(reverse('admin_schemes')), 'title="Users are being re-matched')
+
+        call_command('recompute_eligibility', '--once', '--window', '0', verbosity=0)
+        self.assertEqual(self.eligible(), 1)
+        self.assertFalse(DirtyCategory.objects.exists())
+        self.assertNotContains(self.client.get(reverse('admin_schemes')), 'title="Users are being re-matched')
+
+    def test_edit_is_deferred(self):
+        self.assertMarked(self.client.post(reverse('scheme_edit', args=[self.scheme.pk]), {
+            'scheme_name': 'Crop Support', 'target_category': self.farmers.pk,
+        }))
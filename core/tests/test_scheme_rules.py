@@ -0,0 +1,250 @@
+"""
+core/scheme_rules.py: parsing and validation of eligibility_rules
+expressions, and agreement between the per-user closures and their NumPy
+twins on a small population.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from core import eligibility
+from core.eligibility_matrix import RuleMatrix, UserColumns, eligible_counts
+from core.forms import SchemeForm
+from core.models import Category, CustomUser, RuleEngine, Scheme, UserCategories
+from core.scheme_rules import RuleSyntaxError, compile_program, is_program
+
+
+def years_ago(years):
+    """A date of birth making someone ``years`` old today."""
+    return date(date.today().year - years, 1, 1)
+
+
+class CompileProgramTests(SimpleTestCase):
+
+    def assertRejected(self, spec, message):
+        with self.assertRaisesMessage(RuleSyntaxError, message):
+            compile_program(spec)
+
+    def test_free_text_is_not_a_program(self):
+        self.assertIsNone(compile_program({}))
+        self.assertIsNone(compile_program(None))
+        self.assertIsNone(compile_program({'note': 'BPL card holders only'}))
+        self.assertFalse(is_program(['all']))
+
+    def test_malformed_nodes(self):
+        self.assertRejected({'all': []}, '"all" needs a non-empty list')
+        self.assertRejected({'any': {'field': 'age'}}, '"any" needs a non-empty list')
+        self.assertRejected({'all': ['age']}, "Expected an object, got 'age'")
+        self.assertRejected({'field': 'age', 'op': '>', 'value': 1, 'not': {}},
+                            'exactly one of')
+        nested = {'field': 'age', 'op': '>=', 'value': 18}
+        for _ in range(40):
+            nested = {'not': nested}
+        self.assertRejected(nested, 'nested too deeply')
+        self.assertRejected({'field': 'age', 'op': '>=', 'value': 18, 'reason': 5},
+                            '"reason" must be text')
+
+    def test_invalid_comparisons(self):
+        cases = [
+            ({'field': 'caste', 'op': '==', 'value': 'x'}, "Unknown field 'caste'"),
+            ({'field': 'flag', 'op': '==', 'value': True}, "Unknown field 'flag'"),
+            ({'field': 'gender', 'op': '<', 'value': 'Male'}, "Operator '<' is not allowed on gender"),
+            ({'field': 'pension_status', 'op': 'in', 'value': [True]},
+             "Operator 'in' is not allowed on pension_status"),
+            ({'field': 'education', 'op': 'in', 'value': ['Graduate']},
+             "Operator 'in' is not allowed on education"),
+            ({'field': 'age', 'op': '>='}, 'Comparison on age has no value'),
+            ({'field': 'age', 'op': 'in', 'value': 18}, '"in" on age needs a non-empty list'),
+            ({'field': 'age', 'op': 'not in', 'value': []}, '"not in" on age needs a non-empty list'),
+            ({'field': 'age', 'op': '>=', 'value': 17.5}, 'Expected a whole number'),
+            ({'field': 'age', 'op': '>=', 'value': True}, 'Expected a whole number'),
+            ({'field': 'income', 'op': '<=', 'value': 'lots'}, 'Expected an amount'),
+            ({'field': 'income', 'op': '<=', 'value': False}, 'Expected an amount'),
+            ({'field': 'gender', 'op': '==', 'value': ' '}, 'Expected text'),
+            ({'field': 'location', 'op': '==', 'value': 'Atlantis'}, "Unknown state or district: 'Atlantis'"),
+            ({'field': 'disability_cert', 'op': '==', 'value': 'yes'}, 'Expected true or false'),
+        ]
+        for spec, message in cases:
+            with self.subTest(spec=spec):
+                self.assertRejected(spec, message)
+
+    def test_reason_and_fields(self):
+        program = compile_program({
+            'all': [{'field': 'age', 'op': '>=', 'value': 18},
+                    {'any': [{'field': 'location', 'op': '==', 'value': 'Kerala'},
+                             {'field': 'education', 'op': '>=', 'value': 'Graduate'}]}],
+            'reason': 'Adults in Kerala or graduates',
+        })
+        self.assertEqual(program.reason, 'Adults in Kerala or graduates')
+        self.assertEqual(program.fields, {'dob', 'address', 'education'})
+        self.assertEqual(program.points['education'], {4})
+        self.assertEqual(program.points['location'], {'KL'})
+
+    def test_compiled_once_per_source(self):
+        spec = {'field': 'age', 'op': '>=', 'value': 18}
+        self.assertIs(compile_program(spec), compile_program(dict(spec)))
+
+
+class SchemeFormTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(category_name='Students')
+
+    def form(self, rules):
+        return SchemeForm({
+            'scheme_name': 'Merit Scholarship', 'target_category': self.category.pk,
+            'eligibility_rules': json.dumps(rules),
+        })
+
+    def test_valid_program(self):
+        form = self.form({'field': 'income', 'op': '<=', 'value': 250000})
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_free_text_rules_are_still_accepted(self):
+        self.assertTrue(self.form({'note': 'Merit list only'}).is_valid())
+
+    def test_invalid_program(self):
+        form = self.form({'field': 'age', 'op': '=>', 'value': 18})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors['eligibility_rules'],
+                         ["Invalid eligibility rules: Operator '=>' is not allowed on age"])
+
+
+class ClosureVectorAgreementTests(TestCase):
+    """Every operator on every field, through SchemeProgram.test and .vector."""
+
+    LEAVES = [
+        ('age', op, value) for op, value in [
+            ('==', 18), ('!=', 18), ('<', 18), ('<=', 18), ('>', 59), ('>=', 60),
+            ('in', [17, 18]), ('not in', [17, 18]),
+        ]
+    ] + [
+        ('income', op, value) for op, value in [
+            ('==', 0), ('!=', 0), ('<', 250000), ('<=', 250000), ('>', '250000.25'),
+            ('>=', 250000.5), ('in', [0, 250000]), ('not in', [0, 250000]),
+        ]
+    ] + [
+        ('business_turnover', op, value) for op, value in [
+            ('>=', 1000000), ('<', 1000000), ('==', 0), ('not in', [0]),
+        ]
+    ] + [
+        ('gender', op, value) for op, value in [
+            ('==', 'Female'), ('!=', 'female'), ('in', ['male', 'Other']), ('not in', ['Male']),
+        ]
+    ] + [
+        ('education', op, value) for op, value in [
+            ('==', 'Graduate'), ('!=', 4), ('<', '12th'), ('<=', 2), ('>', 4), ('>=', 'Graduate'),
+        ]
+    ] + [
+        ('location', op, value) for op, value in [
+            ('==', 'Tamil Nadu'), ('!=', 'Kerala'), ('in', ['Goa', 'Kochi']),
+            ('not in', ['Tamil Nadu', 'Goa']),
+        ]
+    ] + [
+        (flag, op, True)
+        for flag in ('pension_status', 'disability_cert', 'unemployment_status')
+        for op in ('==', '!=')
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='General')
+        scheme = Scheme.objects.create(scheme_name='Open Scheme', target_category=category)
+        RuleEngine.objects.create(category=category, scheme=scheme)
+        people = [
+            dict(name='Asha', dob=years_ago(30), gender='Female', income=Decimal('120000'),
+                 address='Chennai, Tamil Nadu', education='B.Tech', disability_cert=True),
+            dict(name='Ravi', dob=years_ago(65), gender='Male', income=Decimal('400000'),
+                 address='Kochi, Kerala', education='10th pass', pension_status=True),
+            dict(name='Blank', dob=years_ago(17)),
+            dict(name='Kiran', dob=years_ago(45), gender='Other', income=Decimal('250000'),
+                 address='Somewhere unknown', education='PhD', unemployment_status=True,
+                 business_turnover=Decimal('1500000')),
+            dict(name='Joseph', dob=years_ago(18), gender='Male', income=Decimal('0'),
+                 address='Panaji, Goa', education='Diploma', business_turnover=Decimal('0')),
+            dict(name='Lakshmi', dob=years_ago(59), gender='Female', income=Decimal('250000.50'),
+                 address='Madurai', education='12th pass'),
+        ]
+        for n, person in enumerate(people):
+            user = CustomUser.objects.create(aadhaar_no=f'5000000000{n:02d}', **person)
+            UserCategories.objects.create(user=user, category=category)
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        self.people = list(CustomUser.objects.order_by('user_id'))
+        self.profiles = [eligibility.Profile.from_user(u) for u in self.people]
+        self.users = UserColumns.load(RuleMatrix.from_rule_set())
+        self.rows = np.arange(len(self.people))
+
+    def results(self, spec):
+        program = compile_program(spec)
+        closure = {u.name for u, p in zip(self.people, self.profiles) if program.test(p)}
+        vector = {u.name for u, hit in zip(self.people, program.vector(self.users, self.rows)) if hit}
+        self.assertEqual(closure, vector, spec)
+        return closure
+
+    def test_every_operator_agrees(self):
+        for field, op, value in self.LEAVES:
+            spec = {'field': field, 'op': op, 'value': value}
+            with self.subTest(spec=spec):
+                self.results(spec)
+                self.results({'not': spec})
+
+    def test_missing_values_fail_every_comparison(self):
+        self.assertEqual(self.results({'field': 'income', 'op': '!=', 'value': 0}),
+                         {'Asha', 'Ravi', 'Kiran', 'Lakshmi'})
+        self.assertEqual(self.results({'field': 'gender', 'op': 'not in', 'value': ['Male']}),
+                         {'Asha', 'Kiran', 'Lakshmi'})
+        self.assertEqual(self.results({'field': 'business_turnover', 'op': '<', 'value': 1000000}),
+                         {'Joseph'})
+        self.assertEqual(self.results({'field': 'age', 'op': 'in', 'value': [17, 18]}),
+                         {'Blank', 'Joseph'})
+        # A missing value is still missing under "not": the negation passes.
+        self.assertIn('Blank', self.results({'not': {'field': 'income', 'op': '>=', 'value': 0}}))
+
+    def test_negated_locations_need_a_known_location(self):
+        self.assertEqual(self.results({'field': 'location', 'op': '!=', 'value': 'Kerala'}),
+                         {'Asha', 'Joseph', 'Lakshmi'})
+        self.assertEqual(self.results({'field': 'location', 'op': 'not in',
+                                       'value': ['Tamil Nadu', 'Goa']}), {'Ravi'})
+        self.assertEqual(self.results({'field': 'location', 'op': 'in', 'value': ['Goa', 'Kochi']}),
+                         {'Ravi', 'Joseph'})
+        self.assertEqual(self.results({'field': 'location', 'op': '==', 'value': 'Tamil Nadu'}),
+                         {'Asha', 'Lakshmi'})
+
+    def test_combinators_agree(self):
+        spec = {'all': [
+            {'field': 'age', 'op': '>=', 'value': 18},
+            {'any': [
+                {'field': 'income', 'op': '<=', 'value': 250000},
+                {'field': 'disability_cert', 'op': '==', 'value': True},
+                {'any': [{'field': 'pension_status', 'op': '==', 'value': True}]},
+            ]},
+            {'all': [{'not': {'field': 'location', 'op': 'in', 'value': ['Goa']}}]},
+        ]}
+        self.assertEqual(self.results(spec), {'Asha', 'Ravi', 'Kiran'})
+
+    def test_engine_and_matrix_agree(self):
+        scheme = Scheme.objects.get()
+        scheme.eligibility_rules = {
+            'any': [{'field': 'education', 'op': '>=', 'value': 'Graduate'},
+                    {'field': 'location', 'op': '==', 'value': 'Goa'}],
+            'reason': 'Graduates or Goa residents only',
+        }
+        scheme.save()
+        eligibility.invalidate_rule_cache()
+
+        eligible, reasons = set(), set()
+        for user in self.people:
+            status, reason, _ = eligibility.check_user_eligibility(user)[scheme.scheme_id]
+            if status == eligibility.ELIGIBLE:
+                eligible.add(user.name)
+            else:
+                reasons.add(reason)
+        self.assertEqual(eligible, {'Asha', 'Kiran', 'Joseph'})
+        self.assertEqual(reasons, {'Graduates or Goa residents only'})
+        self.assertEqual(eligible_counts(), {scheme.scheme_id: 3})
@@ -0,0 +1,77 @@
+"""
+Adding and removing a search category: both go through the eligibility job
+path, inline by default and queued (and merged) with ELIGIBILITY_JOBS_ASYNC.
+"""
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core import eligibility
+from core.models import (
+    Category, CustomUser, EligibilityJob, RuleEngine, Scheme, UserCategories, UserEligibility,
+)
+
+
+class DeleteSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Category.objects.create(category_name='Farmers')
+        cls.women = Category.objects.create(category_name='Women')
+        cls.scheme = Scheme.objects.create(scheme_name='Kisan Credit', target_category=cls.farmers)
+        RuleEngine.objects.create(category=cls.farmers, scheme=cls.scheme, max_income=300000)
+        cls.other = Scheme.objects.create(scheme_name='Mahila Udyam', target_category=cls.women)
+        RuleEngine.objects.create(category=cls.women, scheme=cls.other, gender='Female')
+        cls.user = CustomUser.objects.create(
+            name='Savita', dob=date(1985, 3, 3), aadhaar_no='222233334444',
+            email='savita@example.com', gender='Female', income=100000,
+        )
+        cls.login = User.objects.create_user('savita', 'savita@example.com', 'pw')
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        self.searches = [UserCategories.objects.create(user=self.user, category=category)
+                         for category in (self.farmers, self.women)]
+        eligibility.check_user_eligibility(self.user)
+        self.client.force_login(self.login)
+
+    def delete(self, search):
+        return self.client.post(reverse('delete_search', args=[search.user_cat_id]))
+
+    def eligible(self):
+        return set(UserEligibility.objects.filter(
+            user=self.user, eligibility_status='Eligible',
+        ).values_list('scheme__scheme_name', flat=True))
+
+    def test_delete_rechecks_inline(self):
+        self.assertEqual(self.eligible(), {'Kisan Credit', 'Mahila Udyam'})
+        response = self.delete(self.searches[0])
+        self.assertRedirects(response, reverse('dashboard'), fetch_redirect_response=False)
+        self.assertEqual(self.eligible(), {'Mahila Udyam'})
+        self.assertFalse(EligibilityJob.objects.exists())
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)],
+                         ['Search for "Farmers" removed.', 'No longer eligible for: Kisan Credit'])
+
+    @override_settings(ELIGIBILITY_JOBS_ASYNC=True)
+    def test_deletes_are_queued_and_merged(self):
+        self.delete(self.searches[0])
+        self.delete(self.searches[1])
+        job = EligibilityJob.objects.get()
+        self.assertEqual(job.status, EligibilityJob.QUEUED)
+        self.assertEqual(set(job.changed_categories.split(',')),
+                         {str(self.farmers.category_id), str(self.women.category_id)})
+        self.assertEqual(self.client.session['eligibility_job'], job.job_id)
+        # Nothing is recomputed until a worker runs the job.
+        self.assertEqual(self.eligible(), {'Kisan Credit', 'Mahila Udyam'})
+        self.assertFalse(UserCategories.objects.filter(user=self.user).exists())
+
+    def test_other_users_searches_are_not_found(self):
+        stranger = CustomUser.objects.create(name='Other', dob=date(1990, 1, 1), aadhaar_no='1')
+        search = UserCategories.objects.create(user=stranger, category=self.farmers)
+        response = self.delete(search)
+        self.assertTrue(UserCategories.objects.filter(pk=search.pk).exists())
+        self.assertEqual([str(m) for m in get_messages(response.wsgi_request)],
+                         ['Search record not found.'])
@@ -0,0 +1,73 @@
+"""
+core/eligibility.py sync_rows: results are written as a diff, so unchanged
+rows are left alone and status_changed_on moves only with the status.
+"""
+from datetime import date, timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.eligibility import ELIGIBLE, sync_rows
+from core.models import Category, CustomUser, Scheme, UserEligibility
+
+
+class SyncRowsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(category_name='Students')
+        cls.schemes = [Scheme.objects.create(scheme_name=name, target_category=category)
+                       for name in ('Scholarship', 'Laptop', 'Hostel')]
+        cls.user = CustomUser.objects.create(name='Anil', dob=date(2004, 4, 4), aadhaar_no='31')
+
+    def row(self, scheme, status=ELIGIBLE, reason='', score=80):
+        return UserEligibility(user_id=self.user.user_id, scheme_id=scheme.scheme_id,
+                               eligibility_status=status, reason=reason,
+                               criteria_mask=0, match_score=score)
+
+    def stored(self):
+        return {row.scheme_id: row for row in UserEligibility.objects.filter(user=self.user)}
+
+    def backdate(self):
+        """Move every stored status_changed_on a day back, so rewrites show."""
+        past = timezone.now() - timedelta(days=1)
+        UserEligibility.objects.update(status_changed_on=past)
+        return past
+
+    def test_new_rows_are_inserted(self):
+        self.assertEqual(sync_rows([self.row(s) for s in self.schemes]), (3, 0, 0))
+        self.assertTrue(all(r.status_changed_on for r in self.stored().values()))
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        sync_rows([self.row(s) for s in self.schemes])
+        past = self.backdate()
+        with self.assertNumQueries(1):
+            self.assertEqual(sync_rows([self.row(s) for s in self.schemes]), (0, 0, 0))
+        self.assertEqual({r.status_changed_on for r in self.stored().values()}, {past})
+
+    def test_status_flip_moves_status_changed_on(self):
+        scholarship, laptop, hostel = self.schemes
+        sync_rows([self.row(s) for s in self.schemes])
+        past = self.backdate()
+
+        result = sync_rows([self.row(scholarship, 'Not Eligible', 'Income too high', 40),
+                            self.row(laptop, score=95), self.row(hostel)])
+        self.assertEqual(result, (0, 2, 0))
+        stored = self.stored()
+        self.assertEqual(stored[scholarship.scheme_id].eligibility_status, 'Not Eligible')
+        self.assertGreater(stored[scholarship.scheme_id].status_changed_on, past)
+        # A new score alone is restated without moving the change time.
+        self.assertEqual(stored[laptop.scheme_id].match_score, 95)
+        self.assertEqual(stored[laptop.scheme_id].status_changed_on, past)
+        self.assertEqual(stored[hostel.scheme_id].status_changed_on, past)
+
+    def test_dropped_rows_are_removed_for_complete_results(self):
+        scholarship, laptop, hostel = self.schemes
+        sync_rows([self.row(s) for s in self.schemes])
+        self.assertEqual(sync_rows([self.row(scholarship)], user_ids=[self.user.user_id]), (0, 0, 2))
+        self.assertEqual(set(self.stored()), {scholarship.scheme_id})
+
+    def test_partial_results_keep_other_rows(self):
+        sync_rows([self.row(s) for s in self.schemes])
+        self.assertEqual(sync_rows([self.row(self.schemes[0])]), (0, 0, 0))
+        self.assertEqual(len(self.stored()), 3)
@@ -0,0 +1,117 @@
+"""
+POST /api/eligibility/what-if/: overlays are validated against the
+eligibility fields, and the reported changes are what evaluate() gives for
+a profile with those fields actually set.  Nothing is written.
+"""
+import copy
+import json
+from datetime import date
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from core import eligibility
+from core.models import Category, CustomUser, RuleEngine, Scheme, UserCategories, UserEligibility
+
+
+class WhatIfTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmers = Category.objects.create(category_name='Farmers')
+        cls.credit = Scheme.objects.create(scheme_name='Kisan Credit', target_category=cls.farmers)
+        RuleEngine.objects.create(category=cls.farmers, scheme=cls.credit, max_income=300000)
+        cls.local = Scheme.objects.create(scheme_name='Uzhavar Aid', target_category=cls.farmers)
+        RuleEngine.objects.create(category=cls.farmers, scheme=cls.local, location='Tamil Nadu')
+        cls.user = CustomUser.objects.create(
+            name='Murugan', dob=date(1978, 8, 8), aadhaar_no='444455556666',
+            email='murugan@example.com', income=Decimal('450000'), address='Kochi, Kerala',
+        )
+        UserCategories.objects.create(user=cls.user, category=cls.farmers)
+        cls.login = User.objects.create_user('murugan', 'murugan@example.com', 'pw')
+
+    def setUp(self):
+        eligibility.invalidate_rule_cache()
+        eligibility.check_user_eligibility(self.user)
+        self.client.force_login(self.login)
+
+    def post(self, body):
+        return self.client.post(reverse('eligibility_what_if'), json.dumps(body),
+                                content_type='application/json')
+
+    def assertError(self, body, message):
+        response = self.post(body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(message, response.json()['error'])
+
+    def stored(self):
+        return set(UserEligibility.objects.filter(user=self.user).values_list(
+            'scheme_id', 'eligibility_status', 'reason', 'match_score'))
+
+    def test_anonymous_is_rejected(self):
+        self.client.logout()
+        self.assertEqual(self.post({'overlay': {'income': 1}}).status_code, 401)
+
+    def test_get_is_rejected(self):
+        self.assertEqual(self.client.get(reverse('eligibility_what_if')).status_code, 405)
+
+    def test_invalid_overlays(self):
+        self.assertEqual(self.client.post(reverse('eligibility_what_if'), 'not json',
+                                          content_type='application/json').json(),
+                         {'error': 'Invalid JSON'})
+        self.assertError(['income'], 'Invalid JSON')
+        self.assertError({}, 'overlay must be a non-empty object')
+        self.assertError({'overlay': {}}, 'overlay must be a non-empty object')
+        self.assertError({'overlay': ['income']}, 'overlay must be a non-empty object')
+        self.assertError({'overlay': {'income': 1, 'caste': 'OBC', 'name': 'X'}},
+                         'Unsupported fields: caste, name. Allowed: ')
+        self.assertError({'overlay': {'income': 'lots'}}, 'must be a decimal number')
+        self.assertError({'overlay': {'dob': 'yesterday'}}, 'invalid date format')
+        self.assertError({'overlay': {'dob': ''}}, 'dob cannot be empty')
+
+    def test_changes_match_evaluate(self):
+        overlays = [
+            {'income': '150000'},
+            {'address': 'Madurai, Tamil Nadu'},
+            {'income': 150000, 'address': 'Madurai, Tamil Nadu'},
+            {'income': None},
+        ]
+        before = self.stored()
+        rule_set = eligibility.get_rule_set()
+        for overlay in overlays:
+            with self.subTest(overlay=overlay):
+                response = self.post({'overlay': overlay})
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+
+                what_if = copy.copy(self.user)
+                for name, value in overlay.items():
+                    setattr(what_if, name, CustomUser._meta.get_field(name).to_python(value))
+                what_if.refresh_derived_fields()
+                expected = eligibility.evaluate(eligibility.Profile.from_user(what_if),
+                                                [self.farmers.category_id], rule_set)
+                eligible = {s for s, (status, _, _) in expected.items()
+                            if status == eligibility.ELIGIBLE}
+
+                self.assertEqual(data['eligible_before'], 0)
+                self.assertEqual(data['eligible_after'], len(eligible))
+                self.assertEqual({c['scheme_id'] for c in data['changes']}, eligible)
+                for change in data['changes']:
+                    self.assertEqual((change['from'], change['to']), ('Not Eligible', 'Eligible'))
+        self.assertEqual(self.stored(), before)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.income, Decimal('450000'))
+
+    def test_losing_a_scheme_is_reported(self):
+        CustomUser.objects.filter(pk=self.user.pk).update(income=Decimal('100000'))
+        self.user.refresh_from_db()
+        eligibility.check_user_eligibility(self.user)
+
+        data = self.post({'overlay': {'income': 500000}}).json()
+        self.assertEqual((data['eligible_before'], data['eligible_after']), (1, 0))
+        [change] = data['changes']
+        self.assertEqual((change['scheme_name'], change['from'], change['to']),
+                         ('Kisan Credit', 'Eligible', 'Not Eligible'))
+        self.assertEqual(data['overlay'], {'income': '500000'})
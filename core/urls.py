@@ -7,6 +7,7 @@ urlpatterns = [
     path('login/',    views.UserLoginView.as_view(),        name='login'),
     path('logout/',   views.logout_view,                    name='logout'),
     path('dashboard/', views.dashboard,                     name='dashboard'),
+    path('api/dashboard/eligible/', views.dashboard_eligible, name='dashboard_eligible'),
     path('categories/', views.CategorySelectionView.as_view(), name='categories'),
     path('eligibility/', views.eligibility_view,            name='eligibility'),
 
@@ -48,6 +49,14 @@ urlpatterns = [
 
     # Re-check Eligibility
     path('recheck-eligibility/', views.recheck_eligibility, name='recheck_eligibility'),
+    path('eligibility/jobs/<int:job_id>/', views.eligibility_job_status, name='eligibility_job_status'),
+
+    # Household (family) benefits
+    path('household/', views.household_view, name='household'),
+    path('platform-admin/households/<int:household_id>/', views.household_view, name='admin_household'),
+
+    # What-if eligibility simulation (read-only)
+    path('api/eligibility/what-if/', views.eligibility_what_if, name='eligibility_what_if'),
 
     # Withdraw Application
     path('application/<int:app_id>/withdraw/', views.withdraw_application, name='withdraw_application'),
@@ -73,4 +82,5 @@ urlpatterns = [
     path('platform-admin/schemes/create/', views.scheme_create, name='scheme_create'),
     path('platform-admin/schemes/<int:scheme_id>/edit/', views.scheme_edit, name='scheme_edit'),
     path('platform-admin/schemes/<int:scheme_id>/delete/', views.scheme_delete, name='scheme_delete'),
+    path('platform-admin/schemes/<int:scheme_id>/match-users/', views.scheme_match_users, name='scheme_match_users'),
 ]
\ No newline at end of file
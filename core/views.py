@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView as DjangoLoginView
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from django.core.mail import send_mail
@@ -12,7 +12,11 @@ from django.conf import settings
 from django import forms
 from django.views.decorators.http import require_POST
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q, Count
+from django.middleware.csrf import get_token
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.db.models import Q, Count, Exists, OuterRef
 import json
 import random
 import string
@@ -20,12 +24,22 @@ from typing import Any
 
 
 
-from .models import CustomUser, UserCategories, UserEligibility, Scheme, Application, Grievance, Category, RuleEngine, Announcement
+from .models import CustomUser, UserCategories, UserEligibility, Scheme, Application, Grievance, Category, RuleEngine, Announcement, EligibilityJob, NearMiss, Household, DirtyCategory
 from .forms import (
     UserRegistrationForm, CategorySelectionForm, LoginForm,
     ForgotPasswordForm, OTPVerifyForm, ResetPasswordForm, ChangePasswordForm,
     GrievanceForm, EditProfileForm,
 )
+from .eligibility import (
+    ELIGIBILITY_FIELDS, Profile, mask_checklist, match_scores,
+    refresh_if_stale, simulate,
+)
+from .announcements import active_announcement, bump_announcement_version
+from .dashboard import InvalidCursor, eligible_page, fill_scores, load_dashboard
+from .dashboard_cache import bump_dashboard_version, cached_sections, dashboard_versions, store_sections
+from .household import check_household_eligibility, household_benefits, household_members
+from .jobs import enqueue_eligibility_job, job_progress
+from .recompute import mark_category_dirty
 
 
 
@@ -144,54 +158,20 @@ def logout_view(request):
 
 
 # â”€â”€ Helper: match score â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
-def _calculate_match_score(custom_user, scheme):
-    """Returns 0-100 representing how well the user fits the scheme rules."""
-    try:
-        rules = RuleEngine.objects.filter(scheme=scheme)
-        if not rules.exists():
-            return 75
-
-        from datetime import date
-        today = date.today()
-        dob = custom_user.dob
-        age = today.year - dob.year - ((today.month, today.day) < (dob.month, dob.day))
-
-        total_criteria = 0
-        matched_criteria = 0
-
-        for rule in rules:
-            if rule.age_min is not None or rule.age_max is not None:
-                total_criteria += 1
-                age_ok = True
-                if rule.age_min is not None and age < rule.age_min:
-                    age_ok = False
-                if rule.age_max is not None and age > rule.age_max:
-                    age_ok = False
-                if age_ok:
-                    matched_criteria += 1
-
-            if rule.gender:
-                total_criteria += 1
-                if rule.gender.lower() in ['any', 'all'] or \
-                   rule.gender.lower() == (custom_user.gender or '').lower():
-                    matched_criteria += 1
-
-            if rule.min_income is not None or rule.max_income is not None:
-                total_criteria += 1
-                income = float(custom_user.income or 0)
-                income_ok = True
-                if rule.min_income is not None and income < float(rule.min_income):
-                    income_ok = False
-                if rule.max_income is not None and income > float(rule.max_income):
-                    income_ok = False
-                if income_ok:
-                    matched_criteria += 1
-
-        if total_criteria == 0:
-            return 80
-        return min(100, int((matched_criteria / total_criteria) * 100))
-    except Exception:
-        return 75
+def _match_scores(custom_user, scheme_ids):
+    """
+    {scheme_id: 0-100} for how well the user fits each scheme's rules.
+    Scores stored by the eligibility engine are read in one query; any
+    missing ones are computed in memory from the cached rule set.
+    """
+    scheme_ids = list(scheme_ids)
+    scores = dict(UserEligibility.objects.filter(
+        user_id=custom_user.user_id, scheme_id__in=scheme_ids, match_score__isnull=False,
+    ).values_list('scheme_id', 'match_score'))
+    missing = [sid for sid in scheme_ids if sid not in scores]
+    if missing:
+        scores.update(match_scores(Profile.from_user(custom_user), missing))
+    return scores
 
 
 # â”€â”€ Dashboard â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
@@ -214,88 +194,60 @@ def dashboard(request):
             messages.error(request, 'Profile not found. Please register again.')
             return redirect('register')
 
+    # Eligibility run queued by a previous request: flash its outcome once
+    # it has finished, otherwise let the page poll for it.
+    pending_job = None
+    job_id = request.session.get('eligibility_job')
+    if job_id:
+        job = EligibilityJob.objects.filter(job_id=job_id, user_id=custom_user.user_id).first()
+        if job is None or job.is_finished:
+            del request.session['eligibility_job']
+            if job is not None:
+                _flash_job_result(request, job)
+        else:
+            pending_job = job
+
     # â”€â”€ collect every piece of data individually so we can isolate failures â”€â”€
     errors = []
 
-    try:
-        past_categories = list(UserCategories.objects.filter(
-            user_id=custom_user.user_id
-        ).select_related('category').order_by('-user_cat_id')[:5])
-    except Exception:
-        errors.append('past_categories: ' + _tb.format_exc())
-        past_categories = []
-
     search_q     = request.GET.get('q', '').strip()
     filter_state = request.GET.get('state', '').strip()
     filter_type  = request.GET.get('type', '').strip()
+    sort         = request.GET.get('sort', '').strip()
+    # The sections hold CSRF-protected forms, so a new CSRF secret (e.g.
+    # after logging in again) needs a fresh render.
+    get_token(request)
+    variant = (search_q, filter_state, filter_type, sort, request.META.get('CSRF_COOKIE'))
+
+    sections = cached_sections(custom_user.user_id, variant)
+    if sections is None:
+        # Rules changed since this user's results were computed: refresh them
+        # now, unless a queued job is about to do it anyway.  (A cache hit
+        # means no rule or scheme has changed since the sections were built.)
+        if pending_job is None:
+            try:
+                refresh_if_stale(custom_user)
+            except Exception:
+                errors.append('refresh_if_stale: ' + _tb.format_exc())
 
-    try:
-        eligible_qs = UserEligibility.objects.filter(
-            user_id=custom_user.user_id, eligibility_status='Eligible'
-        ).select_related('scheme').order_by('-applied_on')
-        if search_q:
-            eligible_qs = eligible_qs.filter(
-                Q(scheme__scheme_name__icontains=search_q) |
-                Q(scheme__description__icontains=search_q) |
-                Q(scheme__benefits__icontains=search_q)
-            )
-        if filter_state:
-            eligible_qs = eligible_qs.filter(scheme__state__iexact=filter_state)
-        if filter_type:
-            eligible_qs = eligible_qs.filter(scheme__benefit_type__iexact=filter_type)
-        eligible_schemes = []
-        for el in eligible_qs:
-            score = _calculate_match_score(custom_user, el.scheme)
-            eligible_schemes.append({'eligibility': el, 'score': score})
-    except Exception:
-        errors.append('eligible_schemes: ' + _tb.format_exc())
-        eligible_schemes = []
-
-    try:
-        # Pull states & types from ALL schemes so the filter is always fully populated
-        all_schemes_qs = Scheme.objects.values_list('state', 'benefit_type')
-        states        = sorted(set(s for s, _ in all_schemes_qs if s and s.strip()))
-        benefit_types = sorted(set(t for _, t in all_schemes_qs if t and t.strip()))
-    except Exception:
-        errors.append('states/benefit_types: ' + _tb.format_exc())
-        states = []
-        benefit_types = []
-
-    try:
-        total_eligible = UserEligibility.objects.filter(
-            user_id=custom_user.user_id, eligibility_status='Eligible').count()
-    except Exception:
-        errors.append('total_eligible: ' + _tb.format_exc())
-        total_eligible = 0
-
-    try:
-        total_categories = UserCategories.objects.filter(user_id=custom_user.user_id).count()
-    except Exception:
-        errors.append('total_categories: ' + _tb.format_exc())
-        total_categories = 0
-
-    try:
-        applications = list(Application.objects.filter(
-            user_id=custom_user.user_id
-        ).select_related('scheme').order_by('-applied_on')[:5])
-    except Exception:
-        errors.append('applications: ' + _tb.format_exc())
-        applications = []
-
-    try:
-        grievances = list(Grievance.objects.filter(
-            user_id=custom_user.user_id
-        ).select_related('scheme').order_by('-raised_on')[:3])
-    except Exception:
-        errors.append('grievances: ' + _tb.format_exc())
-        grievances = []
+        versions = dashboard_versions(custom_user.user_id)
+        try:
+            data = load_dashboard(custom_user, search_q, filter_state, filter_type, sort)
+            sections = render_to_string('dashboard_sections.html', {
+                **data,
+                'user':         custom_user,
+                'search_q':     search_q,
+                'filter_state': filter_state,
+                'filter_type':  filter_type,
+            }, request)
+            store_sections(custom_user.user_id, versions, variant, sections)
+        except Exception:
+            errors.append('load_dashboard: ' + _tb.format_exc())
 
-    # Announcement banner â€” skip silently if table doesn't exist yet
-    active_announcement = None
     try:
-        active_announcement = Announcement.objects.filter(is_active=True).first()
+        announcement = active_announcement()
     except Exception:
-        pass  # Announcements table doesn't exist yet on Railway â€” it's cosmetic, ignore
+        errors.append('active_announcement: ' + _tb.format_exc())
 
     # â”€â”€ If any CRITICAL query failed, show diagnostic (not a blank 500) â”€â”€
     if errors:
@@ -305,19 +257,10 @@ def dashboard(request):
         return HttpResponse(error_html, status=200)
 
     return render(request, 'dashboard.html', {
-        'past_categories':  past_categories,
-        'eligible_schemes': eligible_schemes,
-        'user':             custom_user,
-        'search_q':         search_q,
-        'filter_state':     filter_state,
-        'filter_type':      filter_type,
-        'announcement':     active_announcement,
-        'states':           states,
-        'benefit_types':    benefit_types,
-        'total_eligible':   total_eligible,
-        'total_categories': total_categories,
-        'applications':     applications,
-        'grievances':       grievances,
+        'sections':     sections,
+        'announcement': announcement,
+        'user':         custom_user,
+        'pending_job':  pending_job,
     })
 
 
@@ -338,14 +281,25 @@ class CategorySelectionView(FormView):
         if not custom_user:
             messages.error(self.request, 'User profile not found.')
             return redirect('register')
-        for category in selected_categories:
-            UserCategories.objects.get_or_create(
-                user_id=custom_user.user_id,
-                category_id=category.category_id
-            )
-        with connection.cursor() as cursor:
-            cursor.callproc('check_user_eligibility', [custom_user.user_id])
-        messages.success(self.request, 'Eligibility checked! View your results below.')
+        existing = set(UserCategories.objects.filter(
+            user_id=custom_user.user_id
+        ).values_list('category_id', flat=True))
+        added = [c.category_id for c in selected_categories if c.category_id not in existing]
+        if not added:
+            messages.info(self.request, 'Those categories are already in your searches.')
+            return super().form_valid(form)
+        # One INSERT for the whole selection, then one incremental pass over
+        # the added categories' rules (no per-row trigger recomputes).
+        UserCategories.objects.bulk_create([
+            UserCategories(user_id=custom_user.user_id, category_id=category_id)
+            for category_id in added
+        ], ignore_conflicts=True)
+        bump_dashboard_version(custom_user.user_id)
+        _queue_eligibility(
+            self.request, custom_user, changed_categories=added,
+            done_message='Eligibility checked! View your results below.',
+            queued_message='Checking your eligibility — results will appear below shortly.',
+        )
         return super().form_valid(form)
 
 
@@ -357,15 +311,16 @@ def delete_search(request, user_cat_id):
         custom_user = get_custom_user(request.user)
         if custom_user:
             try:
-                uc = UserCategories.objects.get(
+                uc = UserCategories.objects.select_related('category').get(
                     user_cat_id=user_cat_id, user_id=custom_user.user_id
                 )
-                UserEligibility.objects.filter(
-                    user_id=custom_user.user_id,
-                    scheme__target_category_id=uc.category_id
-                ).delete()
                 uc.delete()
-                messages.success(request, f'Search for "{uc.category.category_name}" removed.')
+                removed = f'Search for "{uc.category.category_name}" removed.'
+                _queue_eligibility(
+                    request, custom_user, changed_categories=[uc.category_id],
+                    done_message=removed,
+                    queued_message=removed + ' Updating your eligibility — results will appear below shortly.',
+                )
             except UserCategories.DoesNotExist:
                 messages.error(request, 'Search record not found.')
     return redirect('dashboard')
@@ -403,7 +358,16 @@ def scheme_apply_guide(request, scheme_id):
         user_id=custom_user.user_id, scheme_id=scheme_id
     ).first()
 
-    score = _calculate_match_score(custom_user, scheme)
+    eligibility = UserEligibility.objects.filter(
+        user_id=custom_user.user_id, scheme_id=scheme_id
+    ).only('criteria_mask', 'match_score').first()
+    if eligibility and eligibility.match_score is not None:
+        score = eligibility.match_score
+    else:
+        score = _match_scores(custom_user, [scheme.scheme_id])[scheme.scheme_id]
+    criteria = []
+    if eligibility and eligibility.criteria_mask is not None:
+        criteria = mask_checklist(eligibility.criteria_mask)
 
     return render(request, 'scheme_apply_guide.html', {
         'scheme':       scheme,
@@ -411,6 +375,7 @@ def scheme_apply_guide(request, scheme_id):
         'apply_url':    apply_url,
         'existing_app': existing_app,
         'match_score':  score,
+        'criteria':     criteria,
     })
 
 
@@ -911,11 +876,14 @@ def nlp_scheme_finder(request):
                         Q(benefits__icontains=kw)    |
                         Q(benefit_type__icontains=kw)
                     )
-                matched_schemes = Scheme.objects.filter(q_filter).distinct()[:20]
+                matched_schemes = list(Scheme.objects.filter(q_filter).distinct()[:20])
+                scores = _match_scores(
+                    custom_user, [s.scheme_id for s in matched_schemes]
+                ) if custom_user else {}
 
                 # Score results: eligibility match + keyword relevance
                 for scheme in matched_schemes:
-                    base_score = _calculate_match_score(custom_user, scheme) if custom_user else 65
+                    base_score = scores.get(scheme.scheme_id, 65)
                     # Boost score by keyword density in scheme text
                     text = (
                         (scheme.scheme_name  or '') + ' ' +
@@ -1114,6 +1082,164 @@ def change_password(request):
     return render(request, 'change_password.html', {'form': form})
 
 
+def _flash_job_result(request, job):
+    """Tell the user which schemes a finished eligibility job gained or lost."""
+    if job.status == EligibilityJob.FAILED:
+        messages.error(request, 'We could not update your eligibility. Please try Re-check Eligibility.')
+        return
+    result = job.result or {}
+    if result.get('gained'):
+        messages.info(request, 'Now eligible for: ' + ', '.join(result['gained']))
+    if result.get('lost'):
+        messages.warning(request, 'No longer eligible for: ' + ', '.join(result['lost']))
+
+
+def _queue_eligibility(request, custom_user, changed_fields=None, changed_categories=None,
+                       done_message='', queued_message=''):
+    """
+    Queue an eligibility run for ``custom_user``.  If it already finished
+    (jobs running inline) its outcome is flashed now; otherwise the job id
+    is kept in the session for the dashboard to poll.
+    """
+    job = enqueue_eligibility_job(custom_user, changed_fields, changed_categories)
+    if job.is_finished:
+        messages.success(request, done_message)
+        _flash_job_result(request, job)
+    else:
+        messages.success(request, queued_message)
+        request.session['eligibility_job'] = job.job_id
+    return job
+
+
+def eligibility_job_status(request, job_id):
+    """JSON progress of a queued eligibility run, polled by the dashboard."""
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=403)
+    custom_user = get_custom_user(request.user)
+    job = EligibilityJob.objects.filter(
+        job_id=job_id, user_id=custom_user.user_id if custom_user else None,
+    ).first()
+    if job is None:
+        return JsonResponse({'error': 'Job not found'}, status=404)
+    return JsonResponse(job_progress(job))
+
+
+def dashboard_eligible(request):
+    """
+    Next page of the dashboard's eligible schemes as JSON, for infinite
+    scroll: same q / state / type / sort parameters as the dashboard plus the
+    ``cursor`` returned with the previous page.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Login required'}, status=403)
+    custom_user = get_custom_user(request.user)
+    if not custom_user:
+        return JsonResponse({'error': 'Profile not found'}, status=400)
+
+    try:
+        rows, next_cursor = eligible_page(
+            custom_user.user_id,
+            request.GET.get('q', '').strip(),
+            request.GET.get('state', '').strip(),
+            request.GET.get('type', '').strip(),
+            request.GET.get('sort', '').strip(),
+            request.GET.get('cursor', '').strip() or None,
+        )
+    except InvalidCursor as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    fill_scores(custom_user, rows)
+    return JsonResponse({
+        'results': [
+            {
+                'scheme_id':    row['scheme_id'],
+                'scheme_name':  row['scheme_name'],
+                'description':  row['description'],
+                'state':        row['state'],
+                'benefit_type': row['benefit_type'],
+                'reason':       row['reason'],
+                'score':        row['score'],
+                'apply_url':    reverse('scheme_apply_guide', args=[row['scheme_id']]),
+            }
+            for row in rows
+        ],
+        'next_cursor': next_cursor,
+    })
+
+
+def _clean_overlay(data):
+    """Validate a what-if overlay against the CustomUser eligibility fields."""
+    if not isinstance(data, dict) or not data:
+        raise forms.ValidationError('overlay must be a non-empty object')
+    unknown = set(data) - ELIGIBILITY_FIELDS
+    if unknown:
+        raise forms.ValidationError(
+            f'Unsupported fields: {", ".join(sorted(unknown))}. '
+            f'Allowed: {", ".join(sorted(ELIGIBILITY_FIELDS))}'
+        )
+    overlay = {}
+    for name, value in data.items():
+        field = CustomUser._meta.get_field(name)
+        if value in ('', None):
+            if not field.null:
+                raise forms.ValidationError(f'{name} cannot be empty')
+            overlay[name] = None
+        else:
+            overlay[name] = field.to_python(value)
+    return overlay
+
+
+@require_POST
+def eligibility_what_if(request):
+    """
+    Evaluate the user's profile with a JSON overlay of field values (e.g.
+    ``{"overlay": {"income": 150000, "address": "Chennai, Tamil Nadu"}}``)
+    and return the eligibility diff against their stored results.  Nothing
+    is written.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Unauthorized'}, status=401)
+    custom_user = get_custom_user(request.user)
+    if not custom_user:
+        return JsonResponse({'error': 'Profile not found'}, status=400)
+
+    try:
+        body = json.loads(request.body)
+        overlay = _clean_overlay(body.get('overlay'))
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+    except forms.ValidationError as e:
+        return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+
+    results, scores, previous = simulate(custom_user, overlay)
+    flipped = {
+        scheme_id: (previous.get(scheme_id), status, reason)
+        for scheme_id, (status, reason, _) in results.items()
+        if previous.get(scheme_id) != status
+    }
+    names = dict(Scheme.objects.filter(
+        scheme_id__in=list(flipped)
+    ).values_list('scheme_id', 'scheme_name')) if flipped else {}
+
+    return JsonResponse({
+        'overlay': {name: str(value) if value is not None else None
+                    for name, value in overlay.items()},
+        'eligible_before': sum(1 for s in previous.values() if s == 'Eligible'),
+        'eligible_after':  sum(1 for s, _, _ in results.values() if s == 'Eligible'),
+        'changes': [
+            {
+                'scheme_id':   scheme_id,
+                'scheme_name': names.get(scheme_id, f'#{scheme_id}'),
+                'from':        old,
+                'to':          new,
+                'reason':      reason,
+                'match_score': scores.get(scheme_id),
+            }
+            for scheme_id, (old, new, reason) in sorted(flipped.items())
+        ],
+    })
+
+
 # â”€â”€ Edit Profile (Backtracking) â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
 def edit_profile(request):
     if not request.user.is_authenticated:
@@ -1126,10 +1252,15 @@ def edit_profile(request):
         form = EditProfileForm(request.POST, instance=custom_user)
         if form.is_valid():
             form.save()
-            # Re-run eligibility with updated profile data
-            with connection.cursor() as cursor:
-                cursor.callproc('check_user_eligibility', [custom_user.user_id])
-            messages.success(request, 'Profile updated! Your eligibility has been recalculated.')
+            if not ELIGIBILITY_FIELDS.intersection(form.changed_data):
+                messages.success(request, 'Profile updated!')
+                return redirect('dashboard')
+            # Re-evaluate only the rules that read the fields that changed
+            _queue_eligibility(
+                request, custom_user, form.changed_data,
+                done_message='Profile updated! Your eligibility has been recalculated.',
+                queued_message='Profile updated! Your eligibility is being recalculated.',
+            )
             return redirect('dashboard')
     else:
         form = EditProfileForm(instance=custom_user)
@@ -1144,12 +1275,50 @@ def recheck_eligibility(request):
     if request.method == 'POST':
         custom_user = get_custom_user(request.user)
         if custom_user:
-            with connection.cursor() as cursor:
-                cursor.callproc('check_user_eligibility', [custom_user.user_id])
-            messages.success(request, 'Eligibility rechecked successfully!')
+            _queue_eligibility(
+                request, custom_user,
+                done_message='Eligibility rechecked successfully!',
+                queued_message='Re-checking your eligibility — results will appear shortly.',
+            )
     return redirect('dashboard')
 
 
+# â”€â”€ Household benefits â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
+def household_view(request, household_id=None):
+    """
+    Combined benefits of a household.  Members see their own household at
+    /household/; staff (field workers) can open any one and re-check every
+    member's eligibility in a single batch.
+    """
+    if not request.user.is_authenticated:
+        return redirect('login')
+    custom_user = get_custom_user(request.user)
+    own = household_id is None
+    if own:
+        if custom_user is None or custom_user.household_id is None:
+            messages.info(request, 'Your profile is not linked to a household yet.')
+            return redirect('dashboard')
+        household_id = custom_user.household_id
+    elif not request.user.is_staff:
+        return redirect('home')
+    household = get_object_or_404(Household, household_id=household_id)
+    members = household_members(household.household_id)
+
+    if request.method == 'POST':
+        checked = check_household_eligibility(household.household_id, members)
+        messages.success(request, f'Eligibility re-checked for {len(checked)} household member(s).')
+        if own:
+            return redirect('household')
+        return redirect('admin_household', household_id=household.household_id)
+
+    return render(request, 'household.html', {
+        'own':       own,
+        'household': household,
+        'members':   members,
+        'benefits':  household_benefits(household.household_id, members),
+    })
+
+
 # â”€â”€ Withdraw Application â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€â”€
 def withdraw_application(request, app_id):
     if not request.user.is_authenticated:
@@ -1325,7 +1494,7 @@ def admin_users(request):
         return redirect('home')
         
     search_query = request.GET.get('q', '').strip()
-    users = CustomUser.objects.all().order_by('-created_at')
+    users = CustomUser.objects.select_related('household').order_by('-created_at')
     
     if search_query:
         users = users.filter(Q(name__icontains=search_query) | Q(email__icontains=search_query) | Q(aadhaar_no__icontains=search_query))
@@ -1385,52 +1554,67 @@ def admin_export_csv(request):
     return response
 
 
+def _announcement_time(value):
+    """Aware datetime from a datetime-local form value ('' -> None)."""
+    if not value:
+        return None
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'Invalid date/time: {value}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
 def admin_announcements(request):
     if not request.user.is_authenticated or not request.user.is_staff:
         return redirect('home')
 
-    # â”€â”€ Ensure the Announcements table exists (create on-the-fly if missing) â”€â”€
-    from django.db import connection as _conn
-    try:
-        with _conn.cursor() as cur:
-            cur.execute("""
-                CREATE TABLE IF NOT EXISTS Announcements (
-                    id         INT AUTO_INCREMENT PRIMARY KEY,
-                    message    TEXT NOT NULL,
-                    is_active  BOOLEAN DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-    except Exception as _e:
-        print(f"Announcements table create warning: {_e}")
-
     try:
         if request.method == 'POST':
             action = request.POST.get('action')
             if action == 'create':
                 msg = request.POST.get('message', '').strip()
                 is_active = request.POST.get('is_active') == 'on'
+                try:
+                    starts_at = _announcement_time(request.POST.get('starts_at', '').strip())
+                    ends_at = _announcement_time(request.POST.get('ends_at', '').strip())
+                except ValueError as e:
+                    messages.error(request, str(e))
+                    return redirect('admin_announcements')
+                if starts_at and ends_at and ends_at <= starts_at:
+                    messages.error(request, 'The end time must be after the start time.')
+                    return redirect('admin_announcements')
                 if msg:
-                    if is_active:
+                    # A scheduled announcement leaves the current banner up
+                    # until its window opens.
+                    if is_active and starts_at is None:
                         Announcement.objects.all().update(is_active=False)
-                    Announcement.objects.create(message=msg, is_active=is_active)
+                    Announcement.objects.create(message=msg, is_active=is_active,
+                                                starts_at=starts_at, ends_at=ends_at)
+                    bump_announcement_version()
                     messages.success(request, 'Announcement created successfully.')
             elif action == 'delete':
                 ann_id = request.POST.get('ann_id')
                 Announcement.objects.filter(id=ann_id).delete()
+                bump_announcement_version()
                 messages.success(request, 'Announcement deleted.')
             elif action == 'toggle':
                 ann_id = request.POST.get('ann_id')
                 ann = Announcement.objects.filter(id=ann_id).first()
                 if ann:
-                    if not ann.is_active:
+                    if not ann.is_active and ann.starts_at is None:
                         Announcement.objects.all().update(is_active=False)
                     ann.is_active = not ann.is_active
                     ann.save()
+                    bump_announcement_version()
             return redirect('admin_announcements')
 
         announcements = Announcement.objects.all().order_by('-created_at')
-        return render(request, 'admin_announcements.html', {'announcements': announcements})
+        return render(request, 'admin_announcements.html', {
+            'announcements': announcements,
+            'now':           timezone.now(),
+        })
     except Exception as e:
         import traceback
         return HttpResponse(
@@ -1444,13 +1628,34 @@ def admin_schemes(request):
     if not request.user.is_authenticated or not request.user.is_staff:
         return redirect('home')
     try:
-        schemes = Scheme.objects.all().order_by('scheme_name')
+        schemes = Scheme.objects.annotate(
+            eligible_users=Count(
+                'usereligibility', filter=Q(usereligibility__eligibility_status='Eligible'),
+            ),
+            matching=Exists(DirtyCategory.objects.filter(
+                Q(category_id=OuterRef('target_category_id'))
+                | Q(category_id__in=RuleEngine.objects.filter(
+                    scheme_id=OuterRef(OuterRef('pk'))).values('category_id'))
+            )),
+        ).order_by('scheme_name')
         return render(request, 'scheme_manager.html', {'schemes': schemes})
     except Exception as e:
         import traceback
         return HttpResponse(f"<pre>{traceback.format_exc()}</pre>", status=500)
 
 
+def _schedule_scheme_matches(request, scheme):
+    """
+    Mark the categories ``scheme`` draws users from for the batch recompute
+    instead of scanning the population here; the scheme manager shows the
+    new Eligible Users count once ``recompute_eligibility`` has run.
+    """
+    mark_category_dirty(scheme.target_category_id, *RuleEngine.objects.filter(
+        scheme_id=scheme.scheme_id).values_list('category_id', flat=True))
+    messages.info(request, f'Matching users for {scheme.scheme_name} in the background; '
+                           f'its Eligible Users count updates when that finishes.')
+
+
 def scheme_create(request):
     if not request.user.is_authenticated or not request.user.is_staff:
         return redirect('home')
@@ -1458,7 +1663,10 @@ def scheme_create(request):
         form = SchemeForm(request.POST)
         if form.is_valid():
             form.save()
-            messages.success(request, 'Scheme created successfully!')
+            # A new scheme has no Rule_Engine rows yet, so nobody can match
+            # it; staff run Find Eligible Users once its rules are added.
+            messages.success(request, 'Scheme created successfully! Add its eligibility rules, '
+                                      'then use Find Eligible Users.')
             return redirect('admin_schemes')
     else:
         form = SchemeForm()
@@ -1474,12 +1682,22 @@ def scheme_edit(request, scheme_id):
         if form.is_valid():
             form.save()
             messages.success(request, 'Scheme updated successfully!')
+            _schedule_scheme_matches(request, scheme)
             return redirect('admin_schemes')
     else:
         form = SchemeForm(instance=scheme)
     return render(request, 'scheme_form.html', {'form': form, 'title': 'Edit Scheme'})
 
 
+@require_POST
+def scheme_match_users(request, scheme_id):
+    if not request.user.is_authenticated or not request.user.is_staff:
+        return redirect('home')
+    scheme = get_object_or_404(Scheme, pk=scheme_id)
+    _schedule_scheme_matches(request, scheme)
+    return redirect('admin_schemes')
+
+
 def scheme_delete(request, scheme_id):
     if not request.user.is_authenticated or not request.user.is_staff:
         return redirect('home')
@@ -1542,9 +1760,22 @@ def ai_chat(request):
         except Exception:
             pass
 
+    # Schemes just out of reach, precomputed by the eligibility engine
+    near_misses = []
+    if custom_user:
+        try:
+            nq = NearMiss.objects.filter(
+                user_id=custom_user.user_id
+            ).select_related('scheme').order_by('relative_gap', 'scheme_id')[:5]
+            near_misses = [f"{nm.scheme.scheme_name} ({nm.message})" for nm in nq]
+        except Exception:
+            pass
+
     scheme_ctx = ""
     if eligible_schemes:
         scheme_ctx = f"\nUser's eligible schemes: {', '.join(eligible_schemes)}."
+    if near_misses:
+        scheme_ctx += f"\nSchemes the user narrowly misses: {'; '.join(near_misses)}."
 
     # Build session-based conversation history
     SK = f'sbms_groq_chat_{request.user.id}'
@@ -7,6 +7,14 @@ django.setup()
 from django.db import connection
 
 queries = [
+    """
+    CREATE TABLE IF NOT EXISTS Households (
+        household_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name         VARCHAR(255) NOT NULL,
+        address      VARCHAR(255),
+        created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
     """
     CREATE TABLE IF NOT EXISTS Users (
         user_id    INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -20,6 +28,14 @@ queries = [
         income     DECIMAL(15,2),
         occupation VARCHAR(100),
         education  VARCHAR(100),
+        education_level SMALLINT NULL,
+        state_code     VARCHAR(4) NULL,
+        district_code  VARCHAR(40) NULL,
+        pension_status BOOLEAN DEFAULT 0,
+        disability_cert BOOLEAN DEFAULT 0,
+        unemployment_status BOOLEAN DEFAULT 0,
+        business_turnover DECIMAL(15,2),
+        household_id INT NULL REFERENCES Households(household_id) ON DELETE SET NULL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         last_login TIMESTAMP NULL
     )
@@ -28,7 +44,8 @@ queries = [
     CREATE TABLE IF NOT EXISTS Categories (
         category_id   INTEGER PRIMARY KEY AUTOINCREMENT,
         category_name VARCHAR(100) NOT NULL,
-        description   TEXT
+        description   TEXT,
+        rules_version INT NOT NULL DEFAULT 0
     )
     """,
     """
@@ -37,6 +54,7 @@ queries = [
         user_id     INT NOT NULL,
         category_id INT NOT NULL,
         selected_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        rules_version INT NULL,
         UNIQUE (user_id, category_id),
         FOREIGN KEY (user_id)     REFERENCES Users(user_id),
         FOREIGN KEY (category_id) REFERENCES Categories(category_id)
@@ -51,6 +69,7 @@ queries = [
         target_category INT,
         eligibility_criteria TEXT,
         state           VARCHAR(100),
+        state_code      VARCHAR(4) NULL,
         benefit_type    VARCHAR(100),
         official_link   VARCHAR(255),
         registration_link VARCHAR(255),
@@ -91,6 +110,8 @@ queries = [
         id          INTEGER PRIMARY KEY AUTOINCREMENT,
         message     TEXT NOT NULL,
         is_active   BOOLEAN DEFAULT 0,
+        starts_at   DATETIME NULL,
+        ends_at     DATETIME NULL,
         created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """,
@@ -103,9 +124,11 @@ queries = [
         age_max                 INT,
         gender                  VARCHAR(10),
         location                VARCHAR(100),
+        location_code           VARCHAR(40) NULL,
         min_income              DECIMAL(15,2),
         max_income              DECIMAL(15,2),
         education_required      VARCHAR(100),
+        education_level         SMALLINT NOT NULL DEFAULT 0,
         pension_status          BOOLEAN,
         disability_cert         BOOLEAN,
         unemployment_status     BOOLEAN,
@@ -115,18 +138,73 @@ queries = [
     )
     """,
     """
+    CREATE TABLE IF NOT EXISTS Dirty_Categories (
+        category_id INTEGER PRIMARY KEY,
+        generation  INT NOT NULL DEFAULT 1,
+        marked_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        first_marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES Categories(category_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Eligibility_Jobs (
+        job_id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id         INT NOT NULL,
+        pending_user_id INT NULL UNIQUE,
+        status          VARCHAR(10) NOT NULL DEFAULT 'Queued',
+        changed_fields  VARCHAR(255) NULL,
+        changed_categories VARCHAR(255) NULL,
+        result          TEXT NULL,
+        error           TEXT NULL,
+        created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at      TIMESTAMP NULL,
+        finished_at     TIMESTAMP NULL,
+        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Near_Misses (
+        near_miss_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id      INT NOT NULL,
+        scheme_id    INT NOT NULL,
+        criterion    VARCHAR(20) NOT NULL,
+        gap          DECIMAL(15,2) NOT NULL,
+        relative_gap REAL NOT NULL,
+        message      VARCHAR(255) NOT NULL,
+        computed_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE (user_id, scheme_id),
+        FOREIGN KEY (user_id)   REFERENCES Users(user_id) ON DELETE CASCADE,
+        FOREIGN KEY (scheme_id) REFERENCES Schemes(scheme_id) ON DELETE CASCADE
+    )
+    """,
+    """
     CREATE TABLE IF NOT EXISTS User_Eligibility (
         eligibility_id     INTEGER PRIMARY KEY AUTOINCREMENT,
         user_id            INT NOT NULL,
         scheme_id          INT NOT NULL,
         eligibility_status VARCHAR(50) NOT NULL DEFAULT 'Pending',
         reason             TEXT,
+        criteria_mask      INTEGER NULL,
+        match_score        SMALLINT NULL,
         applied_on         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status_changed_on  TIMESTAMP NULL,
         UNIQUE (user_id, scheme_id),
         FOREIGN KEY (user_id)   REFERENCES Users(user_id),
         FOREIGN KEY (scheme_id) REFERENCES Schemes(scheme_id)
     )
-    """
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_users_education_level ON Users (education_level)",
+    # Rule_Engine.education_level is reporting-only; no query filters on it.
+    "DROP INDEX IF EXISTS idx_rule_category_education",
+    "CREATE INDEX IF NOT EXISTS idx_users_state_district ON Users (state_code, district_code)",
+    "CREATE INDEX IF NOT EXISTS idx_users_dob ON Users (dob)",
+    "CREATE INDEX IF NOT EXISTS idx_users_income ON Users (income)",
+    "CREATE INDEX IF NOT EXISTS idx_users_household ON Users (household_id)",
+    "CREATE INDEX IF NOT EXISTS idx_jobs_status ON Eligibility_Jobs (status, job_id)",
+    "CREATE INDEX IF NOT EXISTS idx_schemes_state_code ON Schemes (state_code)",
+    "CREATE INDEX IF NOT EXISTS idx_ue_user_changed ON User_Eligibility (user_id, status_changed_on)",
+    "CREATE INDEX IF NOT EXISTS idx_ue_user_status_changed ON User_Eligibility (user_id, eligibility_status, status_changed_on)",
+    "CREATE INDEX IF NOT EXISTS idx_ue_user_status_score ON User_Eligibility (user_id, eligibility_status, match_score)",
 ]
 print("Fixing SQLite DB...")
 with connection.cursor() as cursor:
@@ -15,6 +15,26 @@ def _add_column(cursor, sql, desc):
         else:
             print(f"  ❌ FAILED {desc}: {e}")
 
+def _add_index(cursor, sql, desc):
+    try:
+        cursor.execute(sql)
+        print(f"  ✅ Indexed: {desc}")
+    except Exception as e:
+        if 'duplicate key name' in str(e).lower() or 'already exists' in str(e).lower() or '1061' in str(e):
+            print(f"  ⏭  Already indexed: {desc}")
+        else:
+            print(f"  ❌ FAILED {desc}: {e}")
+
+def _drop_index(cursor, table, name):
+    for sql in (f"DROP INDEX {name} ON {table}", f"DROP INDEX IF EXISTS {name}"):
+        try:
+            cursor.execute(sql)
+            print(f"  ✅ Dropped index: {name}")
+            return
+        except Exception:
+            continue
+    print(f"  ⏭  Index already gone: {name}")
+
 def _create_table(cursor, sql, desc):
     try:
         cursor.execute(sql)
@@ -25,18 +45,8 @@ def _create_table(cursor, sql, desc):
 def setup_db():
     print("=" * 50)
 
-    # ── Create critical tables FIRST (before migrate, so they always exist) ──
-    print("\n[Pre-migrate: Creating missing tables]")
-    with connection.cursor() as cursor:
-        _create_table(cursor, """
-            CREATE TABLE IF NOT EXISTS Announcements (
-                id         INT AUTO_INCREMENT PRIMARY KEY,
-                message    TEXT NOT NULL,
-                is_active  BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """, "Announcements")
-
+    # Announcements is a managed model: migrations create it and add its
+    # schedule columns (0012), so no request has to run DDL for it.
     print("\nRunning Django Migrations...")
     from django.core.management import call_command
     try:
@@ -49,15 +59,66 @@ def setup_db():
 
         # ── Create tables that Django migrations might have missed ──────────
         print("\n[Tables]")
-        # Announcements already created above, but ensure again
         _create_table(cursor, """
-            CREATE TABLE IF NOT EXISTS Announcements (
-                id         INT AUTO_INCREMENT PRIMARY KEY,
-                message    TEXT NOT NULL,
-                is_active  BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS Dirty_Categories (
+                category_id INT PRIMARY KEY,
+                generation  INT NOT NULL DEFAULT 1,
+                marked_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                first_marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """, "Dirty_Categories")
+        _create_table(cursor, """
+            CREATE TABLE IF NOT EXISTS Eligibility_Jobs (
+                job_id          INT AUTO_INCREMENT PRIMARY KEY,
+                user_id         INT NOT NULL,
+                pending_user_id INT NULL UNIQUE,
+                status          VARCHAR(10) NOT NULL DEFAULT 'Queued',
+                changed_fields  VARCHAR(255) NULL,
+                changed_categories VARCHAR(255) NULL,
+                result          JSON NULL,
+                error           TEXT NULL,
+                created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                started_at      TIMESTAMP NULL,
+                finished_at     TIMESTAMP NULL,
+                INDEX idx_jobs_status (status, job_id),
+                FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+            )
+        """, "Eligibility_Jobs")
+
+        _create_table(cursor, """
+            CREATE TABLE IF NOT EXISTS Near_Misses (
+                near_miss_id INT AUTO_INCREMENT PRIMARY KEY,
+                user_id      INT NOT NULL,
+                scheme_id    INT NOT NULL,
+                criterion    VARCHAR(20) NOT NULL,
+                gap          DECIMAL(15,2) NOT NULL,
+                relative_gap DOUBLE NOT NULL,
+                message      VARCHAR(255) NOT NULL,
+                computed_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                UNIQUE KEY uq_near_miss (user_id, scheme_id),
+                FOREIGN KEY (user_id)   REFERENCES Users(user_id) ON DELETE CASCADE,
+                FOREIGN KEY (scheme_id) REFERENCES Schemes(scheme_id) ON DELETE CASCADE
+            )
+        """, "Near_Misses")
+
+        _create_table(cursor, """
+            CREATE TABLE IF NOT EXISTS Households (
+                household_id INT AUTO_INCREMENT PRIMARY KEY,
+                name         VARCHAR(255) NOT NULL,
+                address      VARCHAR(255),
+                created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-        """, "Announcements")
+        """, "Households")
+
+        # ── Triggers superseded by the in-process engine ───────────────────
+        print("\n[Triggers]")
+        for trigger in ("trg_after_rule_update", "trg_after_usercategory_insert",
+                        "trg_after_usercategory_delete"):
+            try:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                print(f"  ✅ Dropped: {trigger}")
+            except Exception as e:
+                print(f"  ⏭  {trigger}: {e}")
 
         # ── Schemes columns ─────────────────────────────────────────────────
         print("\n[Schemes columns]")
@@ -67,6 +128,9 @@ def setup_db():
         _add_column(cursor,
             "ALTER TABLE Schemes ADD COLUMN eligibility_rules JSON",
             "Schemes.eligibility_rules")
+        _add_column(cursor,
+            "ALTER TABLE Schemes ADD COLUMN state_code VARCHAR(4) NULL",
+            "Schemes.state_code")
 
         # ── Grievances columns ──────────────────────────────────────────────
         print("\n[Grievances columns]")
@@ -80,6 +144,57 @@ def setup_db():
             "ALTER TABLE Grievances ADD COLUMN status VARCHAR(20) NOT NULL DEFAULT 'Open'",
             "Grievances.status")
 
+        # ── User_Eligibility columns ────────────────────────────────────────
+        print("\n[User_Eligibility columns]")
+        _add_column(cursor,
+            "ALTER TABLE User_Eligibility ADD COLUMN match_score SMALLINT NULL",
+            "User_Eligibility.match_score")
+        _add_column(cursor,
+            "ALTER TABLE User_Eligibility ADD COLUMN criteria_mask INTEGER NULL",
+            "User_Eligibility.criteria_mask")
+        _add_column(cursor,
+            "ALTER TABLE User_Eligibility ADD COLUMN status_changed_on TIMESTAMP NULL",
+            "User_Eligibility.status_changed_on")
+        cursor.execute(
+            "UPDATE User_Eligibility SET status_changed_on = applied_on "
+            "WHERE status_changed_on IS NULL"
+        )
+        # Created after status_changed_on, which upgraded tables only just gained.
+        _add_index(cursor,
+            "CREATE INDEX idx_ue_user_changed ON User_Eligibility (user_id, status_changed_on)",
+            "User_Eligibility(user_id, status_changed_on)")
+        # Keyset pages of the dashboard's eligible list (core/dashboard.py)
+        _add_index(cursor,
+            "CREATE INDEX idx_ue_user_status_changed ON User_Eligibility "
+            "(user_id, eligibility_status, status_changed_on)",
+            "User_Eligibility(user_id, eligibility_status, status_changed_on)")
+        _add_index(cursor,
+            "CREATE INDEX idx_ue_user_status_score ON User_Eligibility "
+            "(user_id, eligibility_status, match_score)",
+            "User_Eligibility(user_id, eligibility_status, match_score)")
+
+        # ── Rule-set versions ───────────────────────────────────────────────
+        print("\n[Rule-set versions]")
+        _add_column(cursor,
+            "ALTER TABLE Categories ADD COLUMN rules_version INT NOT NULL DEFAULT 0",
+            "Categories.rules_version")
+        _add_column(cursor,
+            "ALTER TABLE UserCategories ADD COLUMN rules_version INT NULL",
+            "UserCategories.rules_version")
+
+        # ── Dirty_Categories columns ────────────────────────────────────────
+        print("\n[Dirty_Categories columns]")
+        _add_column(cursor,
+            "ALTER TABLE Dirty_Categories ADD COLUMN first_marked_at TIMESTAMP NULL "
+            "DEFAULT CURRENT_TIMESTAMP",
+            "Dirty_Categories.first_marked_at")
+
+        # ── Eligibility_Jobs columns ────────────────────────────────────────
+        print("\n[Eligibility_Jobs columns]")
+        _add_column(cursor,
+            "ALTER TABLE Eligibility_Jobs ADD COLUMN changed_categories VARCHAR(255) NULL",
+            "Eligibility_Jobs.changed_categories")
+
         # ── Users columns ───────────────────────────────────────────────────
         print("\n[Users columns]")
         for col, typedef in [
@@ -87,6 +202,10 @@ def setup_db():
             ("disability_cert",     "BOOLEAN DEFAULT 0"),
             ("unemployment_status", "BOOLEAN DEFAULT 0"),
             ("business_turnover",   "DECIMAL(15,2) NULL"),
+            ("education_level",     "SMALLINT NULL"),
+            ("state_code",          "VARCHAR(4) NULL"),
+            ("district_code",       "VARCHAR(40) NULL"),
+            ("household_id",        "INT NULL"),
         ]:
             _add_column(cursor,
                 f"ALTER TABLE Users ADD COLUMN {col} {typedef}",
@@ -99,12 +218,47 @@ def setup_db():
             ("disability_cert",         "BOOLEAN DEFAULT 0"),
             ("unemployment_status",     "BOOLEAN DEFAULT 0"),
             ("education_required",      "VARCHAR(100) NULL"),
+            ("education_level",         "SMALLINT NOT NULL DEFAULT 0"),
+            ("location_code",           "VARCHAR(40) NULL"),
             ("business_turnover_limit", "DECIMAL(15,2) NULL"),
         ]:
             _add_column(cursor,
                 f"ALTER TABLE Rule_Engine ADD COLUMN {col} {typedef}",
                 f"Rule_Engine.{col}")
 
+        # ── Indexes ─────────────────────────────────────────────────────────
+        print("\n[Indexes]")
+        _add_index(cursor,
+            "CREATE INDEX idx_users_education_level ON Users (education_level)",
+            "Users.education_level")
+        # Rule_Engine.education_level is reporting-only, so its index goes;
+        # MySQL needs another index on category_id for the foreign key first.
+        _add_index(cursor,
+            "CREATE INDEX idx_rule_category ON Rule_Engine (category_id)",
+            "Rule_Engine(category_id)")
+        _drop_index(cursor, "Rule_Engine", "idx_rule_category_education")
+        _add_index(cursor,
+            "CREATE INDEX idx_users_state_district ON Users (state_code, district_code)",
+            "Users(state_code, district_code)")
+        _add_index(cursor,
+            "CREATE INDEX idx_users_dob ON Users (dob)",
+            "Users.dob")
+        _add_index(cursor,
+            "CREATE INDEX idx_users_income ON Users (income)",
+            "Users.income")
+        _add_index(cursor,
+            "CREATE INDEX idx_schemes_state_code ON Schemes (state_code)",
+            "Schemes.state_code")
+        _add_index(cursor,
+            "CREATE INDEX idx_users_household ON Users (household_id)",
+            "Users.household_id")
+
+    print("\nBackfilling education levels and location codes...")
+    try:
+        call_command("backfill_derived_columns")
+    except Exception as e:
+        print(f"  ⚠️  backfill warning (non-fatal): {e}")
+
     print("\n" + "=" * 50)
     print("Schema setup complete.")
 
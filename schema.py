@@ -23,6 +23,14 @@ cursor = db.cursor()
 
 # ── Tables ─────────────────────────────────────────────────────────────────
 tables = [
+    """
+    CREATE TABLE IF NOT EXISTS Households (
+        household_id INT AUTO_INCREMENT PRIMARY KEY,
+        name         VARCHAR(255) NOT NULL,
+        address      VARCHAR(255),
+        created_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
     """
     CREATE TABLE IF NOT EXISTS Users (
         user_id    INT AUTO_INCREMENT PRIMARY KEY,
@@ -36,19 +44,29 @@ tables = [
         income     DECIMAL(15,2),
         occupation VARCHAR(100),
         education  VARCHAR(100),
+        education_level TINYINT NULL,
+        state_code     VARCHAR(4) NULL,
+        district_code  VARCHAR(40) NULL,
         pension_status BOOLEAN DEFAULT 0,
         disability_cert BOOLEAN DEFAULT 0,
         unemployment_status BOOLEAN DEFAULT 0,
         business_turnover DECIMAL(15,2),
+        household_id INT NULL,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        last_login TIMESTAMP NULL
+        last_login TIMESTAMP NULL,
+        INDEX idx_users_education_level (education_level),
+        INDEX idx_users_state_district (state_code, district_code),
+        INDEX idx_users_dob (dob),
+        INDEX idx_users_income (income),
+        FOREIGN KEY (household_id) REFERENCES Households(household_id) ON DELETE SET NULL
     )
     """,
     """
     CREATE TABLE IF NOT EXISTS Categories (
         category_id   INT AUTO_INCREMENT PRIMARY KEY,
         category_name VARCHAR(100) NOT NULL,
-        description   TEXT
+        description   TEXT,
+        rules_version INT NOT NULL DEFAULT 0
     )
     """,
     """
@@ -57,6 +75,7 @@ tables = [
         user_id     INT NOT NULL,
         category_id INT NOT NULL,
         selected_on TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        rules_version INT NULL,
         UNIQUE KEY uq_user_cat (user_id, category_id),
         FOREIGN KEY (user_id)     REFERENCES Users(user_id),
         FOREIGN KEY (category_id) REFERENCES Categories(category_id)
@@ -74,7 +93,9 @@ tables = [
         registration_link VARCHAR(500),
         benefit_type      VARCHAR(100),
         state             VARCHAR(100),
+        state_code        VARCHAR(4) NULL,
         is_active         BOOLEAN DEFAULT 1,
+        INDEX idx_schemes_state_code (state_code),
         FOREIGN KEY (target_category) REFERENCES Categories(category_id)
     )
     """,
@@ -83,6 +104,8 @@ tables = [
         id          INT AUTO_INCREMENT PRIMARY KEY,
         message     TEXT NOT NULL,
         is_active   BOOLEAN DEFAULT 0,
+        starts_at   DATETIME NULL,
+        ends_at     DATETIME NULL,
         created_at  TIMESTAMP DEFAULT CURRENT_TIMESTAMP
     )
     """,
@@ -95,9 +118,11 @@ tables = [
         age_max                 INT,
         gender                  VARCHAR(10),
         location                VARCHAR(100),
+        location_code           VARCHAR(40) NULL,
         min_income              DECIMAL(15,2),
         max_income              DECIMAL(15,2),
         education_required      VARCHAR(100),
+        education_level         TINYINT NOT NULL DEFAULT 0,
         pension_status          BOOLEAN,
         disability_cert         BOOLEAN,
         unemployment_status     BOOLEAN,
@@ -113,8 +138,14 @@ tables = [
         scheme_id          INT NOT NULL,
         eligibility_status ENUM('Eligible','Not Eligible','Pending') NOT NULL DEFAULT 'Pending',
         reason             TEXT,
+        criteria_mask      INT NULL,
+        match_score        TINYINT NULL,
         applied_on         TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        status_changed_on  TIMESTAMP NULL,
         UNIQUE KEY uq_user_scheme (user_id, scheme_id),
+        INDEX idx_ue_user_changed (user_id, status_changed_on),
+        INDEX idx_ue_user_status_changed (user_id, eligibility_status, status_changed_on),
+        INDEX idx_ue_user_status_score (user_id, eligibility_status, match_score),
         FOREIGN KEY (user_id)   REFERENCES Users(user_id),
         FOREIGN KEY (scheme_id) REFERENCES Schemes(scheme_id)
     )
@@ -146,6 +177,47 @@ tables = [
     )
     """,
     """
+    CREATE TABLE IF NOT EXISTS Dirty_Categories (
+        category_id INT PRIMARY KEY,
+        generation  INT NOT NULL DEFAULT 1,
+        marked_at   TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        first_marked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (category_id) REFERENCES Categories(category_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Eligibility_Jobs (
+        job_id          INT AUTO_INCREMENT PRIMARY KEY,
+        user_id         INT NOT NULL,
+        pending_user_id INT NULL UNIQUE,
+        status          VARCHAR(10) NOT NULL DEFAULT 'Queued',
+        changed_fields  VARCHAR(255) NULL,
+        changed_categories VARCHAR(255) NULL,
+        result          JSON NULL,
+        error           TEXT NULL,
+        created_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        started_at      TIMESTAMP NULL,
+        finished_at     TIMESTAMP NULL,
+        INDEX idx_jobs_status (status, job_id),
+        FOREIGN KEY (user_id) REFERENCES Users(user_id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS Near_Misses (
+        near_miss_id INT AUTO_INCREMENT PRIMARY KEY,
+        user_id      INT NOT NULL,
+        scheme_id    INT NOT NULL,
+        criterion    VARCHAR(20) NOT NULL,
+        gap          DECIMAL(15,2) NOT NULL,
+        relative_gap DOUBLE NOT NULL,
+        message      VARCHAR(255) NOT NULL,
+        computed_on  TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        UNIQUE KEY uq_near_miss (user_id, scheme_id),
+        FOREIGN KEY (user_id)   REFERENCES Users(user_id) ON DELETE CASCADE,
+        FOREIGN KEY (scheme_id) REFERENCES Schemes(scheme_id) ON DELETE CASCADE
+    )
+    """,
+    """
     CREATE TABLE IF NOT EXISTS SchemeAuditLog (
         log_id      INT AUTO_INCREMENT PRIMARY KEY,
         scheme_id   INT NOT NULL,
@@ -177,6 +249,72 @@ try:
 except Exception:
     pass  # Column already exists — that's fine
 
+# Normalised education levels (core/education.py) and gazetteer location
+# codes (core/gazetteer.py) for existing tables; run
+# `python manage.py backfill_derived_columns` afterwards.
+for sql, desc in [
+    ("ALTER TABLE Users ADD COLUMN education_level TINYINT NULL", "Users.education_level"),
+    ("ALTER TABLE Users ADD INDEX idx_users_education_level (education_level)",
+     "Users.education_level index"),
+    ("ALTER TABLE Rule_Engine ADD COLUMN education_level TINYINT NOT NULL DEFAULT 0",
+     "Rule_Engine.education_level"),
+    # Keeps the category_id foreign key indexed once the education index
+    # below is dropped.
+    ("ALTER TABLE Rule_Engine ADD INDEX idx_rule_category (category_id)", "Rule_Engine.category_id index"),
+    ("ALTER TABLE Users ADD COLUMN state_code VARCHAR(4) NULL", "Users.state_code"),
+    ("ALTER TABLE Users ADD COLUMN district_code VARCHAR(40) NULL", "Users.district_code"),
+    ("ALTER TABLE Users ADD INDEX idx_users_state_district (state_code, district_code)",
+     "Users.state_code index"),
+    ("ALTER TABLE Rule_Engine ADD COLUMN location_code VARCHAR(40) NULL", "Rule_Engine.location_code"),
+    ("ALTER TABLE Schemes ADD COLUMN state_code VARCHAR(4) NULL", "Schemes.state_code"),
+    ("ALTER TABLE Schemes ADD INDEX idx_schemes_state_code (state_code)", "Schemes.state_code index"),
+    ("ALTER TABLE User_Eligibility ADD COLUMN match_score TINYINT NULL",
+     "User_Eligibility.match_score"),
+    ("ALTER TABLE User_Eligibility ADD COLUMN criteria_mask INT NULL",
+     "User_Eligibility.criteria_mask"),
+    ("ALTER TABLE Users ADD INDEX idx_users_dob (dob)", "Users.dob index"),
+    ("ALTER TABLE Users ADD INDEX idx_users_income (income)", "Users.income index"),
+    ("ALTER TABLE Categories ADD COLUMN rules_version INT NOT NULL DEFAULT 0",
+     "Categories.rules_version"),
+    ("ALTER TABLE UserCategories ADD COLUMN rules_version INT NULL",
+     "UserCategories.rules_version"),
+    ("ALTER TABLE Dirty_Categories ADD COLUMN first_marked_at TIMESTAMP NULL "
+     "DEFAULT CURRENT_TIMESTAMP", "Dirty_Categories.first_marked_at"),
+    ("ALTER TABLE User_Eligibility ADD COLUMN status_changed_on TIMESTAMP NULL",
+     "User_Eligibility.status_changed_on"),
+    ("ALTER TABLE User_Eligibility ADD INDEX idx_ue_user_changed (user_id, status_changed_on)",
+     "User_Eligibility.status_changed_on index"),
+    ("ALTER TABLE User_Eligibility ADD INDEX idx_ue_user_status_changed "
+     "(user_id, eligibility_status, status_changed_on)", "User_Eligibility recent-page index"),
+    ("ALTER TABLE User_Eligibility ADD INDEX idx_ue_user_status_score "
+     "(user_id, eligibility_status, match_score)", "User_Eligibility score-page index"),
+    ("ALTER TABLE Announcements ADD COLUMN starts_at DATETIME NULL", "Announcements.starts_at"),
+    ("ALTER TABLE Announcements ADD COLUMN ends_at DATETIME NULL", "Announcements.ends_at"),
+    ("ALTER TABLE Users ADD COLUMN household_id INT NULL", "Users.household_id"),
+    ("ALTER TABLE Users ADD FOREIGN KEY fk_users_household (household_id) "
+     "REFERENCES Households(household_id) ON DELETE SET NULL", "Users.household_id foreign key"),
+]:
+    try:
+        cursor.execute(sql)
+        db.commit()
+        print(f"✅ Added {desc}.")
+    except Exception:
+        pass  # Already exists — that's fine
+
+# Rows written before status_changed_on existed changed status when they were applied.
+cursor.execute("UPDATE User_Eligibility SET status_changed_on = applied_on "
+               "WHERE status_changed_on IS NULL")
+db.commit()
+
+# Rule_Engine.education_level is reporting-only (the engines classify
+# education_required themselves), so nothing uses its index.
+try:
+    cursor.execute("ALTER TABLE Rule_Engine DROP INDEX idx_rule_category_education")
+    db.commit()
+    print("✅ Dropped unused index Rule_Engine.idx_rule_category_education.")
+except Exception:
+    pass  # Already gone — that's fine
+
 # ── Drop existing procedures & triggers ────────────────────────────────────
 for proc in ["check_user_eligibility", "get_user_eligible_schemes", "get_schemes_by_category"]:
     cursor.execute(f"DROP PROCEDURE IF EXISTS {proc}")
@@ -367,33 +505,6 @@ END
 db.commit()
 print("✅ Procedure get_schemes_by_category created.")
 
-cursor.execute("""
-CREATE TRIGGER trg_after_usercategory_insert
-AFTER INSERT ON UserCategories
-FOR EACH ROW
-BEGIN
-    CALL check_user_eligibility(NEW.user_id);
-END
-""")
-db.commit()
-print("✅ Trigger trg_after_usercategory_insert created.")
-
-cursor.execute("""
-CREATE TRIGGER trg_after_usercategory_delete
-AFTER DELETE ON UserCategories
-FOR EACH ROW
-BEGIN
-    DELETE FROM User_Eligibility
-    WHERE user_id   = OLD.user_id
-      AND scheme_id IN (
-              SELECT scheme_id FROM Schemes
-              WHERE  target_category = OLD.category_id
-          );
-END
-""")
-db.commit()
-print("✅ Trigger trg_after_usercategory_delete created.")
-
 cursor.execute("""
 CREATE TRIGGER trg_before_user_delete
 BEFORE DELETE ON Users
@@ -420,29 +531,17 @@ END
 db.commit()
 print("✅ Trigger trg_after_scheme_insert created.")
 
-cursor.execute("""
-CREATE TRIGGER trg_after_rule_update
-AFTER UPDATE ON Rule_Engine
-FOR EACH ROW
-BEGIN
-    DECLARE v_done    INT DEFAULT 0;
-    DECLARE v_user_id INT;
-    DECLARE user_cur CURSOR FOR
-        SELECT DISTINCT user_id FROM UserCategories
-        WHERE  category_id = NEW.category_id;
-    DECLARE CONTINUE HANDLER FOR NOT FOUND SET v_done = 1;
-
-    OPEN user_cur;
-    recheck_loop: LOOP
-        FETCH user_cur INTO v_user_id;
-        IF v_done = 1 THEN LEAVE recheck_loop; END IF;
-        CALL check_user_eligibility(v_user_id);
-    END LOOP;
-    CLOSE user_cur;
-END
-""")
-db.commit()
-print("✅ Trigger trg_after_rule_update created.")
+# trg_after_rule_update is intentionally no longer created: it re-ran
+# check_user_eligibility for every user in the category, once per updated
+# row, inside the UPDATE. Rule edits now mark the category in
+# Dirty_Categories and `python manage.py recompute_eligibility` recomputes
+# each affected user once per batch window (see core/recompute.py).
+#
+# trg_after_usercategory_insert / _delete are gone for the same reason: a
+# bulk INSERT of n categories ran the full procedure n times. The category
+# views now write the rows in one statement and run a single incremental
+# pass over the added or removed categories (recheck_categories in
+# core/eligibility.py).
 
 cursor.close()
 db.close()